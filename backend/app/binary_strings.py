@@ -0,0 +1,232 @@
+"""
+Neural Workflow Engine — Binary String Recovery
+`strings` for files whose format handler failed (truncated PDFs, broken
+Office files, unknown containers): runs of printable ASCII and of UTF-16
+(LE and BE) text, at least STRINGS_MIN_LENGTH characters long, across the
+whole file. The file is memory-mapped and scanned in fixed windows with
+NumPy byte masks; Python only touches the runs it finds, one slice each.
+"""
+
+import os
+import mmap
+import time
+import logging
+from typing import Callable, Iterator, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# ─── Config ───────────────────────────────────────────────────────────────────
+try:
+    STRINGS_MIN_LENGTH = max(2, int(os.getenv("STRINGS_MIN_LENGTH", 6)))  # Characters per run
+    STRINGS_WINDOW_BYTES = max(1 << 16, int(os.getenv("STRINGS_WINDOW_BYTES", 1 << 20)))
+except ValueError:
+    STRINGS_MIN_LENGTH, STRINGS_WINDOW_BYTES = 6, 1 << 20
+
+UTF16_TAIL_BYTES = 4096  # Window end checked for an open UTF-16 run; longer ones are split
+_UTF16_BREAK = b"\xff\xff\xff"  # Odd-length stretch padding + separator: no printable unit in either order
+
+ASCII, UTF16_LE, UTF16_BE = 0, 1, 2  # Run kinds
+
+# Run starts, ends ([start, end) byte offsets within a window) and kinds
+Runs = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+# ─── Runs ─────────────────────────────────────────────────────────────────────
+def _printable(values: np.ndarray) -> np.ndarray:
+    """Tab, LF, CR and 0x20-0x7E. Unsigned wraparound turns each range test into one compare."""
+    kind = values.dtype.type
+    mask = (values - kind(0x20)) < 0x5F
+    mask |= (values - kind(0x09)) < 2
+    mask |= values == 0x0D
+    return mask
+
+
+def _runs(mask: np.ndarray, min_length: int) -> Tuple[np.ndarray, np.ndarray]:
+    """[start, end) index pairs of the True runs in `mask` at least `min_length` long."""
+    if mask.size < min_length:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    # full[i] = all(mask[i:i + min_length]), by doubling: binary data is full of
+    # short printable runs, and this drops them before any index is built
+    full, width = mask, 1
+    while width * 2 <= min_length:
+        full, width = full[:-width] & full[width:], width * 2
+    if width < min_length:
+        full = full[:width - min_length] & full[min_length - width:]
+    edges = np.flatnonzero(full[1:] != full[:-1]) + 1
+    if full[0]:
+        edges = np.concatenate(([0], edges))
+    if full[-1]:
+        edges = np.concatenate((edges, [full.size]))
+    return edges[0::2], edges[1::2] + (min_length - 1)
+
+
+def _trailing_start(mask: np.ndarray, limit: int) -> Optional[int]:
+    """Where the True run at the end of `mask` starts, if it is shorter than `limit`."""
+    span = 4096
+    while True:  # Usually short: look at a growing tail, not the whole window
+        tail = mask[-min(span, limit):]
+        breaks = np.flatnonzero(~tail)
+        if breaks.size:
+            return mask.size - tail.size + int(breaks[-1]) + 1
+        if span >= limit:
+            return None
+        span *= 4
+
+
+def _utf16_masks(data: np.ndarray, parity: int) -> Iterator[Tuple[int, np.ndarray]]:
+    """Printable UTF-16 code units starting at byte offsets of the given parity, LE and BE."""
+    units = (data.size - parity) // 2
+    little = np.frombuffer(data[parity:parity + 2 * units].tobytes(), dtype="<u2")
+    yield UTF16_LE, _printable(little)
+    yield UTF16_BE, _printable(little.byteswap())
+
+
+def _utf16_runs(window: bytes, data: np.ndarray, min_length: int, at_eof: bool) -> Tuple[list, list]:
+    """
+    UTF-16 runs as (starts, ends, kind) arrays, and where any run still open
+    at the window's end starts. Every UTF-16 run of n characters has n zero
+    bytes two apart with non-zero bytes between, which binary data rarely
+    does: only the stretches around such chains are scanned, packed into
+    one array.
+    """
+    found, open_at = [], []
+    if not at_eof:
+        tail_start = max(0, data.size - UTF16_TAIL_BYTES) & ~1
+        for parity in (0, 1):
+            for _, mask in _utf16_masks(data[tail_start:], parity):
+                trailing = _trailing_start(mask, mask.size)
+                open_at.append(None if trailing is None else tail_start + parity + 2 * trailing)
+
+    # "\0 x \0" triples; a run of n characters holds n - 1 of them, two apart
+    zero = data == 0
+    triples = zero[:-2] & zero[2:] & ~zero[1:-1]
+    if np.count_nonzero(triples) * 8 > data.size:  # Mostly UTF-16 text: scan it all
+        lo, hi = np.array([0]), np.array([data.size])
+    else:
+        triples = np.flatnonzero(triples)
+        chain_from, chain_to = _runs(np.diff(triples) == 2, max(1, min_length - 2))
+        if not chain_from.size:
+            return found, open_at
+        # Stretches from the byte before a chain's first zero to the byte after
+        # its last, starting on even offsets
+        lo = np.maximum(triples[chain_from] - 1, 0) & ~1
+        hi = np.minimum(triples[chain_to] + 4, data.size)
+    # Packed end to end, each padded to even length and followed by two 0xFF
+    # bytes, so no run crosses from one stretch into the next
+    pieces = []
+    for first, last in zip(lo.tolist(), hi.tolist()):
+        pieces += (window[first:last], _UTF16_BREAK[:2 + (last - first) % 2])
+    packed_start = np.cumsum((hi - lo + 1) // 2 * 2 + 2)
+    packed_start = np.concatenate(([0], packed_start[:-1]))
+    packed = np.frombuffer(b"".join(pieces), dtype=np.uint8)
+
+    for parity in (0, 1):
+        for kind, mask in _utf16_masks(packed, parity):
+            starts, ends = _runs(mask, min_length)
+            starts, ends = parity + 2 * starts, parity + 2 * ends
+            shift = (lo - packed_start)[np.searchsorted(packed_start, starts, side="right") - 1]
+            found.append((starts + shift, ends + shift, kind))
+    return found, open_at
+
+
+def scan_window(window: bytes, min_length: int, at_eof: bool, covered: int = 0) -> Tuple[Runs, int]:
+    """
+    String runs in one window, in order and non-overlapping, plus how many
+    bytes of the window are settled. Unless `at_eof`, a run still open at
+    the window's end is left for the next window (which starts where it
+    does), so strings aren't cut at window edges. Bytes before `covered`
+    already belong to a run from the previous window.
+    """
+    data = np.frombuffer(window, dtype=np.uint8)
+    printable = _printable(data)
+    starts, ends = _runs(printable, min_length)
+    found = [(starts, ends, ASCII)]
+    open_at = [] if at_eof else [_trailing_start(printable, data.size // 2)]
+
+    utf16, utf16_open = _utf16_runs(window, data, min_length, at_eof)
+    found += utf16
+    open_at += utf16_open
+
+    settled = min((start for start in open_at if start is not None), default=data.size)
+    starts = np.concatenate([s for s, _, _ in found])
+    ends = np.concatenate([e for _, e, _ in found])
+    kinds = np.concatenate([np.full(s.size, kind, dtype=np.int64) for s, _, kind in found])
+    keep = starts < settled
+    order = np.lexsort((starts[keep] - ends[keep], starts[keep]))
+    starts, ends, kinds = starts[keep][order], ends[keep][order], kinds[keep][order]
+
+    # Overlapping runs (UTF-16 text also reads as a shifted run in the other
+    # byte order; "\0a\0b" + "cdef" shares the "b"): the earlier one keeps the
+    # bytes, later ones are trimmed and dropped if too short. Runs that start
+    # after everything before them has ended (nearly all) skip the loop.
+    reach = np.maximum.accumulate(np.concatenate(([covered], ends[:-1])))
+    clean = starts >= reach
+    if not clean.all():
+        clean_reach = np.maximum.accumulate(np.where(clean, ends, covered))
+        keep = np.ones(starts.size, dtype=bool)
+        latest = covered
+        for i in np.flatnonzero(~clean):
+            limit = max(latest, int(clean_reach[i - 1]) if i else covered)
+            width = 1 if kinds[i] == ASCII else 2
+            start = int(starts[i])
+            if start < limit:
+                start += -(-(limit - start) // width) * width
+            if ends[i] - start >= min_length * width:
+                starts[i], latest = start, max(latest, int(ends[i]))
+            else:
+                keep[i] = False
+        starts, ends, kinds = starts[keep], ends[keep], kinds[keep]
+    return (starts, ends, kinds), settled
+
+
+def window_text(window: bytes, runs: Runs) -> str:
+    """The runs' characters, one run per line (UTF-16 runs read every other byte)."""
+    starts, ends, kinds = runs
+    first = (starts + (kinds == UTF16_BE)).tolist()
+    step = np.where(kinds == ASCII, 1, 2).tolist()
+    lines = [window[a:b:c] for a, b, c in zip(first, ends.tolist(), step)]
+    lines.append(b"")
+    return b"\n".join(lines).decode("ascii")
+
+# ─── File ─────────────────────────────────────────────────────────────────────
+def iter_strings(
+    file_path: str,
+    min_length: int = STRINGS_MIN_LENGTH,
+    window_bytes: int = STRINGS_WINDOW_BYTES,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+) -> Iterator[Tuple[int, str]]:
+    """
+    (byte offset of the first run, text) per window that has string runs,
+    in file order; the text has one run per line. `on_progress(done,
+    total)` is called after each window.
+    """
+    size = os.path.getsize(file_path)
+    if not size:
+        return
+    started = time.perf_counter()
+    found = 0
+    with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        if hasattr(mapped, "madvise"):
+            mapped.madvise(mmap.MADV_SEQUENTIAL)
+        position = covered = 0
+        while position < size:
+            end = min(position + window_bytes, size)
+            window = mapped[position:end]
+            runs, settled = scan_window(window, min_length, end == size, covered)
+            starts, ends, _ = runs
+            settled = settled or len(window)
+            covered = 0
+            if starts.size:
+                yield position + int(starts[0]), window_text(window, runs)
+                found += starts.size
+                covered = max(0, int(ends[-1]) - settled)
+            position += settled
+            if on_progress is not None:
+                on_progress(position, size)
+
+    elapsed = time.perf_counter() - started
+    logger.info(
+        f"Strings recovered: {found} runs from {size / (1024*1024):.1f} MB in {elapsed:.2f}s "
+        f"({size / (1024*1024) / max(elapsed, 1e-9):.0f} MB/s)"
+    )
@@ -1,15 +1,31 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, HTTPException, Header, Request, Response
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
 import os
-import httpx
 import time
 import io
 import traceback
 import logging
-import shutil
 import uuid
+import asyncio
+import hashlib
+import numpy as np
 from dotenv import load_dotenv
+from app.upstream import get_client, UPSTREAM_RATE_LIMIT_RETRIES
+from app.key_scheduler import KeyScheduler
+from app.single_flight import SingleFlight, llm_flights, request_key
+from app.retrieval import rag_index, iter_chunks, RAG_TOP_K
+from app.vector_index import VectorIndex, HashingVectorizer, fuse_rankings
+from app.document_store import DocumentStore, DocumentWriter
+from app.context_budget import ContextPacker, prompt_budget, usage_report, count_tokens
+from app.ingestion import ingest_jobs, get_job, submit_job, queue_depth, pending_filenames, ACTIVE_PHASES
+from app.resumable_uploads import ResumableUploadStore
+from app.metrics import FALLBACKS, UPSTREAM_RETRIES, observe_upstream, record_usage
+from app.extraction import iter_segments
+from app.streaming import (
+    sse_event, sse_response, iter_completion_deltas,
+    EVENT_CHAT_DELTA, EVENT_CHAT_COMPLETED, EVENT_ERROR,
+)
 
 # Load environment variables explicitly
 load_dotenv()
@@ -18,15 +34,6 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Mandatory Imports (Fail hard if missing to debug environment)
-try:
-    import pandas as pd
-    from pypdf import PdfReader
-    from openpyxl import load_workbook
-except ImportError as e:
-    logger.error(f"Critical Dependency Missing: {e}")
-    pass
-
 router = APIRouter()
 
 # ─── Config ───────────────────────────────────────────────────────────────────
@@ -37,233 +44,611 @@ GROQ_API_KEYS = [
 ]
 GROQ_API_KEYS = [k for k in GROQ_API_KEYS if k]
 
-CURRENT_KEY_INDEX = 0
+# Picks the key with the most rate-limit headroom; benches keys that 429 / fail
+groq_keys = KeyScheduler(GROQ_API_KEYS)
+
+# Extracted text + chunks on disk (mmap reads), shared by every worker.
+# Documents are keyed by content sha256; filenames map onto them.
+document_store = DocumentStore()
+
+# Optional cap on retrieved-context tokens in /api/chat-rag (0 = fill the model's window)
+RAG_CONTEXT_TOKENS = int(os.getenv("RAG_CONTEXT_TOKENS", 0))
+
+# Retrieval: "bm25" (lexical), "vector" (dense hashing embeddings) or "hybrid" (fused)
+RAG_RETRIEVAL_MODE = os.getenv("RAG_RETRIEVAL_MODE", "hybrid").lower()
+RETRIEVAL_MODES = ("bm25", "vector", "hybrid")
 
-# In-Memory Context Store (For MVP)
-# Ideally, use a vector database for 3GB+ datasets.
-# For now, we store metadata and a "Sampled Context" (first 50k chars + summary).
-document_store = {}
+# Per-worker search indexes, loaded from document_store (postings + vectors) by ensure_indexed
+vector_index = VectorIndex()
+index_flights = SingleFlight()
 
 TEMP_DIR = "temp_uploads"
 os.makedirs(TEMP_DIR, exist_ok=True)
+UPLOAD_BLOCK_SIZE = 1024 * 1024
+
+# Extraction streams into chunking; chunks are embedded and written this many at a time
+EMBED_BATCH_CHUNKS = 256
+PREVIEW_CHARS = 200
+
+# Chunked uploads (create → PUT ranges → finalize); state on disk, so any worker can resume them
+resumable_uploads = ResumableUploadStore(os.path.join(TEMP_DIR, "resumable"))
+
+# Raw uploads are deleted once extracted; the GC sweeps leftovers (failed jobs, aborted .part files)
+UPLOAD_GC_INTERVAL = float(os.getenv("UPLOAD_GC_INTERVAL", 300))
+UPLOAD_RETENTION = float(os.getenv("UPLOAD_RETENTION", 6 * 3600))
 
 # ─── Models ───────────────────────────────────────────────────────────────────
+class CreateUploadRequest(BaseModel):
+    filename: str
+    size: int
+    sha256: Optional[str] = None  # Verified on finalize when given
+
 class ChatRequest(BaseModel):
     message: str
     context_files: List[str] = []
+    retrieval: Optional[str] = None  # Overrides RAG_RETRIEVAL_MODE
 
 # ─── Helpers ──────────────────────────────────────────────────────────────────
-def get_next_api_key():
-    global CURRENT_KEY_INDEX
-    if not GROQ_API_KEYS:
-        return os.getenv("GROQ_API_KEY") 
-    
-    key = GROQ_API_KEYS[CURRENT_KEY_INDEX]
-    CURRENT_KEY_INDEX = (CURRENT_KEY_INDEX + 1) % len(GROQ_API_KEYS)
-    return key
+GROQ_URL = os.getenv("GROQ_URL", "https://api.groq.com/openai/v1/chat/completions")
+GROQ_MODEL = "llama3-70b-8192"
+GROQ_MAX_TOKENS = 4096
+GROQ_TEMPERATURE = 0.3
+
+def _groq_request(messages: List[dict], api_key: str, stream: bool = False) -> dict:
+    body = {
+        "model": GROQ_MODEL,
+        "messages": messages,
+        "temperature": GROQ_TEMPERATURE,
+        "max_tokens": GROQ_MAX_TOKENS,
+    }
+    if stream:
+        body["stream"] = True
+    return {
+        "headers": {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        },
+        "json": body,
+    }
+
+def _groq_attempts() -> int:
+    return len(groq_keys) + UPSTREAM_RATE_LIMIT_RETRIES
+
+def _request_rejected(status: Optional[int]) -> bool:
+    """A 4xx about the request itself (not rate limits or the key): every key would get it."""
+    return status is not None and 400 <= status < 500 and status not in (401, 403, 429)
 
 async def call_groq_api(messages: List[dict]) -> str:
-    """Call Groq API with robust error handling and rotation."""
-    url = "https://api.groq.com/openai/v1/chat/completions"
-    
+    """Call Groq; identical concurrent calls (same prompt and files) share one request."""
+    key = request_key("groq", GROQ_MODEL, messages, GROQ_TEMPERATURE, max_tokens=GROQ_MAX_TOKENS)
+    return await llm_flights.run(key, lambda: _call_groq(messages))
+
+async def _call_groq(messages: List[dict]) -> str:
+    """
+    Call Groq on the key with the most headroom, moving on when a key is
+    limited or failing. A 4xx about the request itself ends the call.
+    """
     if not GROQ_API_KEYS:
         return "System Error: No Groq API Keys configured."
 
-    for i in range(len(GROQ_API_KEYS)):
-        api_key = get_next_api_key()
-        
+    estimated = sum(count_tokens(m["content"]) for m in messages)
+    client = get_client("groq")
+    failure = None
+    for attempt in range(_groq_attempts()):
+        api_key = await groq_keys.acquire(estimated)
+        if api_key is None:
+            break
+        if failure:
+            UPSTREAM_RETRIES.inc("groq", failure)
+        response, used = None, None
+        started = time.perf_counter()
         try:
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.post(
-                    url,
-                    headers={
-                        "Authorization": f"Bearer {api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": "llama3-70b-8192", 
-                        "messages": messages,
-                        "temperature": 0.3,
-                        "max_tokens": 4096
-                    }
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    return data["choices"][0]["message"]["content"]
-                
-                logger.warning(f"Groq API Error (Key {i}): {response.status_code} - {response.text}")
+            response = await client.post(GROQ_URL, **_groq_request(messages, api_key))
+            if response.status_code == 200:
+                data = response.json()
+                used = data.get("usage", {}).get("total_tokens")
+                content = data["choices"][0]["message"]["content"]
+                record_usage("groq", GROQ_MODEL, {"prompt_tokens": estimated, **(data.get("usage") or {})}, "", content)
+                return content
+            
+            logger.warning(f"Groq API Error (attempt {attempt + 1}): {response.status_code} - {response.text[:200]}")
                 
         except Exception as e:
             logger.error(f"Groq Request Exception: {str(e)}")
+        finally:
+            status = response.status_code if response is not None else None
+            observe_upstream("groq", GROQ_MODEL, groq_keys.slot(api_key), status, started)
+            groq_keys.release(api_key, response, estimated, used)
+        if _request_rejected(status):
+            FALLBACKS.inc("request_rejected")
+            return f"Error: AI provider rejected the request ({status})."
+        failure = str(status or "error")
             
+    FALLBACKS.inc("providers_busy")
     return "Error: All AI providers are busy."
 
-def extract_text_from_path(file_path: str, filename: str) -> str:
-    """Robust text extraction from DISK file."""
-    ext = filename.split('.')[-1].lower()
-    text = ""
-    
-    try:
-        if ext == 'pdf':
-            reader = PdfReader(file_path)
-            # Limit pages for massive PDFs to avoid timeout
-            max_pages = 50 
-            for i, page in enumerate(reader.pages):
-                if i >= max_pages:
-                    text += "\n...[PDF Truncated at 50 pages for speed]..."
-                    break
-                page_text = page.extract_text()
-                if page_text:
-                    text += f"[Page {i+1}]\n{page_text}\n"
-            
-            if not text.strip():
-                return "[Warning: Scanned PDF detected. No text found.]"
+async def stream_groq_api(messages: List[dict]) -> AsyncIterator[str]:
+    """
+    Stream Groq completion deltas from the key with the most headroom. Keys
+    are only rotated until the first delta is out; a failure after that is
+    raised to the caller.
+    """
+    if not GROQ_API_KEYS:
+        yield "System Error: No Groq API Keys configured."
+        return
+
+    estimated = sum(count_tokens(m["content"]) for m in messages)
+    client = get_client("groq")
+    failure = None
+    for attempt in range(_groq_attempts()):
+        api_key = await groq_keys.acquire(estimated)
+        if api_key is None:
+            break
+        if failure:
+            UPSTREAM_RETRIES.inc("groq", failure)
+        response, output = None, []
+        started = time.perf_counter()
+        try:
+            async with client.stream("POST", GROQ_URL, **_groq_request(messages, api_key, stream=True)) as response:
+                if response.status_code == 200:
+                    async for delta in iter_completion_deltas(response):
+                        output.append(delta)
+                        yield delta
+                    record_usage("groq", GROQ_MODEL, {"prompt_tokens": estimated}, "", "".join(output))
+                    return
                 
-        elif ext in ['csv']:
-            # Read chunks for massive CSVs
-            df = pd.read_csv(file_path, nrows=500) # Only read first 500 rows
-            text = df.to_markdown(index=False)
-            text += "\n...[CSV Truncated at 500 rows]..."
-            
-        elif ext in ['xlsx', 'xls']:
-            df = pd.read_excel(file_path, nrows=500)
-            text = df.to_markdown(index=False)
-            text += "\n...[Excel Truncated at 500 rows]..."
+                await response.aread()
+                logger.warning(f"Groq API Error (attempt {attempt + 1}): {response.status_code} - {response.text[:200]}")
+                
+        except Exception as e:
+            if output:
+                # Part of the answer is already out; another key would stream it again from the start
+                logger.error(f"Groq Stream Exception after {len(output)} deltas: {str(e)}")
+                raise
+            logger.error(f"Groq Stream Exception: {str(e)}")
+        finally:
+            status = response.status_code if response is not None else None
+            observe_upstream("groq", GROQ_MODEL, groq_keys.slot(api_key), status, started)
+            used = estimated + count_tokens("".join(output)) if output else None
+            groq_keys.release(api_key, response, estimated, used)
+        if _request_rejected(status):
+            FALLBACKS.inc("request_rejected")
+            yield f"Error: AI provider rejected the request ({status})."
+            return
+        failure = str(status or "error")
             
-        elif ext in ['txt', 'md', 'json', 'js', 'py', 'html', 'css', 'xml', 'log']:
-            with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
-                text = f.read(100000) # Read first 100KB
-                if len(text) >= 100000:
-                    text += "\n...[Text Truncated at 100KB]..."
+    FALLBACKS.inc("providers_busy")
+    yield "Error: All AI providers are busy."
+
+def prepare_document(file_path: str, filename: str, vector_dim: int, doc_id: str, store_dir: str) -> dict:
+    """
+    Worker-side ingestion: stream the file's extracted segments through
+    chunking and embedding straight into the document store directory, one
+    batch of chunks at a time. Only a small summary travels back to the
+    event loop. Must stay a module-level function.
+    """
+    vectorizer = HashingVectorizer(vector_dim)
+    writer = DocumentWriter(store_dir, doc_id, vector_dim)
+    preview = ""
+
+    def previewed(segments):
+        nonlocal preview
+        for segment in segments:
+            if len(preview) < PREVIEW_CHARS:
+                preview += segment["text"][:PREVIEW_CHARS - len(preview)]
+            yield segment
+
+    try:
+        batch = []
+        for chunk in iter_chunks(previewed(iter_segments(file_path, filename))):
+            batch.append(chunk)
+            if len(batch) >= EMBED_BATCH_CHUNKS:
+                writer.add_chunks(batch, vectorizer.transform([c["text"] for c in batch]))
+                batch = []
+        writer.add_chunks(batch, vectorizer.transform([c["text"] for c in batch]))
+        size = writer.commit()
+    except BaseException:
+        writer.abort()
+        raise
+    return {"bytes": size, "chunks": writer.chunk_count, "preview": preview.replace('\n', ' ') + "..."}
+
+def load_document(doc_id: str):
+    """
+    A stored document's BM25 postings and chunk vectors, read into memory.
+    Blocking file I/O: runs in a thread (see ensure_indexed).
+    """
+    postings = document_store.postings(doc_id)
+    vectors = document_store.vectors(doc_id)
+    if vectors.shape[-1] != vector_index.dim:  # Stored before RAG_VECTOR_DIM changed
+        return postings, vector_index.vectorizer.transform(
+            [document_store.chunk(doc_id, position) for position in range(postings.chunk_count)]
+        )
+    return postings, np.array(vectors)
+
+async def _hydrate(doc_id: str):
+    postings, vectors = await asyncio.to_thread(load_document, doc_id)
+    if doc_id not in rag_index:
+        rag_index.add_postings(doc_id, postings)
+        vector_index.add_document(doc_id, vectors)
+
+async def ensure_indexed(doc_ids: Iterable[str]):
+    """
+    Load stored documents into this worker's BM25 + vector indexes (once).
+    Files are read off the event loop; only adding the loaded arrays to the
+    indexes happens on it. Concurrent requests for one document share a load.
+    """
+    missing = [doc_id for doc_id in doc_ids if doc_id not in rag_index]
+    await asyncio.gather(*(index_flights.run(doc_id, lambda doc_id=doc_id: _hydrate(doc_id)) for doc_id in missing))
+
+def drop_from_indexes(doc_ids):
+    for doc_id in doc_ids:
+        rag_index.remove_document(doc_id)
+        vector_index.remove_document(doc_id)
 
+async def index_document(job: dict, prepared: dict):
+    """Event-loop side of ingestion: publish the stored document and index it."""
+    doc_id = job["sha256"]
+    evicted = document_store.register(doc_id, job["filename"], prepared["bytes"], prepared["chunks"])
+    drop_from_indexes(evicted)
+    await ensure_indexed([doc_id])
+    if os.path.exists(job["path"]):
+        os.remove(job["path"])
+    
+    job["doc_id"] = doc_id
+    job["chunks"] = prepared["chunks"]
+    job["preview"] = prepared["preview"]
+    # Names the same bytes were uploaded under while this job ran (no await below: none can be missed)
+    for alias in job.get("aliases", ()):
+        document_store.add_name(alias, doc_id)
+    logger.info(f"Indexed {job['filename']} ({prepared['chunks']} chunks, {prepared['bytes'] / 1024:.0f} KB stored)")
+
+def stream_to_disk(src, dst_path: str):
+    """Copy an upload to disk in blocks, hashing as it goes. Returns (sha256, size)."""
+    digest = hashlib.sha256()
+    size = 0
+    with open(dst_path, "wb") as out:
+        while True:
+            block = src.read(UPLOAD_BLOCK_SIZE)
+            if not block:
+                break
+            digest.update(block)
+            out.write(block)
+            size += len(block)
+    return digest.hexdigest(), size
+
+def _active_job_for(sha256: str) -> Optional[dict]:
+    for job in ingest_jobs.values():
+        if job.get("sha256") == sha256 and job["status"] in ACTIVE_PHASES:
+            return job
+    return None
+
+def queue_ingestion(file_path: str, filename: str, sha256: str, size: int) -> dict:
+    """
+    Hand a fully received file to ingestion. Identical content already
+    stored or in flight is reused instead of extracted again; new content is
+    queued on the ingestion pool. The file is consumed unless this raises.
+    """
+    # Same bytes seen before? Drop the scratch copy and reuse the existing extraction
+    known_job = _active_job_for(sha256)
+    if known_job is not None or sha256 in document_store:
+        os.remove(file_path)
+        if known_job is not None:
+            known_job.setdefault("aliases", []).append(filename)  # Named by index_document once stored
         else:
-            # Universal Binary Fallback
-            # Try to read as text first
+            document_store.add_name(filename, sha256)
+        source = known_job["filename"] if known_job else document_store.display_name(sha256)
+        logger.info(f"Dedup hit: {filename} == {source} ({sha256[:12]})")
+        return {
+            "filename": filename,
+            "status": "deduplicated",
+            "doc_id": sha256,
+            "job_id": known_job["job_id"] if known_job else None,
+            "status_url": f"/api/upload/{known_job['job_id']}" if known_job else None,
+            "sha256": sha256,
+            "message": f"Identical content already ingested as {source}. Reused existing index."
+        }
+
+    # New content: keep it under its content address
+    ext = os.path.splitext(filename)[1].lower()
+    stored_path = os.path.join(TEMP_DIR, f"{sha256}{ext}")
+    os.replace(file_path, stored_path)
+
+    # Queue extraction + chunking + embedding on the ingestion pool
+    try:
+        job = submit_job(
+            filename,
+            prepare_document,
+            (stored_path, filename, vector_index.dim, sha256, document_store.directory),
+            index_document,
+            size=size,
+            path=stored_path,
+            sha256=sha256,
+        )
+    except Exception:
+        os.replace(stored_path, file_path)  # Give the file back to the caller (e.g. to retry on 429)
+        raise
+
+    return {
+        "filename": filename,
+        "status": "queued",
+        "doc_id": sha256,
+        "job_id": job["job_id"],
+        "status_url": f"/api/upload/{job['job_id']}",
+        "sha256": sha256,
+        "message": "File streamed. Extraction queued."
+    }
+
+def collect_upload_garbage() -> int:
+    """Delete stale files in TEMP_DIR that no running ingestion job needs."""
+    in_use = {job.get("path") for job in ingest_jobs.values() if job["status"] in ACTIVE_PHASES}
+    cutoff = time.time() - UPLOAD_RETENTION
+    removed = 0
+    for entry in os.scandir(TEMP_DIR):
+        if entry.is_file() and entry.path not in in_use and entry.stat().st_mtime < cutoff:
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    text = f.read(50000)
-                    text += "\n...[Generic Text Read]..."
-            except UnicodeDecodeError:
-                # True Binary - Extract Metadata
-                size = os.path.getsize(file_path)
-                with open(file_path, 'rb') as f:
-                    header = f.read(128).hex()
-                text = f"[Binary File: {filename}]\nSize: {size / (1024*1024):.2f} MB\nHeader (Hex): {header}\nNote: This file appears to be binary (image/video/executable). Context is limited to metadata."
-            
-        return text
-            
-    except Exception as e:
-        logger.warning(f"Standard extraction failed for {filename}: {e}. Attempting Raw Strings Fallback.")
-        # Fallback: Extract printable strings from binary
-        # This recovers text from truncated PDFs or corrupt Office files
+                os.remove(entry.path)
+                removed += 1
+            except OSError:
+                pass
+    return removed + resumable_uploads.collect_garbage(cutoff)
+
+async def upload_gc_loop():
+    """Background sweep of temp_uploads; also re-applies the document store budget."""
+    while True:
+        await asyncio.sleep(UPLOAD_GC_INTERVAL)
         try:
-            with open(file_path, "rb") as f:
-                content = f.read(200000) # Read 200KB
-                # Filter for printable chars (ASCII + Common UTF-8)
-                text = "".join(chr(b) for b in content if 32 <= b <= 126 or b == 10 or b == 13)
-                
-                if len(text) > 100:
-                    return f"[Warning: File structure corrupted/partial. Recovered Raw Text]\n{text}"
-                else:
-                    return f"[Error: No recoverable text found in file header. Hex Dump: {content[:50].hex()}]"
-        except Exception as fallback_err:
-            return f"[Fatal Extraction Error: {str(e)} | Fallback: {str(fallback_err)}]"
+            removed = await asyncio.to_thread(collect_upload_garbage)
+            drop_from_indexes(await asyncio.to_thread(document_store.evict_to_budget))
+            if removed:
+                logger.info(f"Upload GC removed {removed} stale files from {TEMP_DIR}")
+        except Exception as e:
+            logger.error(f"Upload GC failed: {e}")
 
 # ─── Endpoints ────────────────────────────────────────────────────────────────
 
 @router.post("/api/upload")
 async def upload_document(file: UploadFile = File(...)):
-    """Ingest massive documents via stream."""
+    """
+    Ingest massive documents via stream.
+    The file is written to disk and queued for extraction; poll
+    /api/upload/{job_id} for progress. For multi-gigabyte files prefer the
+    resumable protocol under /api/uploads.
+    """
     logger.info(f"Stream Upload Start: {file.filename}")
     
-    file_path = os.path.join(TEMP_DIR, f"{uuid.uuid4()}_{file.filename}")
+    file_path = os.path.join(TEMP_DIR, f"{uuid.uuid4()}_{file.filename}.part")
     
     try:
-        # 1. Stream to Disk (Crucial for 3GB files)
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-            
-        # 2. Extract context (Smart Sampling)
-        extracted_text = extract_text_from_path(file_path, file.filename)
+        # 1. Stream to Disk (Crucial for 3GB files), hashing on the way — off the event loop
+        sha256, size = await asyncio.to_thread(stream_to_disk, file.file, file_path)
         
-        # 3. Store
-        document_store[file.filename] = {
-            "text": extracted_text,
-            "path": file_path,
-            "timestamp": time.time()
-        }
-        
-        preview = extracted_text[:200].replace('\n', ' ') + "..."
-        logger.info(f"Indexed {file.filename}")
-        
-        # Clean up old files? For MVP we keep them until restart or manual cleanup logic
-        
-        return {
-            "filename": file.filename,
-            "status": "success",
-            "message": "File streamed & indexed.",
-            "preview": preview
-        }
+        # 2-4. Dedup, or queue extraction on the ingestion pool
+        return queue_ingestion(file_path, file.filename, sha256, size)
     except Exception as e:
         logger.error(f"Stream Upload Error: {e}")
         # Cleanup partial file
         if os.path.exists(file_path):
             os.remove(file_path)
+        if isinstance(e, HTTPException):
+            raise
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/api/upload/{job_id}")
+async def upload_status(job_id: str):
+    """Progress of an ingestion job (run by any worker)."""
+    job = await get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    public = {k: v for k, v in job.items() if k != "path"}
+    return {**public, "queue_depth": queue_depth()}
+
+# ─── Resumable Uploads ────────────────────────────────────────────────────────
+# tus-style: POST creates, PUT writes a byte range at an offset (headers
+# Upload-Offset and optional Upload-Checksum: "<sha256|sha1|md5> <base64>"),
+# HEAD/GET report the offset to resume from, POST .../complete finalizes.
+
+def _upload_headers(state: dict) -> dict:
+    public = resumable_uploads.public(state)
+    return {"Upload-Offset": str(public["offset"]), "Upload-Length": str(public["size"]), "Cache-Control": "no-store"}
+
+@router.post("/api/uploads", status_code=201)
+async def create_upload(request: CreateUploadRequest, response: Response):
+    """Start a resumable upload; the data file is preallocated to `size`."""
+    state = await asyncio.to_thread(resumable_uploads.create, request.filename, request.size, request.sha256)
+    response.headers.update({**_upload_headers(state), "Location": f"/api/uploads/{state['upload_id']}"})
+    return resumable_uploads.public(state)
+
+@router.head("/api/uploads/{upload_id}")
+async def upload_offset(upload_id: str):
+    """Offset to resume from, as Upload-Offset (tus HEAD)."""
+    return Response(status_code=200, headers=_upload_headers(resumable_uploads.get(upload_id)))
+
+@router.get("/api/uploads/{upload_id}")
+async def upload_progress(upload_id: str, response: Response):
+    """Offset, received bytes and missing ranges of a resumable upload."""
+    state = resumable_uploads.get(upload_id)
+    response.headers.update(_upload_headers(state))
+    return resumable_uploads.public(state)
+
+@router.put("/api/uploads/{upload_id}")
+@router.patch("/api/uploads/{upload_id}")
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    response: Response,
+    upload_offset: Optional[int] = Header(None),
+    upload_checksum: Optional[str] = Header(None),
+    offset: Optional[int] = None,
+):
+    """
+    Write the request body at Upload-Offset (or ?offset=). Ranges may arrive
+    in any order or in parallel; a checksum mismatch answers 460 and the
+    chunk must be resent.
+    """
+    start = upload_offset if upload_offset is not None else offset
+    if start is None:
+        raise HTTPException(status_code=400, detail="Upload-Offset header or ?offset= is required")
+    length = request.headers.get("content-length")
+    state = await resumable_uploads.write_chunk(
+        upload_id, start, request.stream(), upload_checksum, int(length) if length else None,
+    )
+    response.headers.update(_upload_headers(state))
+    return resumable_uploads.public(state)
+
+@router.post("/api/uploads/{upload_id}/complete")
+async def complete_upload(upload_id: str):
+    """
+    Verify every byte arrived (and the declared sha256, if any), then hand the
+    file to the same dedup + extraction path as /api/upload. Safe to retry.
+    """
+    state = await asyncio.to_thread(resumable_uploads.finalize, upload_id)
+    if state["status"] == "completed":
+        return state["result"]
+    try:
+        result = queue_ingestion(state["data_path"], state["filename"], state["sha256"], state["size"])
+    except Exception:
+        if os.path.exists(state["data_path"]):
+            resumable_uploads.reopen(upload_id)  # e.g. ingestion queue full: finalize again later
+        raise
+    resumable_uploads.complete(upload_id, result)
+    logger.info(f"Resumable upload {upload_id} finalized: {state['filename']} ({state['size']} bytes)")
+    return result
+
+@router.delete("/api/uploads/{upload_id}", status_code=204)
+async def abort_upload(upload_id: str):
+    """Abandon a resumable upload and free its disk space."""
+    resumable_uploads.get(upload_id)
+    resumable_uploads.delete(upload_id)
+    return Response(status_code=204)
+
+def retrieve_chunks(query: str, files: List[str], mode: Optional[str] = None) -> List[dict]:
+    """Top chunks for a query via BM25, dense vectors, or both fused (RRF)."""
+    mode = (mode or RAG_RETRIEVAL_MODE).lower()
+    if mode not in RETRIEVAL_MODES:
+        mode = "hybrid"
+    
+    lexical = rag_index.search(query, k=RAG_TOP_K, doc_ids=files) if mode != "vector" else []
+    dense = vector_index.search(query, k=RAG_TOP_K, doc_ids=files) if mode != "bm25" else []
+    if mode == "hybrid":
+        return fuse_rankings(lexical, dense, k=RAG_TOP_K)
+    return lexical or dense
+
+RAG_SYSTEM_PROMPT = """You are Mandelbrot's Neural Intelligence.
+    
+    MISSION:
+    Provide high-precision analysis of the provided documents. Your goal is to extract actionable insights, summarize complex data, and answer the user's queries with expert-level accuracy.
+    
+    CONTEXT:
+    {context}
+    
+    USER QUERY:
+    {message}
+    
+    INSTRUCTIONS:
+    1. If relevant information is found, cite the specific file (e.g. [data.csv]).
+    2. Format response in clean Markdown (bullet points, bold key terms).
+    3. Maintain a professional, futuristic tone ("Analysis complete", "Query resolution").
+    4. If the info is missing, state clearly: "Data not found in context."
+    """
+
+def resolve_context_files(request: ChatRequest) -> Tuple[Dict[str, str], str]:
+    """Stored documents the request refers to (doc_id → label), plus notes on files that aren't available."""
+    notes = ""
+    
+    # Drop documents another worker evicted, then resolve filenames (or doc ids) to stored docs
+    names = document_store.names()
+    drop_from_indexes([d for d in list(rag_index.docs) if d not in document_store])
+    target_files = request.context_files if request.context_files else list(names)
+    labels = {}
+    ingesting = pending_filenames()
+    for fname in target_files:
+        doc_id = names.get(fname) or document_store.resolve(fname)
+        if doc_id is not None:
+            labels.setdefault(doc_id, fname if fname in names else document_store.display_name(doc_id))
+        elif fname in ingesting:
+            notes += f"\n=== FILE: {fname} (Still Ingesting) ===\n"
+        else:
+            notes += f"\n=== FILE: {fname} (Not Found) ===\n"
+    return labels, notes
+
+async def prepare_rag_messages(request: ChatRequest):
+    """Resolve the request's files, load any this worker hasn't indexed yet, then build the prompt."""
+    labels, notes = resolve_context_files(request)
+    await ensure_indexed(labels)
+    return build_rag_messages(request, labels, notes)
+
+def build_rag_messages(request: ChatRequest, labels: Dict[str, str], notes: str):
+    """
+    Assemble the RAG prompt over already indexed documents; returns
+    (messages, number of files used, token usage).
+    """
+    found_docs = [doc_id for doc_id in labels if doc_id in rag_index]
+    valid_files = len(found_docs)
+    
+    # Rank chunks of the selected files against the query
+    hits = retrieve_chunks(request.message, found_docs, request.retrieval) if found_docs else []
+    if not hits:
+        # Nothing matched lexically (e.g. "summarize this") — use each file's opening chunks
+        per_file = max(1, RAG_TOP_K // max(1, valid_files))
+        hits = [h for doc_id in found_docs for h in rag_index.leading_chunks(doc_id, per_file)]
+    
+    # Fill the model's token budget best-ranked first, then present chunks in document order
+    fixed = RAG_SYSTEM_PROMPT.format(context=notes, message=request.message) + request.message
+    budget = prompt_budget(GROQ_MODEL, GROQ_MAX_TOKENS, fixed)
+    packer = ContextPacker(min(budget, RAG_CONTEXT_TOKENS) if RAG_CONTEXT_TOKENS > 0 else budget)
+    for rank, hit in enumerate(hits):
+        header = f"\n=== FILE: {labels[hit['doc']]} (chunk {hit['position'] + 1}) ===\n"
+        text = document_store.chunk(hit["doc"], hit["position"])  # Indexes hold positions only
+        packer.add(header + text + "\n", priority=-rank, min_tokens=64, label=labels[hit["doc"]], position=hit["position"])
+    context_buffer = notes + "".join(item["text"] for item in sorted(packer.pack(), key=lambda i: (i["label"], i["position"])))
+
+    if not context_buffer.strip():
+         context_buffer = "No documents uploaded."
+
+    messages = [
+        {"role": "system", "content": RAG_SYSTEM_PROMPT.format(context=context_buffer, message=request.message)},
+        {"role": "user", "content": request.message}
+    ]
+    return messages, valid_files, usage_report(GROQ_MODEL, messages, packer, GROQ_MAX_TOKENS)
+
 @router.post("/api/chat-rag")
 async def chat_rag(request: ChatRequest):
     """RAG Chat with Smart Context."""
     logger.info(f"Chat Request: {request.message}")
     
     try:
-        context_buffer = ""
-        valid_files = 0
-        
-        target_files = request.context_files if request.context_files else list(document_store.keys())
-        
-        for fname in target_files:
-            if fname in document_store:
-                doc_data = document_store[fname]
-                # Limit per-file context to avoid prompt overflow
-                context_buffer += f"\n=== FILE: {fname} ===\n{doc_data['text'][:15000]}\n" # 15k chars per file max
-                valid_files += 1
-            else:
-                context_buffer += f"\n=== FILE: {fname} (Not Found) ===\n"
-
-        if not context_buffer.strip():
-             context_buffer = "No documents uploaded."
-
-        system_prompt = f"""You are Mandelbrot's Neural Intelligence.
-        
-        MISSION:
-        Provide high-precision analysis of the provided documents. Your goal is to extract actionable insights, summarize complex data, and answer the user's queries with expert-level accuracy.
-        
-        CONTEXT:
-        {context_buffer[:20000]} # Optimized Context Window (20k chars)
-        
-        USER QUERY:
-        {request.message}
-        
-        INSTRUCTIONS:
-        1. If relevant information is found, cite the specific file (e.g. [data.csv]).
-        2. Format response in clean Markdown (bullet points, bold key terms).
-        3. Maintain a professional, futuristic tone ("Analysis complete", "Query resolution").
-        4. If the info is missing, state clearly: "Data not found in context."
-        """
-        
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": request.message}
-        ]
+        messages, valid_files, usage = await prepare_rag_messages(request)
         
         response_text = await call_groq_api(messages)
         
         return {
             "response": response_text,
-            "context_used": valid_files
+            "context_used": valid_files,
+            "usage": usage
         }
     except Exception as e:
         logger.error(f"Chat error: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/api/chat-rag/stream")
+async def chat_rag_stream(request: ChatRequest):
+    """RAG Chat streamed as `chat.delta` events, then `chat.completed`."""
+    logger.info(f"Chat Stream Request: {request.message}")
+    
+    async def events():
+        try:
+            messages, valid_files, usage = await prepare_rag_messages(request)
+            parts = []
+            async for delta in stream_groq_api(messages):
+                parts.append(delta)
+                yield sse_event(EVENT_CHAT_DELTA, {"delta": delta})
+            yield sse_event(EVENT_CHAT_COMPLETED, {
+                "response": "".join(parts),
+                "context_used": valid_files,
+                "usage": usage
+            })
+        except Exception as e:
+            logger.error(f"Chat stream error: {traceback.format_exc()}")
+            yield sse_event(EVENT_ERROR, {"error": str(e)})
+    
+    return sse_response(events())
@@ -0,0 +1,153 @@
+"""
+Neural Workflow Engine — Token-Aware Context Budgeting
+Counts tokens locally (tiktoken when installed, a calibrated regex estimate
+otherwise), knows each model's context window, and packs prompt context by
+priority so requests neither overflow the window nor waste it.
+"""
+
+import os
+import re
+import math
+import logging
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# ─── Config ───────────────────────────────────────────────────────────────────
+# Context window (prompt + completion) per model, in tokens
+MODEL_CONTEXT_WINDOWS: Dict[str, int] = {
+    "llama3-70b-8192": 8192,
+    "llama3-8b-8192": 8192,
+    "llama-3.3-70b-versatile": 131072,
+    "google/gemini-2.0-flash-001": 1048576,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+
+try:
+    # Cost/latency ceiling on prompt size, even for models with huge windows (0 = window only)
+    MAX_PROMPT_TOKENS = int(os.getenv("MAX_PROMPT_TOKENS", 32000))
+except ValueError:
+    MAX_PROMPT_TOKENS = 32000
+
+SAFETY_MARGIN = 0.05  # The estimate is approximate; keep 5% of the window spare
+
+# ─── Token Counting ───────────────────────────────────────────────────────────
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:  # Optional dependency (or its BPE file is unavailable offline)
+    _ENCODING = None
+
+# Word runs cost about one token per 4 characters; every symbol costs one
+_PIECE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+
+def count_tokens(text: str) -> int:
+    """Approximate token count of `text`."""
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    return sum(math.ceil(len(p) / 4) if p[0].isalnum() or p[0] == "_" else 1 for p in _PIECE.findall(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Longest prefix of `text` that fits in `max_tokens` (cut at a word boundary)."""
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if count_tokens(text[:mid]) <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    cut = text.rfind(" ", 0, lo)
+    return text[:cut if cut > lo // 2 else lo].rstrip()
+
+
+def context_window(model: str) -> int:
+    return MODEL_CONTEXT_WINDOWS.get(model, DEFAULT_CONTEXT_WINDOW)
+
+
+def prompt_budget(model: str, max_output_tokens: int, fixed_text: str = "") -> int:
+    """
+    Tokens left for packed context once the completion allowance, the
+    non-negotiable prompt text and the safety margin are taken out.
+    """
+    window = context_window(model)
+    available = int(window * (1 - SAFETY_MARGIN)) - max_output_tokens
+    if MAX_PROMPT_TOKENS > 0:
+        available = min(available, MAX_PROMPT_TOKENS)
+    return max(0, available - count_tokens(fixed_text))
+
+# ─── Packing ──────────────────────────────────────────────────────────────────
+class ContextPacker:
+    """
+    Collects context items and fills a token budget by priority.
+
+    Higher-priority items are placed first; an item that does not fit is
+    truncated when `truncatable` (and at least `min_tokens` would survive),
+    otherwise dropped. Packed items come back in the order they were added.
+    """
+
+    def __init__(self, budget: int):
+        self.budget = budget
+        self.items: List[dict] = []
+
+    def add(self, text: str, priority: float = 0.0, truncatable: bool = True, min_tokens: int = 32, **meta):
+        self.items.append({
+            "text": text,
+            "priority": priority,
+            "truncatable": truncatable,
+            "min_tokens": min_tokens,
+            "tokens": count_tokens(text),
+            "order": len(self.items),
+            **meta,
+        })
+
+    def pack(self) -> List[dict]:
+        remaining = self.budget
+        self.truncated, self.dropped = 0, 0
+        packed = []
+        for item in sorted(self.items, key=lambda i: (-i["priority"], i["order"])):
+            if item["tokens"] <= remaining:
+                packed.append(item)
+                remaining -= item["tokens"]
+            elif item["truncatable"] and remaining >= item["min_tokens"]:
+                text = truncate_to_tokens(item["text"], remaining)
+                tokens = count_tokens(text)
+                packed.append({**item, "text": text, "tokens": tokens})
+                remaining -= tokens
+                self.truncated += 1
+            else:
+                self.dropped += 1
+        self.used = self.budget - remaining
+        return sorted(packed, key=lambda i: i["order"])
+
+    def report(self) -> dict:
+        return {
+            "context_budget": self.budget,
+            "context_tokens": getattr(self, "used", 0),
+            "items": len(self.items),
+            "truncated": getattr(self, "truncated", 0),
+            "dropped": getattr(self, "dropped", 0),
+        }
+
+
+def usage_report(model: str, messages: List[dict], packer: Optional[ContextPacker] = None, max_output_tokens: int = 0) -> dict:
+    """Token accounting for one upstream request (returned to clients as `usage`)."""
+    prompt_tokens = sum(count_tokens(m["content"]) for m in messages)
+    report = {
+        "model": model,
+        "context_window": context_window(model),
+        "prompt_tokens": prompt_tokens,
+        "max_output_tokens": max_output_tokens,
+        "tokenizer": "tiktoken" if _ENCODING is not None else "estimate",
+    }
+    if packer is not None:
+        report.update(packer.report())
+    logger.info(f"Prompt usage: {prompt_tokens} tokens for {model} (window {report['context_window']})")
+    return report
@@ -0,0 +1,157 @@
+"""
+Neural Workflow Engine — DAG Step Scheduler
+Runs planner steps as a dependency graph: a step starts as soon as every step
+in its `depends_on` list has finished, with a bounded number running at once.
+A step whose dependency failed (or was itself skipped) is skipped, not run.
+"""
+
+import os
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# ─── Config ───────────────────────────────────────────────────────────────────
+try:
+    WORKFLOW_MAX_PARALLEL_STEPS = max(1, int(os.getenv("WORKFLOW_MAX_PARALLEL_STEPS", 4)))
+except ValueError:
+    WORKFLOW_MAX_PARALLEL_STEPS = 4
+
+FAILED_STATUSES = ("error", "skipped")  # Step results dependents must not build on
+
+# ─── Helpers ──────────────────────────────────────────────────────────────────
+def normalize_step(step: dict, seen: List[int], has_edges: bool) -> dict:
+    """
+    Normalize one step given the ids of the steps before it (appended to
+    `seen`). Lets streamed plans be normalized step by step with the same
+    result as normalize_dependencies on the whole plan.
+    """
+    try:
+        step_id = int(step.get("id"))
+    except (TypeError, ValueError):
+        step_id = None
+    if step_id is None or step_id in seen:
+        step_id = max(seen, default=0) + 1
+
+    if has_edges:
+        raw = step.get("depends_on") or []
+        if not isinstance(raw, list):
+            raw = [raw]
+        deps = []
+        for dep in raw:
+            try:
+                dep = int(dep)
+            except (TypeError, ValueError):
+                continue
+            if dep in seen and dep not in deps:
+                deps.append(dep)
+    else:
+        deps = [seen[-1]] if seen else []
+
+    seen.append(step_id)
+    return {**step, "id": step_id, "depends_on": deps}
+
+
+def normalize_dependencies(steps: List[dict]) -> List[dict]:
+    """
+    Return steps with a clean `depends_on` list on each one.
+
+    Only edges to steps that appear earlier in the plan are kept, which makes
+    the graph acyclic by construction. Plans without any `depends_on` keys
+    (older planner output) are treated as a linear chain, matching the old
+    sequential behaviour.
+    """
+    has_edges = any("depends_on" in step for step in steps)
+    seen = []
+    return [normalize_step(step, seen, has_edges) for step in steps]
+
+
+def step_failed(result: dict) -> bool:
+    return isinstance(result, dict) and result.get("status") in FAILED_STATUSES
+
+
+def skipped_result(step: dict, failed: List[int]) -> dict:
+    """Result recorded for a step that was not run because a dependency failed."""
+    return {
+        "step_id": step["id"],
+        "tool": step.get("tool"),
+        "action": step.get("action"),
+        "status": "skipped",
+        "error": f"Skipped: depends on failed step {', '.join(map(str, failed))}",
+    }
+
+
+def critical_path_length(steps: List[dict]) -> int:
+    """Number of steps on the longest dependency chain."""
+    depth = {}
+    for step in steps:
+        depth[step["id"]] = 1 + max((depth.get(d, 0) for d in step["depends_on"]), default=0)
+    return max(depth.values(), default=0)
+
+
+class DagRunner:
+    """
+    Incremental run_dag: steps may be added while earlier ones are already
+    running (e.g. as the planner streams them). A step's dependencies must
+    have been added before it. `on_skip(step, result)` is awaited for each
+    step skipped because a dependency failed.
+    """
+
+    def __init__(
+        self,
+        run_step: Callable[[dict, Dict[int, dict]], Awaitable[dict]],
+        max_parallel: int = WORKFLOW_MAX_PARALLEL_STEPS,
+        on_skip: Optional[Callable[[dict, dict], Awaitable[None]]] = None,
+    ):
+        self.run_step = run_step
+        self.on_skip = on_skip
+        self.semaphore = asyncio.Semaphore(max_parallel)
+        self.tasks: Dict[int, asyncio.Task] = {}
+
+    async def _run(self, step: dict) -> dict:
+        upstream = {}
+        for dep in step["depends_on"]:
+            upstream[dep] = await self.tasks[dep]
+        failed = [dep for dep, result in upstream.items() if step_failed(result)]
+        if failed:
+            result = skipped_result(step, failed)
+            if self.on_skip is not None:
+                await self.on_skip(step, result)
+            return result
+        async with self.semaphore:
+            return await self.run_step(step, upstream)
+
+    def add(self, step: dict):
+        """Start `step` as soon as its dependencies finish."""
+        self.tasks[step["id"]] = asyncio.create_task(self._run(step))
+
+    def cancel(self):
+        for task in self.tasks.values():
+            task.cancel()
+
+    async def results(self) -> List[dict]:
+        """Wait for every added step; results in the order steps were added."""
+        try:
+            return list(await asyncio.gather(*self.tasks.values()))
+        except BaseException:
+            self.cancel()
+            raise
+
+
+async def run_dag(
+    steps: List[dict],
+    run_step: Callable[[dict, Dict[int, dict]], Awaitable[dict]],
+    max_parallel: int = WORKFLOW_MAX_PARALLEL_STEPS,
+    on_skip: Optional[Callable[[dict, dict], Awaitable[None]]] = None,
+) -> List[dict]:
+    """
+    Execute normalized steps concurrently in dependency order.
+
+    `run_step(step, upstream)` receives only the results of the step's direct
+    dependencies, keyed by step id. Results are returned in plan order.
+    """
+    runner = DagRunner(run_step, max_parallel, on_skip)
+    for step in steps:
+        runner.add(step)
+    return await runner.results()
@@ -0,0 +1,317 @@
+"""
+Neural Workflow Engine — Document Store
+Extracted chunks and chunk vectors on disk, shared by every uvicorn
+worker. Reads go through mmap (zero-copy); a small LRU keeps the hottest
+documents' maps open; a byte budget evicts the coldest documents.
+
+Layout under DOCSTORE_DIR (doc_id = sha256 of the uploaded bytes):
+    catalog.db             SQLite (WAL): documents + filename → doc_id names
+    <doc_id>.chunks        chunk texts, concatenated (UTF-8)
+    <doc_id>.offsets.npy   int64 [n_chunks, 2]: byte start, byte end in .chunks
+    <doc_id>.vec.npy       float32 [n_chunks, dim] chunk embeddings
+    <doc_id>.postings.npz  BM25 postings over the chunks (app.retrieval.Postings)
+    pdf_pages.db           SQLite (WAL): PDF page text by page fingerprint (app.pdf_pages)
+"""
+
+import os
+import time
+import mmap
+import shutil
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.retrieval import Postings, PostingsBuilder
+
+logger = logging.getLogger(__name__)
+
+# ─── Config ───────────────────────────────────────────────────────────────────
+DOCSTORE_DIR = os.getenv("DOCSTORE_DIR", "docstore")
+try:
+    DOCSTORE_MAX_BYTES = int(os.getenv("DOCSTORE_MAX_BYTES", 2 * 1024 ** 3))
+    DOCSTORE_HOT_DOCS = int(os.getenv("DOCSTORE_HOT_DOCS", 32))
+except ValueError:
+    DOCSTORE_MAX_BYTES, DOCSTORE_HOT_DOCS = 2 * 1024 ** 3, 32
+
+ACCESS_WRITE_INTERVAL = 60.0  # Seconds between last_access updates per document
+COPY_BLOCK_SIZE = 1024 * 1024
+
+_SUFFIXES = (".chunks", ".offsets.npy", ".vec.npy", ".postings.npz")
+_LEGACY_SUFFIXES = (".txt",)  # Written by older versions; removed with the document
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    doc_id      TEXT PRIMARY KEY,
+    filename    TEXT NOT NULL,
+    bytes       INTEGER NOT NULL,
+    chunks      INTEGER NOT NULL,
+    created_at  REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_documents_access ON documents (last_access);
+CREATE TABLE IF NOT EXISTS names (
+    filename   TEXT PRIMARY KEY,
+    doc_id     TEXT NOT NULL REFERENCES documents (doc_id) ON DELETE CASCADE,
+    updated_at REAL NOT NULL
+);
+"""
+
+# ─── Writing (safe to call from ingestion worker processes) ───────────────────
+class DocumentWriter:
+    """
+    Streams one document's data files to disk: chunks and their vectors
+    batch by batch, so a worker never holds the
+    whole document. BM25 postings are collected along the way, so no
+    server worker ever has to tokenize the chunks again. Nothing appears
+    under the final names until commit(); abort() removes the partial files.
+    """
+
+    def __init__(self, directory: str, doc_id: str, dim: int):
+        os.makedirs(directory, exist_ok=True)
+        self.base = os.path.join(directory, doc_id)
+        self.dim = dim
+        self.chunk_count = 0
+        self._position = 0  # Bytes written to .chunks
+        self._chunks = open(self.base + ".chunks.tmp", "wb")
+        # Row counts aren't known until the end: rows go to raw files, .npy headers are added at commit
+        self._offsets = open(self.base + ".offsets.raw.tmp", "wb")
+        self._vectors = open(self.base + ".vec.raw.tmp", "wb")
+        self._postings = PostingsBuilder()
+
+    def add_chunks(self, chunks: List[dict], vectors: np.ndarray):
+        offsets = np.zeros((len(chunks), 2), dtype=np.int64)
+        for i, chunk in enumerate(chunks):
+            self._postings.add(chunk["text"])
+            data = chunk["text"].encode("utf-8")
+            self._chunks.write(data)
+            offsets[i] = (self._position, self._position + len(data))
+            self._position += len(data)
+        self._offsets.write(offsets.tobytes())
+        self._vectors.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        self.chunk_count += len(chunks)
+
+    def _close_files(self):
+        for f in (self._chunks, self._offsets, self._vectors):
+            f.close()
+
+    def _finish_npy(self, suffix: str, dtype, columns: int):
+        raw_path = self.base + suffix + ".raw.tmp"
+        header = {"descr": np.lib.format.dtype_to_descr(np.dtype(dtype)), "fortran_order": False, "shape": (self.chunk_count, columns)}
+        with open(self.base + suffix + ".npy.tmp", "wb") as out, open(raw_path, "rb") as raw:
+            np.lib.format.write_array_header_1_0(out, header)
+            shutil.copyfileobj(raw, out, COPY_BLOCK_SIZE)
+        os.remove(raw_path)
+
+    def commit(self) -> int:
+        """Publish the files atomically; returns bytes on disk."""
+        self._close_files()
+        self._finish_npy(".offsets", np.int64, 2)
+        self._finish_npy(".vec", np.float32, self.dim)
+        with open(self.base + ".postings.npz.tmp", "wb") as f:
+            self._postings.build().save(f)
+        total = 0
+        for suffix in _SUFFIXES:
+            os.replace(self.base + suffix + ".tmp", self.base + suffix)
+            total += os.path.getsize(self.base + suffix)
+        return total
+
+    def abort(self):
+        self._close_files()
+        for suffix in (".chunks", ".offsets.raw", ".vec.raw", ".offsets.npy", ".vec.npy", ".postings.npz"):
+            try:
+                os.remove(self.base + suffix + ".tmp")
+            except FileNotFoundError:
+                pass
+
+# ─── Hot Set ──────────────────────────────────────────────────────────────────
+class _OpenDocument:
+    """Memory maps for one document."""
+
+    def __init__(self, base: str):
+        self._files = []
+        self.chunks = self._map(base + ".chunks")
+        self.offsets = np.load(base + ".offsets.npy", mmap_mode="r")
+        self.vectors = np.load(base + ".vec.npy", mmap_mode="r")
+
+    def _map(self, path: str):
+        f = open(path, "rb")
+        self._files.append(f)
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        if isinstance(self.chunks, mmap.mmap):
+            self.chunks.close()
+        for f in self._files:
+            f.close()
+
+# ─── Store ────────────────────────────────────────────────────────────────────
+class DocumentStore:
+    def __init__(self, directory: str = DOCSTORE_DIR, max_bytes: int = DOCSTORE_MAX_BYTES, hot_docs: int = DOCSTORE_HOT_DOCS):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hot_docs = hot_docs
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.RLock()
+        self._hot: "OrderedDict[str, _OpenDocument]" = OrderedDict()
+        self._last_access_write: Dict[str, float] = {}
+        self._conn = sqlite3.connect(os.path.join(directory, "catalog.db"), timeout=10.0, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(_SCHEMA)
+
+    # ─── Catalog ──────────────────────────────────────────────────────────────
+    def register(self, doc_id: str, filename: str, size: int, chunks: int) -> List[str]:
+        """Publish written files; returns doc_ids evicted to stay within budget."""
+        now = time.time()
+        with self._lock:
+            # An upsert, not a REPLACE: deleting the row would cascade to the document's other names
+            self._conn.execute(
+                "INSERT INTO documents (doc_id, filename, bytes, chunks, created_at, last_access) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(doc_id) DO UPDATE SET filename = excluded.filename, bytes = excluded.bytes, "
+                "chunks = excluded.chunks, last_access = excluded.last_access",
+                (doc_id, filename, size, chunks, now, now),
+            )
+            self._close_hot(doc_id)
+        self.add_name(filename, doc_id)
+        return self.evict_to_budget(keep=doc_id)
+
+    def add_name(self, filename: str, doc_id: str):
+        """Point a filename at a document (latest upload of a name wins; old doc stays addressable by id)."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO names (filename, doc_id, updated_at) VALUES (?, ?, ?)",
+                (filename, doc_id, time.time()),
+            )
+
+    def resolve(self, name_or_id: str) -> Optional[str]:
+        """doc_id for a filename or a doc_id, if the document is stored."""
+        with self._lock:
+            row = self._conn.execute("SELECT doc_id FROM names WHERE filename = ?", (name_or_id,)).fetchone()
+            if row:
+                return row["doc_id"]
+            row = self._conn.execute("SELECT doc_id FROM documents WHERE doc_id = ?", (name_or_id,)).fetchone()
+            return row["doc_id"] if row else None
+
+    def names(self) -> Dict[str, str]:
+        """filename → doc_id for every stored document."""
+        with self._lock:
+            rows = self._conn.execute("SELECT filename, doc_id FROM names ORDER BY updated_at").fetchall()
+        return {row["filename"]: row["doc_id"] for row in rows}
+
+    def display_name(self, doc_id: str) -> str:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT filename FROM names WHERE doc_id = ? ORDER BY updated_at DESC LIMIT 1", (doc_id,)
+            ).fetchone()
+        return row["filename"] if row else doc_id
+
+    def __contains__(self, doc_id: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM documents WHERE doc_id = ?", (doc_id,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    @property
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM documents").fetchone()[0]
+
+    # ─── Reads ────────────────────────────────────────────────────────────────
+    def _open(self, doc_id: str) -> _OpenDocument:
+        with self._lock:
+            doc = self._hot.get(doc_id)
+            if doc is None:
+                doc = _OpenDocument(os.path.join(self.directory, doc_id))
+                self._hot[doc_id] = doc
+                while len(self._hot) > self.hot_docs:
+                    _, cold = self._hot.popitem(last=False)
+                    cold.close()
+            self._hot.move_to_end(doc_id)
+            self._touch(doc_id)
+            return doc
+
+    def _touch(self, doc_id: str):
+        now = time.time()
+        if now - self._last_access_write.get(doc_id, 0.0) >= ACCESS_WRITE_INTERVAL:
+            self._last_access_write[doc_id] = now
+            self._conn.execute("UPDATE documents SET last_access = ? WHERE doc_id = ?", (now, doc_id))
+
+    def chunk(self, doc_id: str, position: int) -> str:
+        doc = self._open(doc_id)
+        start, end = doc.offsets[position, :2]  # Older stores have a third column
+        return doc.chunks[int(start):int(end)].decode("utf-8", errors="ignore")
+
+    def postings(self, doc_id: str) -> Postings:
+        """
+        The document's BM25 postings, read from disk (blocking: call from a
+        thread). Documents stored before postings were persisted get theirs
+        built from the chunk texts once and written back.
+        """
+        path = os.path.join(self.directory, doc_id + ".postings.npz")
+        try:
+            return Postings.load(path)
+        except FileNotFoundError:
+            pass
+        doc = self._open(doc_id)
+        builder = PostingsBuilder()
+        for start, end in doc.offsets[:, :2]:
+            builder.add(doc.chunks[int(start):int(end)].decode("utf-8", errors="ignore"))
+        postings = builder.build()
+        with open(path + ".tmp", "wb") as f:
+            postings.save(f)
+        os.replace(path + ".tmp", path)
+        return postings
+
+    def vectors(self, doc_id: str) -> np.ndarray:
+        return self._open(doc_id).vectors
+
+    # ─── Eviction ─────────────────────────────────────────────────────────────
+    def _close_hot(self, doc_id: str):
+        doc = self._hot.pop(doc_id, None)
+        if doc is not None:
+            doc.close()
+
+    def delete(self, doc_id: str):
+        with self._lock:
+            self._close_hot(doc_id)
+            self._conn.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
+            for suffix in _SUFFIXES + _LEGACY_SUFFIXES:
+                path = os.path.join(self.directory, doc_id + suffix)
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def evict_to_budget(self, keep: Optional[str] = None) -> List[str]:
+        """Delete least recently used documents until the byte budget is met."""
+        evicted = []
+        with self._lock:
+            total = self.total_bytes
+            if total <= self.max_bytes:
+                return evicted
+            rows = self._conn.execute("SELECT doc_id, bytes FROM documents ORDER BY last_access").fetchall()
+            for row in rows:
+                if total <= self.max_bytes:
+                    break
+                if row["doc_id"] == keep:
+                    continue
+                self.delete(row["doc_id"])
+                total -= row["bytes"]
+                evicted.append(row["doc_id"])
+        if evicted:
+            logger.info(f"Document store evicted {len(evicted)} cold documents (budget {self.max_bytes / 2**20:.0f} MB)")
+        return evicted
+
+    def close(self):
+        with self._lock:
+            for doc_id in list(self._hot):
+                self._close_hot(doc_id)
+            self._conn.close()
@@ -0,0 +1,190 @@
+"""
+Neural Workflow Engine — Extraction Pipeline
+Turns an uploaded file into a lazy stream of text segments. Each format has
+a handler (a generator registered by file extension) that yields segment
+dicts: the text plus where it came from — `page`, `sheet`, `rows` ([first,
+last]) or byte `offset`. Chunking, embedding and storage consume the stream
+one segment at a time, so memory follows the chunk size, not the file size.
+
+Adding a format is one decorated generator:
+
+    @register_handler("rtf")
+    def _extract_rtf(file_path: str, filename: str) -> Iterator[dict]:
+        ...
+"""
+
+import io
+import os
+import codecs
+import logging
+from typing import Callable, Dict, Iterator
+
+from app.binary_strings import iter_strings
+from app.ingestion import report_progress
+from app.pdf_pages import iter_pdf_pages
+from app.profiling import profile_csv, profile_workbook, workbook_sections
+
+logger = logging.getLogger(__name__)
+
+# Mandatory Imports (Fail hard if missing to debug environment)
+try:
+    import pandas as pd
+except ImportError as e:
+    logger.error(f"Critical Dependency Missing: {e}")
+    pass
+
+# ─── Config ───────────────────────────────────────────────────────────────────
+try:
+    PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", 0))  # 0 = every page
+    EXTRACT_TEXT_MAX_CHARS = int(os.getenv("EXTRACT_TEXT_MAX_CHARS", 100_000))  # 0 = whole file
+except ValueError:
+    PDF_MAX_PAGES, EXTRACT_TEXT_MAX_CHARS = 0, 100_000
+
+TEXT_BLOCK_SIZE = 64 * 1024
+GENERIC_TEXT_BYTES = 50_000   # Unknown extensions: sniffed as UTF-8 text
+
+Handler = Callable[[str, str], Iterator[dict]]
+
+# ─── Registry ─────────────────────────────────────────────────────────────────
+HANDLERS: Dict[str, Handler] = {}
+
+
+def register_handler(*extensions: str):
+    """Register a segment generator `handler(file_path, filename)` for file extensions."""
+    def decorator(handler: Handler) -> Handler:
+        for ext in extensions:
+            HANDLERS[ext.lower().lstrip(".")] = handler
+        return handler
+    return decorator
+
+
+def iter_segments(file_path: str, filename: str) -> Iterator[dict]:
+    """
+    Segments for a file from the handler for its extension. If the handler
+    fails before producing anything, the raw-strings fallback recovers what
+    it can from the file's bytes; if it fails part-way, what it produced is
+    kept and marked as incomplete (a rescan of the whole file would repeat
+    the text already streamed).
+    """
+    ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    handler = HANDLERS.get(ext, _extract_unknown)
+    produced = False
+    try:
+        for segment in handler(file_path, filename):
+            produced = True
+            yield segment
+    except Exception as e:
+        if produced:
+            logger.warning(f"Standard extraction stopped early for {filename}: {e}. Keeping the partial output.")
+            yield {"text": f"\n...[Extraction stopped early: {e}]...\n"}
+            return
+        logger.warning(f"Standard extraction failed for {filename}: {e}. Attempting Raw Strings Fallback.")
+        yield from _extract_raw_strings(file_path, e)
+
+# ─── Handlers ─────────────────────────────────────────────────────────────────
+@register_handler("pdf")
+def _extract_pdf(file_path: str, filename: str) -> Iterator[dict]:
+    # Every page (or PDF_MAX_PAGES), parsed in parallel page batches and cached per page
+    def progress(done: int, total: int, cached: int):
+        report_progress(done, total, "pages", cached=cached)
+
+    found = False
+    pages = iter_pdf_pages(file_path, PDF_MAX_PAGES, progress)
+    while True:
+        try:
+            number, page_text = next(pages)
+        except StopIteration as end:  # The generator returns the document's page count
+            page_count = end.value
+            break
+        if page_text:
+            found = True
+            yield {"text": f"[Page {number+1}]\n{page_text}\n", "page": number + 1}
+    if PDF_MAX_PAGES and page_count > PDF_MAX_PAGES:
+        yield {"text": f"\n...[PDF Truncated at {PDF_MAX_PAGES} pages]...", "page": PDF_MAX_PAGES + 1}
+    elif not found:
+        yield {"text": "[Warning: Scanned PDF detected. No text found.]"}
+
+
+@register_handler("csv")
+def _extract_csv(file_path: str, filename: str) -> Iterator[dict]:
+    # Stream the whole file in chunks: column profile + sampled rows
+    yield {"text": profile_csv(file_path)}
+
+
+@register_handler("xlsx", "xlsm")
+def _extract_workbook(file_path: str, filename: str) -> Iterator[dict]:
+    # Every sheet, streamed row by row: an overview, then one profile segment per sheet
+    sheets = profile_workbook(file_path)
+    rows = {title: profiler.rows for title, profiler, _ in sheets}
+    for sheet, text in workbook_sections(sheets, os.path.getsize(file_path) / (1024 * 1024)):
+        yield {"text": text, "sheet": sheet, "rows": [1, rows[sheet]]} if sheet is not None else {"text": text}
+
+
+@register_handler("xls")
+def _extract_xls(file_path: str, filename: str) -> Iterator[dict]:
+    # Legacy binary format (needs xlrd); openpyxl only reads the XML formats
+    df = pd.read_excel(file_path, nrows=500)
+    yield {"text": df.to_markdown(index=False), "rows": [1, len(df)]}
+    yield {"text": "\n...[Excel Truncated at 500 rows]..."}
+
+
+def _text_decoder(errors: str = "strict") -> io.IncrementalNewlineDecoder:
+    """UTF-8 with universal newlines, like open(..., "r"), for byte blocks."""
+    return io.IncrementalNewlineDecoder(codecs.getincrementaldecoder("utf-8")(errors=errors), translate=True)
+
+
+@register_handler("txt", "md", "json", "js", "py", "html", "css", "xml", "log")
+def _extract_text(file_path: str, filename: str) -> Iterator[dict]:
+    """UTF-8 text in blocks; each segment records the byte offset its block starts at."""
+    decoder = _text_decoder(errors="replace")
+    offset = chars = 0
+    with open(file_path, "rb") as f:
+        while True:
+            block = f.read(TEXT_BLOCK_SIZE)
+            text = decoder.decode(block, final=not block)
+            if EXTRACT_TEXT_MAX_CHARS and chars + len(text) >= EXTRACT_TEXT_MAX_CHARS:
+                yield {"text": text[:EXTRACT_TEXT_MAX_CHARS - chars], "offset": offset}
+                if len(text) > EXTRACT_TEXT_MAX_CHARS - chars or f.read(1):
+                    yield {"text": f"\n...[Text Truncated at {EXTRACT_TEXT_MAX_CHARS // 1000}KB]..."}
+                return
+            if text:
+                yield {"text": text, "offset": offset}
+                chars += len(text)
+            if not block:
+                return
+            offset += len(block)
+
+
+def _extract_unknown(file_path: str, filename: str) -> Iterator[dict]:
+    """Universal fallback: UTF-8 text if it decodes, else metadata only."""
+    with open(file_path, "rb") as f:
+        head = f.read(GENERIC_TEXT_BYTES)
+    try:
+        # A character cut off at the end of the sniffed bytes is not a decode error
+        text = _text_decoder().decode(head)
+        yield {"text": text + "\n...[Generic Text Read]...", "offset": 0}
+    except UnicodeDecodeError:
+        # True Binary - Extract Metadata
+        size = os.path.getsize(file_path)
+        yield {"text": (
+            f"[Binary File: {filename}]\nSize: {size / (1024*1024):.2f} MB\nHeader (Hex): {head[:128].hex()}\n"
+            "Note: This file appears to be binary (image/video/executable). Context is limited to metadata."
+        )}
+
+
+def _extract_raw_strings(file_path: str, error: Exception) -> Iterator[dict]:
+    """Printable ASCII and UTF-16 runs from the whole of a corrupt file (truncated PDFs, broken Office files)."""
+    def progress(done: int, total: int):
+        report_progress(done, total, "bytes")
+
+    try:
+        header = "[Warning: File structure corrupted/partial. Recovered Raw Text]\n"
+        for offset, text in iter_strings(file_path, on_progress=progress):
+            yield {"text": header + text, "offset": offset}
+            header = ""
+        if header:
+            with open(file_path, "rb") as f:
+                head = f.read(50)
+            yield {"text": f"[Error: No recoverable text found in file. Hex Dump: {head.hex()}]"}
+    except Exception as fallback_err:
+        yield {"text": f"[Fatal Extraction Error: {str(error)} | Fallback: {str(fallback_err)}]"}
@@ -0,0 +1,236 @@
+"""
+Neural Workflow Engine — Background Ingestion Jobs
+CPU-heavy document extraction runs in a process (or thread) pool so the event
+loop keeps serving requests. Each upload becomes a job with a pollable status,
+published to the shared job store (app.job_store) so any uvicorn worker can
+answer the poll.
+"""
+
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+import tempfile
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, Optional
+
+from fastapi import HTTPException
+
+from app.job_store import get_job_store
+from app.metrics import INGEST_BYTES, INGEST_EXTRACTION, file_type
+
+logger = logging.getLogger(__name__)
+
+# ─── Config ───────────────────────────────────────────────────────────────────
+INGEST_EXECUTOR = os.getenv("INGEST_EXECUTOR", "process").lower()  # "process" | "thread"
+try:
+    INGEST_WORKERS = max(1, int(os.getenv("INGEST_WORKERS", min(4, os.cpu_count() or 1))))
+    INGEST_MAX_QUEUE = max(1, int(os.getenv("INGEST_MAX_QUEUE", 16)))
+    INGEST_JOB_RETENTION = float(os.getenv("INGEST_JOB_RETENTION", 3600))
+except ValueError:
+    INGEST_WORKERS, INGEST_MAX_QUEUE, INGEST_JOB_RETENTION = 2, 16, 3600.0
+
+# Job phases and the progress fraction reported for each
+PHASES = {
+    "queued": 0.0,
+    "extracting": 0.1,
+    "indexing": 0.8,
+    "completed": 1.0,
+    "failed": 1.0,
+}
+ACTIVE_PHASES = ("queued", "extracting", "indexing")
+JOB_KIND = "ingest"
+
+PROGRESS_INTERVAL = 0.5  # Seconds between progress writes in a worker / polls on the event loop
+
+# ─── State ────────────────────────────────────────────────────────────────────
+ingest_jobs: Dict[str, dict] = {}
+_executor: Optional[Executor] = None
+_tasks: Dict[str, asyncio.Task] = {}
+_worker_slots = asyncio.Semaphore(INGEST_WORKERS)  # Jobs stay "queued" until a worker is free
+_progress = threading.local()  # Worker side: where the running job's progress goes
+
+
+def _get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        if INGEST_EXECUTOR == "thread":
+            _executor = ThreadPoolExecutor(max_workers=INGEST_WORKERS, thread_name_prefix="ingest")
+        else:
+            _executor = ProcessPoolExecutor(max_workers=INGEST_WORKERS)
+        logger.info(f"Ingestion pool ready: {INGEST_WORKERS} {INGEST_EXECUTOR} workers")
+    return _executor
+
+
+def shutdown_executor():
+    """Stop the worker pool (called on app shutdown)."""
+    global _executor
+    for task in _tasks.values():
+        task.cancel()
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+# ─── Helpers ──────────────────────────────────────────────────────────────────
+def queue_depth() -> int:
+    return sum(1 for job in ingest_jobs.values() if job["status"] in ACTIVE_PHASES)
+
+
+def pending_filenames() -> set:
+    return {job["filename"] for job in ingest_jobs.values() if job["status"] in ACTIVE_PHASES}
+
+
+def set_phase(job: dict, status: str, **fields):
+    job.update(fields)
+    job["status"] = status
+    job["progress"] = max(job.get("progress", 0.0), PHASES[status])
+    job["updated_at"] = time.time()
+    get_job_store().publish(JOB_KIND, job)
+
+
+def _prune_finished():
+    cutoff = time.time() - INGEST_JOB_RETENTION
+    for job_id, job in list(ingest_jobs.items()):
+        if job["status"] not in ACTIVE_PHASES and job["updated_at"] < cutoff:
+            del ingest_jobs[job_id]
+    get_job_store().prune(JOB_KIND, cutoff, ACTIVE_PHASES)
+
+
+async def get_job(job_id: str) -> Optional[dict]:
+    """A job from this worker, else its last published status (run by another worker)."""
+    job = ingest_jobs.get(job_id)
+    if job is not None:
+        return job
+    return await asyncio.to_thread(get_job_store().get, JOB_KIND, job_id)
+
+
+def report_progress(done: int, total: int, unit: str, **fields):
+    """
+    Publish extraction progress from inside a job's `work` (any executor).
+    Written to a small file the event loop polls, at most every
+    PROGRESS_INTERVAL; a no-op outside an ingestion job.
+    """
+    path = getattr(_progress, "path", None)
+    now = time.monotonic()
+    if path is None or (done < total and now - _progress.written < PROGRESS_INTERVAL):
+        return
+    _progress.written = now
+    elapsed = now - _progress.started
+    state = {"unit": unit, "done": done, "total": total, "per_second": round(done / max(elapsed, 1e-9), 1), **fields}
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def _tracked(progress_path: str, work: Callable, *args):
+    """Runs in the worker: `work(*args)` with report_progress pointed at progress_path."""
+    _progress.path, _progress.started, _progress.written = progress_path, time.monotonic(), 0.0
+    try:
+        return work(*args)
+    finally:
+        _progress.path = None
+
+
+def _read_progress(job: dict, path: str):
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return
+    job["extraction"] = state
+    if state["total"]:
+        span = PHASES["indexing"] - PHASES["extracting"]
+        job["progress"] = round(max(job["progress"], PHASES["extracting"] + span * state["done"] / state["total"]), 3)
+        job["updated_at"] = time.time()
+    get_job_store().publish(JOB_KIND, job)
+
+
+def submit_job(
+    filename: str,
+    work: Callable,
+    args: tuple,
+    on_done: Callable[[dict, object], Awaitable[None]],
+    size: int = 0,
+    **fields,
+) -> dict:
+    """
+    Queue `work(*args)` on the pool and return the new job record.
+
+    `work` must be a picklable module-level function when the process pool is
+    used; it may call report_progress() to fill the job's `extraction` field.
+    `on_done(job, result)` runs back on the event loop (e.g. to update
+    in-process indexes). Raises 429 when the queue is full.
+    """
+    _prune_finished()
+    if queue_depth() >= INGEST_MAX_QUEUE:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Ingestion queue full ({INGEST_MAX_QUEUE} jobs). Retry shortly.",
+            headers={"Retry-After": "5"},
+        )
+
+    job_id = uuid.uuid4().hex[:12]
+    now = time.time()
+    job = {
+        "job_id": job_id,
+        "filename": filename,
+        "bytes": size,
+        "status": "queued",
+        "progress": 0.0,
+        "error": None,
+        "created_at": now,
+        "updated_at": now,
+        **fields,
+    }
+    ingest_jobs[job_id] = job
+    get_job_store().publish(JOB_KIND, job)
+    _tasks[job_id] = asyncio.create_task(_run(job, work, args, on_done))
+    return job
+
+
+async def _run(job: dict, work: Callable, args: tuple, on_done):
+    loop = asyncio.get_running_loop()
+    try:
+        async with _worker_slots:
+            set_phase(job, "extracting")
+            kind = file_type(job["filename"])
+            started = time.perf_counter()
+            progress_path = os.path.join(tempfile.gettempdir(), f"ingest-{job['job_id']}.progress")
+            future = loop.run_in_executor(_get_executor(), _tracked, progress_path, work, *args)
+            try:
+                while True:
+                    await asyncio.wait([future], timeout=PROGRESS_INTERVAL)
+                    _read_progress(job, progress_path)
+                    if future.done():
+                        break
+                result = future.result()
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception:
+                INGEST_EXTRACTION.observe(time.perf_counter() - started, kind, "failed")
+                raise
+            finally:
+                if os.path.exists(progress_path):
+                    os.remove(progress_path)
+            elapsed = time.perf_counter() - started
+            job["extract_seconds"] = round(elapsed, 3)
+            INGEST_EXTRACTION.observe(elapsed, kind, "completed")
+            INGEST_BYTES.inc(kind, amount=job["bytes"])
+
+        set_phase(job, "indexing")
+        await on_done(job, result)
+        set_phase(job, "completed")
+        logger.info(f"Ingest job {job['job_id']} completed: {job['filename']} in {job['extract_seconds']}s")
+    except asyncio.CancelledError:
+        set_phase(job, "failed", error="Cancelled")
+        raise
+    except Exception as e:
+        logger.error(f"Ingest job {job['job_id']} failed: {e}")
+        set_phase(job, "failed", error=str(e))
+    finally:
+        _tasks.pop(job["job_id"], None)
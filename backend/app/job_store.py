@@ -0,0 +1,152 @@
+"""
+Neural Workflow Engine — Job Status Store
+Snapshots of background jobs (workflow runs, ingestion) in a WAL-mode
+SQLite file shared by every uvicorn worker, so a status poll answered by
+any worker finds a job owned by another.
+
+The worker that accepted a job keeps the live job dict and runs it; every
+phase or progress change is written through here. Writes go to one
+background thread (in order, off the event loop); reads block, so call
+them via asyncio.to_thread. A cancel that lands on another worker is
+recorded as a request the owner picks up.
+
+Uses WORKFLOW_DB_PATH by default (in memory with WORKFLOW_STORE=memory,
+which is single-process anyway).
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional
+
+from app.workflow_store import WORKFLOW_STORE, WORKFLOW_DB_PATH
+
+logger = logging.getLogger(__name__)
+
+# ─── Config ───────────────────────────────────────────────────────────────────
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", ":memory:" if WORKFLOW_STORE == "memory" else WORKFLOW_DB_PATH)
+try:
+    JOB_STALE_AFTER = float(os.getenv("JOB_STALE_AFTER", 24 * 3600))  # Active but silent this long: owner is gone
+except ValueError:
+    JOB_STALE_AFTER = 24 * 3600.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id           TEXT PRIMARY KEY,
+    kind             TEXT NOT NULL,
+    status           TEXT NOT NULL,
+    data             TEXT NOT NULL,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    updated_at       REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_kind_updated ON jobs (kind, updated_at);
+"""
+
+
+class JobStore:
+    def __init__(self, path: str = JOB_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="job-store")
+        self._conn = sqlite3.connect(path, timeout=10.0, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def _execute(self, sql: str, params: tuple = ()):
+        try:
+            with self._lock:
+                self._conn.execute(sql, params)
+        except sqlite3.Error as e:  # A lost snapshot only delays what other workers see
+            logger.error(f"Job store write failed: {e}")
+
+    # ─── Writes (queued) ──────────────────────────────────────────────────────
+    def publish(self, kind: str, job: dict):
+        """Queue a snapshot of the job (taken now, on the caller's thread)."""
+        data = json.dumps(job, default=str)
+        self._writer.submit(
+            self._execute,
+            "INSERT INTO jobs (job_id, kind, status, data, updated_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(job_id) DO UPDATE SET status = excluded.status, data = excluded.data, updated_at = excluded.updated_at",
+            (job["job_id"], kind, job["status"], data, job["updated_at"]),
+        )
+
+    def prune(self, kind: str, cutoff: float, active: Iterable[str]):
+        """Queue removal of finished jobs last updated before `cutoff`, and of abandoned active ones."""
+        active = tuple(active)
+        self._writer.submit(
+            self._execute,
+            f"DELETE FROM jobs WHERE kind = ? AND updated_at < ? AND "
+            f"(status NOT IN ({','.join('?' * len(active))}) OR updated_at < ?)",
+            (kind, cutoff, *active, time.time() - JOB_STALE_AFTER),
+        )
+
+    def flush(self):
+        """Wait for queued writes."""
+        self._writer.submit(lambda: None).result()
+
+    # ─── Reads (blocking) ─────────────────────────────────────────────────────
+    def get(self, kind: str, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, cancel_requested FROM jobs WHERE job_id = ? AND kind = ?", (job_id, kind)
+            ).fetchone()
+        if row is None:
+            return None
+        job = json.loads(row["data"])
+        if row["cancel_requested"]:
+            job["cancel_requested"] = True
+        return job
+
+    def request_cancel(self, kind: str, job_id: str, active: Iterable[str]) -> Optional[dict]:
+        """Flag an active job for its owner to cancel; returns its snapshot (None if unknown)."""
+        active = tuple(active)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET cancel_requested = 1 WHERE job_id = ? AND kind = ? AND status IN ({','.join('?' * len(active))})",
+                (job_id, kind, *active),
+            )
+        return self.get(kind, job_id)
+
+    def cancel_requested(self, kind: str, job_ids: List[str]) -> List[str]:
+        """Which of these jobs another worker has asked to cancel."""
+        if not job_ids:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT job_id FROM jobs WHERE kind = ? AND cancel_requested = 1 AND job_id IN ({','.join('?' * len(job_ids))})",
+                (kind, *job_ids),
+            ).fetchall()
+        return [row["job_id"] for row in rows]
+
+    def close(self):
+        self._writer.shutdown(wait=True)
+        with self._lock:
+            self._conn.close()
+
+
+_store: Optional[JobStore] = None
+_store_lock = threading.Lock()
+
+
+def get_job_store() -> JobStore:
+    """The process-wide job store, opened on first use (pool workers never open it)."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = JobStore()
+            logger.info(f"Job status store: SQLite (WAL) at {JOB_DB_PATH}")
+        return _store
+
+
+def close_job_store():
+    global _store
+    with _store_lock:
+        if _store is not None:
+            _store.close()
+            _store = None
@@ -0,0 +1,244 @@
+"""
+Neural Workflow Engine — API Key Scheduler
+Spreads requests over several API keys for one provider. Each key keeps a
+request bucket and a token bucket, refilled over time and corrected from
+the provider's x-ratelimit-* headers. Keys that answer 429 or 5xx are
+benched until Retry-After / the reset time, keys whose credentials are
+rejected (401/403) are disabled, and every request goes to the key with
+the most headroom.
+
+Reservations happen without awaiting between choosing a key and debiting
+its buckets, so concurrent coroutines on the event loop never double-book.
+"""
+
+import os
+import re
+import time
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+import httpx
+
+from app.upstream import UPSTREAM_MAX_BACKOFF
+
+logger = logging.getLogger(__name__)
+
+# ─── Config ───────────────────────────────────────────────────────────────────
+# Starting limits per key until the provider's headers say otherwise
+try:
+    GROQ_REQUESTS_PER_MINUTE = int(os.getenv("GROQ_REQUESTS_PER_MINUTE", 30))
+    GROQ_TOKENS_PER_MINUTE = int(os.getenv("GROQ_TOKENS_PER_MINUTE", 6000))
+    GROQ_MAX_KEY_WAIT = float(os.getenv("GROQ_MAX_KEY_WAIT", 30))  # Longest a request waits for any key
+except ValueError:
+    GROQ_REQUESTS_PER_MINUTE, GROQ_TOKENS_PER_MINUTE, GROQ_MAX_KEY_WAIT = 30, 6000, 30.0
+
+SERVER_ERROR_BACKOFF = 1.0   # First bench after a 5xx; doubles per consecutive failure
+
+_DURATION_PART = re.compile(r"([\d.]+)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Seconds in a rate-limit reset header: '7.66s', '2m59.56s', '120ms' or plain '12'."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(n) * _DURATION_UNITS[unit] for n, unit in parts)
+
+# ─── Buckets ──────────────────────────────────────────────────────────────────
+class TokenBucket:
+    """Capacity refilled linearly over `period` seconds; may go negative on overdraw."""
+
+    def __init__(self, capacity: float, period: float = 60.0):
+        self.capacity = float(capacity)
+        self.rate = self.capacity / period
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def headroom(self) -> float:
+        return self.level / self.capacity if self.capacity else 0.0
+
+    def seconds_until(self, amount: float) -> float:
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate) if self.rate else float("inf")
+
+    def sync(self, limit: Optional[float], remaining: Optional[float], reset: Optional[float], now: float):
+        """Adopt the provider's view: remaining is authoritative, reset gives the refill rate."""
+        if limit:
+            self.capacity = float(limit)
+        if remaining is not None:
+            self.level = float(remaining)
+            self.updated = now
+            if reset:
+                self.rate = max(self.capacity - self.level, 1.0) / reset
+
+
+def _header_float(response: httpx.Response, name: str) -> Optional[float]:
+    try:
+        return float(response.headers[name])
+    except (KeyError, ValueError):
+        return None
+
+# ─── Scheduler ────────────────────────────────────────────────────────────────
+class KeyScheduler:
+    def __init__(
+        self,
+        keys: List[str],
+        requests_per_minute: int = GROQ_REQUESTS_PER_MINUTE,
+        tokens_per_minute: int = GROQ_TOKENS_PER_MINUTE,
+        max_wait: float = GROQ_MAX_KEY_WAIT,
+    ):
+        self.keys = list(keys)
+        self.max_wait = max_wait
+        self._slots = {key: i + 1 for i, key in enumerate(self.keys)}
+        self.state: Dict[str, dict] = {
+            key: {
+                "requests": TokenBucket(requests_per_minute),
+                "tokens": TokenBucket(tokens_per_minute),
+                "benched_until": 0.0,
+                "disabled": False,
+                "failures": 0,
+                "in_flight": 0,
+                "sent": 0,
+                "rate_limited": 0,
+            }
+            for key in self.keys
+        }
+        self._changed = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def slot(self, key: str) -> int:
+        """1-based position of a key, safe to log or label metrics with."""
+        return self._slots[key]
+
+    def _pick(self, tokens: int, now: float) -> Optional[str]:
+        best, best_score = None, None
+        for key in self.keys:
+            state = self.state[key]
+            if state["disabled"] or state["benched_until"] > now:
+                continue
+            state["requests"].refill(now)
+            state["tokens"].refill(now)
+            if state["requests"].level < 1 or state["tokens"].level < min(tokens, state["tokens"].capacity):
+                continue
+            score = min(state["requests"].headroom(), state["tokens"].headroom()) - 0.1 * state["in_flight"]
+            if best_score is None or score > best_score:
+                best, best_score = key, score
+        return best
+
+    def _next_ready_in(self, tokens: int, now: float) -> float:
+        waits = []
+        for state in self.state.values():
+            if state["disabled"]:
+                continue
+            bench = max(0.0, state["benched_until"] - now)
+            buckets = max(state["requests"].seconds_until(1), state["tokens"].seconds_until(tokens))
+            waits.append(max(bench, buckets))
+        return min(waits) if waits else float("inf")
+
+    async def acquire(self, tokens: int, max_wait: Optional[float] = None) -> Optional[str]:
+        """
+        Reserve a request (and `tokens` estimated tokens) on the key with the most
+        headroom, waiting up to `max_wait` (default self.max_wait) for one to free
+        up. Returns None if none is usable in time.
+        """
+        deadline = time.monotonic() + (self.max_wait if max_wait is None else max_wait)
+        while True:
+            now = time.monotonic()
+            key = self._pick(tokens, now)
+            if key is not None:
+                state = self.state[key]
+                state["requests"].level -= 1
+                state["tokens"].level -= tokens
+                state["in_flight"] += 1
+                state["sent"] += 1
+                return key
+            ready_in = self._next_ready_in(tokens, now)
+            if ready_in == float("inf"):  # Every key disabled
+                return None
+            wait = min(ready_in, deadline - now)
+            if wait <= 0:
+                return None
+            # Wake early if a response updates the picture (e.g. a key comes back)
+            self._changed.clear()
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+
+    def release(self, key: str, response: Optional[httpx.Response] = None, estimated: int = 0, used: Optional[int] = None):
+        """Return a reservation and learn from the response (None = transport error)."""
+        state = self.state[key]
+        now = time.monotonic()
+        state["in_flight"] -= 1
+
+        if response is not None:
+            state["requests"].sync(
+                _header_float(response, "x-ratelimit-limit-requests"),
+                _header_float(response, "x-ratelimit-remaining-requests"),
+                parse_duration(response.headers.get("x-ratelimit-reset-requests")),
+                now,
+            )
+            state["tokens"].sync(
+                _header_float(response, "x-ratelimit-limit-tokens"),
+                _header_float(response, "x-ratelimit-remaining-tokens"),
+                parse_duration(response.headers.get("x-ratelimit-reset-tokens")),
+                now,
+            )
+            if used is not None and "x-ratelimit-remaining-tokens" not in response.headers:
+                state["tokens"].level -= used - estimated
+
+        status = response.status_code if response is not None else None
+        if status == 429:
+            state["rate_limited"] += 1
+            delay = (
+                parse_duration(response.headers.get("retry-after"))
+                or parse_duration(response.headers.get("x-ratelimit-reset-tokens"))
+                or SERVER_ERROR_BACKOFF
+            )
+            self._bench(key, min(delay, UPSTREAM_MAX_BACKOFF), "rate limited")
+        elif status in (401, 403):
+            state["disabled"] = True
+            logger.error(f"Key {self.slot(key)} disabled: credentials rejected ({status})")
+        elif status is None or status >= 500:
+            if state["benched_until"] <= now:  # Concurrent failures from one outage count once
+                state["failures"] += 1
+            delay = min(SERVER_ERROR_BACKOFF * 2 ** (state["failures"] - 1), UPSTREAM_MAX_BACKOFF)
+            self._bench(key, delay, f"failing ({status or 'network error'})")
+        else:
+            state["failures"] = 0
+        self._changed.set()
+
+    def _bench(self, key: str, seconds: float, reason: str):
+        state = self.state[key]
+        state["benched_until"] = max(state["benched_until"], time.monotonic() + seconds)
+        logger.warning(f"Key {self.slot(key)} benched {seconds:.1f}s: {reason}")
+
+    def stats(self) -> List[dict]:
+        now = time.monotonic()
+        return [
+            {
+                "key": i + 1,
+                "disabled": state["disabled"],
+                "benched_for": round(max(0.0, state["benched_until"] - now), 2),
+                "requests_left": round(state["requests"].level, 1),
+                "tokens_left": round(state["tokens"].level),
+                "in_flight": state["in_flight"],
+                "sent": state["sent"],
+                "rate_limited": state["rate_limited"],
+            }
+            for i, state in enumerate(self.state.values())
+        ]
@@ -3,33 +3,76 @@ Neural Workflow Engine — Real FastAPI Backend
 Uses OpenRouter (Gemini 3 Pro) for AI-powered task planning & execution.
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Header, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional
+from typing import Annotated, AsyncIterator, Dict, List, Optional
 import uvicorn
 import uuid
-import json
-import httpx
+import time
 import asyncio
 import os
+from contextlib import asynccontextmanager
 from datetime import datetime
-from app.tools_registry import TOOL_CATEGORIES, get_tool_count, get_planner_tool_summary
+from app.tools_registry import TOOL_CATEGORIES, FALLBACK_TOOL, get_tool_count, get_registry
+from app.tool_shortlist import planner_tools, shortlist_cache_info
+from app.upstream import (
+    get_client, open_clients, close_clients,
+    RETRYABLE_STATUS, UPSTREAM_RATE_LIMIT_RETRIES,
+    retry_after_seconds, note_rate_limited, wait_for_capacity,
+)
+from app.dag import normalize_dependencies, normalize_step, critical_path_length, run_dag, DagRunner
+from app.plan_parser import IncrementalPlanParser, parse_plan
+from app.workflow_jobs import (
+    get_job, submit_job, cancel_job, set_progress, queue_stats, queue_position,
+    start_workers, stop_workers, PHASES as JOB_PHASES,
+)
+from app.plan_cache import plan_cache, plan_cache_key, cache_bypassed
+from app.workflow_store import create_workflow_store
+from app.job_store import close_job_store
+from app.context_budget import ContextPacker, prompt_budget, usage_report
+from app.single_flight import llm_flights, request_key
+from app import metrics
+from app.metrics import (
+    MetricsMiddleware, Collector, FALLBACKS, PLAN_REPAIRS, UPSTREAM_RETRIES, METRICS_ENABLED,
+    observe_upstream, record_usage,
+)
+from app.streaming import (
+    sse_event, sse_response, stream_from_producer, iter_completion_deltas,
+    EVENT_PLAN_DELTA, EVENT_PLAN_STEP, EVENT_PLAN_COMPLETED, EVENT_STEP_STARTED, EVENT_STEP_DELTA,
+    EVENT_STEP_COMPLETED, EVENT_WORKFLOW_COMPLETED,
+)
 
 # ─── Config ───────────────────────────────────────────────────────────────────
 OPENROUTER_API_KEY = os.getenv(
     "OPENROUTER_API_KEY",
     "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"
 )
-OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
+OPENROUTER_URL = os.getenv("OPENROUTER_URL", "https://openrouter.ai/api/v1/chat/completions")
 AI_MODEL = "google/gemini-2.0-flash-001"  # Fast + capable via OpenRouter
+AI_MAX_TOKENS = 4096
 
 # ─── App Init ─────────────────────────────────────────────────────────────────
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open pooled upstream clients, start upload GC and the workflow job pool; close everything on shutdown."""
+    await open_clients()
+    upload_gc = asyncio.create_task(upload_gc_loop())
+    start_workers()
+    yield
+    await stop_workers()
+    upload_gc.cancel()
+    await close_clients()
+    shutdown_executor()
+    document_store.close()
+    workflows_store.close()
+    close_job_store()
+
 app = FastAPI(
     title="Neural Workflow Engine API",
     description="Real AI-powered workflow engine for Mandelbrot",
     version="3.0.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -39,15 +82,19 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
 
 # Import Chat Engine (RAG)
-from app.chat_engine import router as chat_router
+from app.chat_engine import router as chat_router, document_store, upload_gc_loop, groq_keys
+from app.ingestion import shutdown_executor, queue_depth
 app.include_router(chat_router)
 
 # ─── Models ───────────────────────────────────────────────────────────────────
 class WorkflowRequest(BaseModel):
     prompt: str
     user_id: Optional[str] = None
+    priority: str = "normal"  # Job queue priority for /api/execute-workflow: high | normal | low
 
 class ExecuteStepRequest(BaseModel):
     workflow_id: str
@@ -55,46 +102,143 @@ class ExecuteStepRequest(BaseModel):
     tool: str
     action: str
     context: Optional[str] = None
-
-# ─── In-Memory Store ──────────────────────────────────────────────────────────
-workflows_store = {}
+    depends_on: Optional[List[int]] = None
+
+# ─── Workflow Store ───────────────────────────────────────────────────────────
+# Bounded, persistent (SQLite WAL by default) and shared across uvicorn workers
+workflows_store = create_workflow_store()
+
+# ─── Metrics ──────────────────────────────────────────────────────────────────
+# Scrape-time views of state kept elsewhere; nothing here runs per request
+def _cache_lookups():
+    plan = plan_cache.stats()
+    shortlist = shortlist_cache_info()
+    flights = llm_flights.stats()
+    yield ("plan", "hit"), plan["hits"]
+    yield ("plan", "miss"), plan["misses"]
+    yield ("tool_shortlist", "hit"), shortlist.hits
+    yield ("tool_shortlist", "miss"), shortlist.misses
+    yield ("single_flight", "hit"), flights["coalesced"]
+    yield ("single_flight", "miss"), flights["upstream_requests"]
+
+def _groq_key_state():
+    for key in groq_keys.stats():
+        yield (str(key["key"]), "benched_seconds"), key["benched_for"]
+        yield (str(key["key"]), "in_flight"), key["in_flight"]
+        yield (str(key["key"]), "requests_left"), key["requests_left"]
+        yield (str(key["key"]), "tokens_left"), key["tokens_left"]
+
+Collector("cache_lookups_total", "Cache lookups by cache and result (hit rate = hit / (hit + miss)).", "counter",
+          ("cache", "result"), _cache_lookups)
+Collector("groq_key_state", "Per-key Groq scheduler state.", "gauge", ("key_slot", "field"), _groq_key_state)
+# SQLite-backed sizes are read in a thread before each scrape renders (see prometheus_metrics)
+_store_sizes = {"workflows": 0, "documents": 0, "document_bytes": 0}
+
+def _read_store_sizes() -> dict:
+    return {"workflows": len(workflows_store), "documents": len(document_store), "document_bytes": document_store.total_bytes}
+
+Collector("workflows_stored", "Workflows held in the workflow store.", "gauge", (), lambda: [((), _store_sizes["workflows"])])
+Collector("documents_stored", "Documents in the document store.", "gauge", (), lambda: [((), _store_sizes["documents"])])
+Collector("document_store_bytes", "Bytes on disk in the document store.", "gauge", (), lambda: [((), _store_sizes["document_bytes"])])
+Collector("plan_cache_entries", "Plans in the plan cache.", "gauge", (), lambda: [((), plan_cache.stats()["entries"])])
+Collector("ingest_queue_depth", "Ingestion jobs queued or running.", "gauge", (), lambda: [((), queue_depth())])
+Collector("workflow_job_queue_depth", "Workflow jobs by state.", "gauge", ("state",),
+          lambda: [(("queued",), queue_stats()["queued"]), (("running",), queue_stats()["running"])])
 
 # ─── AI Helper ────────────────────────────────────────────────────────────────
+def _openrouter_request(system_prompt: str, user_prompt: str, temperature: float, stream: bool = False) -> dict:
+    """Headers and JSON body for an OpenRouter chat completion."""
+    body = {
+        "model": AI_MODEL,
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ],
+        "temperature": temperature,
+        "max_tokens": AI_MAX_TOKENS,
+    }
+    if stream:
+        body["stream"] = True
+    return {
+        "headers": {
+            "Authorization": f"Bearer {OPENROUTER_API_KEY}",
+            "Content-Type": "application/json",
+            "HTTP-Referer": "https://mandelbrot.ai",
+            "X-Title": "Mandelbrot Neural Engine",
+        },
+        "json": body,
+    }
+
+
 async def call_ai(system_prompt: str, user_prompt: str, temperature: float = 0.3) -> str:
-    """Call AI model via OpenRouter."""
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        response = await client.post(
-            OPENROUTER_URL,
-            headers={
-                "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-                "Content-Type": "application/json",
-                "HTTP-Referer": "https://mandelbrot.ai",
-                "X-Title": "Mandelbrot Neural Engine",
-            },
-            json={
-                "model": AI_MODEL,
-                "messages": [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ],
-                "temperature": temperature,
-                "max_tokens": 4096,
-            },
+    """Call AI model via OpenRouter; identical concurrent calls share one request."""
+    body = _openrouter_request(system_prompt, user_prompt, temperature)["json"]
+    key = request_key("openrouter", AI_MODEL, body["messages"], temperature, max_tokens=AI_MAX_TOKENS)
+    return await llm_flights.run(key, lambda: _call_openrouter(system_prompt, user_prompt, temperature))
+
+
+async def _call_openrouter(system_prompt: str, user_prompt: str, temperature: float) -> str:
+    """One upstream OpenRouter completion (shared keep-alive client)."""
+    client = get_client("openrouter")
+    request_kwargs = _openrouter_request(system_prompt, user_prompt, temperature)
+    for attempt in range(UPSTREAM_RATE_LIMIT_RETRIES + 1):
+        await wait_for_capacity("openrouter")
+        started, status = time.perf_counter(), None
+        try:
+            response = await client.post(OPENROUTER_URL, **request_kwargs)
+            status = response.status_code
+        finally:
+            observe_upstream("openrouter", AI_MODEL, 1, status, started)
+        if status not in RETRYABLE_STATUS or attempt == UPSTREAM_RATE_LIMIT_RETRIES:
+            break
+        # Rate limited — back off (shared across concurrent steps) and retry
+        UPSTREAM_RETRIES.inc("openrouter", str(status))
+        note_rate_limited("openrouter", retry_after_seconds(response, attempt))
+
+    if response.status_code != 200:
+        raise HTTPException(
+            status_code=502,
+            detail=f"AI service error: {response.status_code} - {response.text}"
         )
 
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=502,
-                detail=f"AI service error: {response.status_code} - {response.text}"
-            )
-
-        data = response.json()
-        return data["choices"][0]["message"]["content"]
+    data = response.json()
+    content = data["choices"][0]["message"]["content"]
+    record_usage("openrouter", AI_MODEL, data.get("usage"), system_prompt + user_prompt, content)
+    return content
+
+
+async def stream_ai(system_prompt: str, user_prompt: str, temperature: float = 0.3) -> AsyncIterator[str]:
+    """Stream AI output from OpenRouter, yielding content deltas as they arrive."""
+    client = get_client("openrouter")
+    request_kwargs = _openrouter_request(system_prompt, user_prompt, temperature, stream=True)
+    for attempt in range(UPSTREAM_RATE_LIMIT_RETRIES + 1):
+        await wait_for_capacity("openrouter")
+        started, status, output = time.perf_counter(), None, []
+        try:
+            async with client.stream("POST", OPENROUTER_URL, **request_kwargs) as response:
+                status = response.status_code
+                if status in RETRYABLE_STATUS and attempt < UPSTREAM_RATE_LIMIT_RETRIES:
+                    UPSTREAM_RETRIES.inc("openrouter", str(status))
+                    note_rate_limited("openrouter", retry_after_seconds(response, attempt))
+                    continue
+                if status != 200:
+                    await response.aread()
+                    raise HTTPException(
+                        status_code=502,
+                        detail=f"AI service error: {response.status_code} - {response.text}"
+                    )
+                async for delta in iter_completion_deltas(response):
+                    output.append(delta)
+                    yield delta
+                record_usage("openrouter", AI_MODEL, None, system_prompt + user_prompt, "".join(output))
+                return
+        finally:
+            observe_upstream("openrouter", AI_MODEL, 1, status, started)
 
 
 # ─── SYSTEM PROMPTS ──────────────────────────────────────────────────────────
 
-PLANNER_PROMPT = f"""You are the Neural Workflow Engine Planner — an AI that breaks down complex business tasks into structured execution plans.
+PLANNER_PROMPT_TEMPLATE = """You are the Neural Workflow Engine Planner — an AI that breaks down complex business tasks into structured execution plans.
 
 You are used by solo founders and small businesses to automate their workflows.
 
@@ -103,10 +247,11 @@ When given a task, you must:
 2. Break it into 3-8 concrete, actionable steps
 3. For each step, assign the best tool from this list:
 4. You must ONLY use tools from the provided list. Do not make up tool names.
+5. For each step, list in "depends_on" the ids of the earlier steps whose output it actually needs. Steps that can run independently must have an empty list so they execute in parallel.
 
-AVAILABLE TOOLS ({get_tool_count()} total across {len(TOOL_CATEGORIES)} categories):
+AVAILABLE TOOLS ({tools_heading}):
 
-{get_planner_tool_summary()}
+{tool_summary}
 
 RESPOND WITH VALID JSON ONLY. No markdown, no explanation. Just this format:
 {{
@@ -116,11 +261,23 @@ RESPOND WITH VALID JSON ONLY. No markdown, no explanation. Just this format:
       "id": 1,
       "tool": "tool.name",
       "action": "What this step does",
-      "input_description": "What context/data this step needs"
+      "input_description": "What context/data this step needs",
+      "depends_on": []
     }}
   ]
 }}"""
 
+
+def planner_prompt(directive: str) -> str:
+    """Planner system prompt listing only the tools relevant to this directive."""
+    tool_summary, listed = planner_tools(directive)
+    total = get_tool_count()
+    if listed < total:
+        tools_heading = f"{listed} most relevant of {total} total"
+    else:
+        tools_heading = f"{total} total across {len(TOOL_CATEGORIES)} categories"
+    return PLANNER_PROMPT_TEMPLATE.format(tools_heading=tools_heading, tool_summary=tool_summary)
+
 EXECUTOR_PROMPT = """You are the Neural Workflow Engine Executor — an AI that produces REAL, USABLE output for each step of a workflow.
 
 You are helping a solo founder or small business automate their work. Your outputs must be PRODUCTION-READY — not placeholders, not examples, but actual content they can copy-paste and use immediately.
@@ -161,163 +318,528 @@ async def health():
     return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
 
 
+async def _store_workflow(prompt: str, plan: dict, cache_status: str, user_id: Optional[str] = None, **extra) -> dict:
+    """Create and store a new workflow from a parsed plan (unknown tools repaired)."""
+    workflow_id = str(uuid.uuid4())[:8]
+    steps, repairs = get_registry().validate_steps(plan.get("steps", []))
+    workflow = {
+        "workflow_id": workflow_id,
+        "user_id": user_id,
+        "prompt": prompt,
+        "workflow_name": plan.get("workflow_name", "Untitled Workflow"),
+        "status": "planned",
+        "steps": normalize_dependencies(steps),
+        "results": {},
+        "created_at": datetime.utcnow().isoformat(),
+        "plan_cache": cache_status,
+        **extra,
+    }
+    if repairs:
+        workflow["tool_repairs"] = repairs
+        FALLBACKS.inc("tool_repaired", amount=len(repairs))
+
+    await asyncio.to_thread(workflows_store.create, workflow)
+    return workflow
+
+
+def _parsed_plan(prompt: str, parser: IncrementalPlanParser, cache_key: Optional[str] = None):
+    """
+    Plan from a finished parser. Complete plans are cached; output with no
+    recoverable step degrades to a single fallback step.
+    Returns (plan, extra workflow fields describing what was repaired).
+    """
+    for repair in parser.repairs:
+        PLAN_REPAIRS.inc(repair)
+    plan = parser.plan()
+    if not plan["steps"]:
+        FALLBACKS.inc("plan_unparseable")
+        plan["steps"] = [
+            {"id": 1, "tool": FALLBACK_TOOL, "action": "Process your request", "input_description": prompt, "depends_on": []}
+        ]
+        return plan, {"parse_note": "AI response was reformatted into a single step"}
+
+    # Truncated plans may be missing steps: retry them next time instead of caching
+    if cache_key and not parser.truncated:
+        plan_cache.put(cache_key, plan)
+    return plan, {"plan_repairs": parser.repairs} if parser.repairs else {}
+
+
+async def _workflow_from_response(prompt: str, raw_response: str, cache_key: Optional[str] = None, user_id: Optional[str] = None) -> dict:
+    """Turn the planner's raw completion into a stored workflow."""
+    plan, extra = _parsed_plan(prompt, parse_plan(raw_response), cache_key)
+    return await _store_workflow(prompt, plan, "miss" if cache_key else "bypass", user_id, **extra)
+
+
+async def _stream_plan(request: WorkflowRequest, system: str, cache_key: Optional[str], on_step, on_delta=None) -> dict:
+    """
+    Stream the planner and store the workflow while it is being written.
+
+    The workflow is created up front with status "planning". Each step is
+    tool-checked, normalized, saved and handed to `on_step(workflow, step)`
+    as soon as its JSON object closes, so callers can start executing it
+    while the planner is still writing the rest. Returns the final workflow.
+    """
+    workflow = await _store_workflow(request.prompt, {}, "miss" if cache_key else "bypass", request.user_id, status="planning")
+    parser = IncrementalPlanParser()
+    registry = get_registry()
+    seen, tool_repairs = [], []
+    has_edges = None
+
+    async def publish(raw_steps: List[dict]):
+        nonlocal has_edges
+        for raw in raw_steps:
+            if has_edges is None:
+                # The planner writes depends_on on every step or on none
+                has_edges = "depends_on" in raw
+            (step,), repairs = registry.validate_steps([raw])
+            if repairs:
+                tool_repairs.extend(repairs)
+                FALLBACKS.inc("tool_repaired", amount=len(repairs))
+            step = normalize_step(step, seen, has_edges)
+            workflow["steps"].append(step)
+            await asyncio.to_thread(workflows_store.update, workflow["workflow_id"], steps=workflow["steps"])
+            await on_step(workflow, step)
+
+    try:
+        async for delta in stream_ai(system, request.prompt):
+            if on_delta:
+                await on_delta(delta)
+            await publish(parser.feed(delta))
+        await publish(parser.finish())
+        plan, extra = _parsed_plan(request.prompt, parser, cache_key)
+        if not workflow["steps"]:
+            await publish(plan["steps"])
+    except BaseException:
+        await asyncio.to_thread(workflows_store.update, workflow["workflow_id"], status="failed")
+        raise
+
+    fields = {"workflow_name": plan["workflow_name"], "status": "planned", "steps": workflow["steps"], **extra}
+    if tool_repairs:
+        fields["tool_repairs"] = tool_repairs
+    await asyncio.to_thread(workflows_store.update, workflow["workflow_id"], **fields)
+    workflow.update(fields)
+    return workflow
+
+
+async def _cached_workflow(prompt: str, system: str, cache_header: Optional[str], user_id: Optional[str] = None):
+    """
+    Look the directive up in the plan cache; `system` is its planner_prompt
+    (built once by the caller, which also sends it on a miss).
+    Returns (cache_key, workflow); cache_key is None when the caller opted out.
+    """
+    if cache_bypassed(cache_header):
+        return None, None
+    cache_key = plan_cache_key(prompt, system)
+    plan = plan_cache.get(cache_key)
+    if plan is None:
+        return cache_key, None
+    return cache_key, await _store_workflow(prompt, plan, "hit", user_id)
+
+
+def _step_inputs(request: ExecuteStepRequest):
+    """The workflow's prompt and the results a step sees (blocking store reads: run in a thread)."""
+    wf = workflows_store.get(request.workflow_id)
+    if wf is None:
+        return None, {}
+    # With explicit dependencies, only upstream outputs are relevant
+    if request.depends_on is not None:
+        return wf["prompt"], workflows_store.get_results(request.workflow_id, request.depends_on)
+    return wf["prompt"], wf["results"]
+
+
+async def _step_prompt(request: ExecuteStepRequest):
+    """
+    Build the executor prompt with context from previous results.
+    Upstream outputs fill the model's token budget, nearest dependencies
+    first; returns (prompt, token usage).
+    """
+    context = f"Original prompt: {request.context or 'N/A'}"
+    packer = None
+    original, results = await asyncio.to_thread(_step_inputs, request)
+    if original is not None:
+        context = f"Original prompt: {original}\n"
+        if results:
+            context += "Previous step results:\n"
+            fixed = EXECUTOR_SYSTEM + EXECUTOR_PROMPT.format(context=context, tool=request.tool, action=request.action)
+            packer = ContextPacker(prompt_budget(AI_MODEL, AI_MAX_TOKENS, fixed))
+            for step_id, result in results.items():
+                packer.add(f"  Step {step_id}: {result}\n", priority=int(step_id))
+            context += "".join(item["text"] for item in packer.pack())
+
+    prompt = EXECUTOR_PROMPT.format(
+        context=context,
+        tool=request.tool,
+        action=request.action,
+    )
+    messages = [{"role": "system", "content": EXECUTOR_SYSTEM}, {"role": "user", "content": prompt}]
+    return prompt, usage_report(AI_MODEL, messages, packer, AI_MAX_TOKENS)
+
+
+async def _step_completed(request: ExecuteStepRequest, result: str, usage: Optional[dict] = None) -> dict:
+    """Store a step's output and build its response payload."""
+    await asyncio.to_thread(workflows_store.save_result, request.workflow_id, request.step_id, result)
+
+    return {
+        "workflow_id": request.workflow_id,
+        "step_id": request.step_id,
+        "tool": request.tool,
+        "action": request.action,
+        "status": "completed",
+        "output": result,
+        "usage": usage,
+        "timestamp": datetime.utcnow().isoformat(),
+    }
+
+
+def _step_failed(request: ExecuteStepRequest, error: Exception) -> dict:
+    """Response payload for a step that raised."""
+    return {
+        "workflow_id": request.workflow_id,
+        "step_id": request.step_id,
+        "status": "error",
+        "error": str(error),
+        "timestamp": datetime.utcnow().isoformat(),
+    }
+
+
+def _step_request(workflow_id: str, step: dict, prompt: str) -> ExecuteStepRequest:
+    """ExecuteStepRequest for one planned (normalized) step."""
+    return ExecuteStepRequest(
+        workflow_id=workflow_id,
+        step_id=step["id"],
+        tool=step["tool"],
+        action=step["action"],
+        context=prompt,
+        depends_on=step["depends_on"],
+    )
+
+
+async def _workflow_completed(plan_response: dict, steps: List[dict], results: List[dict]) -> dict:
+    """Mark an end-to-end run completed and build its final payload."""
+    await asyncio.to_thread(workflows_store.update, plan_response["workflow_id"], status="completed")
+    return {
+        "workflow_id": plan_response["workflow_id"],
+        "prompt": plan_response["prompt"],
+        "workflow_name": plan_response.get("workflow_name"),
+        "status": "completed",
+        "plan": steps,
+        "critical_path": critical_path_length(steps),
+        "results": results,
+        "completed_at": datetime.utcnow().isoformat(),
+    }
+
+
+EXECUTOR_SYSTEM = "You are a professional AI assistant that produces real, usable business outputs."
+
+
 @app.post("/api/plan")
-async def plan_workflow(request: WorkflowRequest):
+async def plan_workflow(
+    request: WorkflowRequest,
+    x_plan_cache: Annotated[Optional[str], Header()] = None,
+):
     """
     Takes a natural language prompt and returns a real AI-generated task plan.
+    Repeat directives are served from the plan cache (send `X-Plan-Cache: bypass` to skip it).
     """
     try:
-        raw_response = await call_ai(PLANNER_PROMPT, request.prompt)
-
-        # Clean response (strip markdown code fences if present)
-        cleaned = raw_response.strip()
-        if cleaned.startswith("```"):
-            cleaned = cleaned.split("\n", 1)[1]  # Remove first line
-        if cleaned.endswith("```"):
-            cleaned = cleaned.rsplit("```", 1)[0]  # Remove last fence
-        cleaned = cleaned.strip()
-
-        plan = json.loads(cleaned)
-
-        workflow_id = str(uuid.uuid4())[:8]
-        workflow = {
-            "workflow_id": workflow_id,
-            "prompt": request.prompt,
-            "workflow_name": plan.get("workflow_name", "Untitled Workflow"),
-            "status": "planned",
-            "steps": plan.get("steps", []),
-            "results": {},
-            "created_at": datetime.utcnow().isoformat(),
-        }
-
-        workflows_store[workflow_id] = workflow
-        return workflow
-
-    except json.JSONDecodeError as e:
-        # If AI doesn't return valid JSON, return the raw response for debugging
-        return {
-            "workflow_id": str(uuid.uuid4())[:8],
-            "prompt": request.prompt,
-            "workflow_name": "Workflow",
-            "status": "planned",
-            "steps": [
-                {"id": 1, "tool": "ai.analyze_data", "action": "Process your request", "input_description": request.prompt}
-            ],
-            "results": {},
-            "created_at": datetime.utcnow().isoformat(),
-            "parse_note": "AI response was reformatted into a single step"
-        }
+        system = planner_prompt(request.prompt)
+        cache_key, cached = await _cached_workflow(request.prompt, system, x_plan_cache, request.user_id)
+        if cached:
+            return cached
+        raw_response = await call_ai(system, request.prompt)
+        return await _workflow_from_response(request.prompt, raw_response, cache_key, request.user_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/plan/stream")
+async def plan_workflow_stream(
+    request: WorkflowRequest,
+    x_plan_cache: Annotated[Optional[str], Header()] = None,
+):
+    """
+    Stream the planner's tokens as `plan.delta` events and each step as a
+    `plan.step` event once it is complete, then the workflow as
+    `plan.completed` (immediately, on a plan cache hit).
+    """
+    async def produce(emit):
+        system = planner_prompt(request.prompt)
+        cache_key, workflow = await _cached_workflow(request.prompt, system, x_plan_cache, request.user_id)
+        if workflow is None:
+            async def on_step(workflow: dict, step: dict):
+                await emit(sse_event(EVENT_PLAN_STEP, {"workflow_id": workflow["workflow_id"], "step": step}))
+
+            async def on_delta(delta: str):
+                await emit(sse_event(EVENT_PLAN_DELTA, {"delta": delta}))
+
+            workflow = await _stream_plan(request, system, cache_key, on_step, on_delta)
+        await emit(sse_event(EVENT_PLAN_COMPLETED, workflow))
+
+    return sse_response(stream_from_producer(produce))
+
+
 @app.post("/api/execute-step")
 async def execute_step(request: ExecuteStepRequest):
     """
     Execute a single step of a workflow and return real AI-generated output.
     """
     try:
-        # Build context from previous results
-        context = f"Original prompt: {request.context or 'N/A'}"
-        if request.workflow_id in workflows_store:
-            wf = workflows_store[request.workflow_id]
-            context = f"Original prompt: {wf['prompt']}\n"
-            if wf.get("results"):
-                context += "Previous step results:\n"
-                for step_id, result in wf["results"].items():
-                    context += f"  Step {step_id}: {result[:200]}...\n"
-
-        # Get real AI output
-        executor_prompt = EXECUTOR_PROMPT.format(
-            context=context,
-            tool=request.tool,
-            action=request.action,
-        )
+        prompt, usage = await _step_prompt(request)
+        result = await call_ai(EXECUTOR_SYSTEM, prompt, temperature=0.4)
+        return await _step_completed(request, result, usage)
+    except Exception as e:
+        return _step_failed(request, e)
 
-        result = await call_ai(
-            "You are a professional AI assistant that produces real, usable business outputs.",
-            executor_prompt,
-            temperature=0.4,
-        )
 
-        # Store result
-        if request.workflow_id in workflows_store:
-            workflows_store[request.workflow_id]["results"][str(request.step_id)] = result
+async def _stream_step(request: ExecuteStepRequest, emit) -> dict:
+    """Run one step, emitting started/delta/completed events through `emit`."""
+    await emit(sse_event(EVENT_STEP_STARTED, {
+        "workflow_id": request.workflow_id,
+        "step_id": request.step_id,
+        "tool": request.tool,
+        "action": request.action,
+    }))
+    try:
+        prompt, usage = await _step_prompt(request)
+        parts = []
+        async for delta in stream_ai(EXECUTOR_SYSTEM, prompt, temperature=0.4):
+            parts.append(delta)
+            await emit(sse_event(EVENT_STEP_DELTA, {"step_id": request.step_id, "delta": delta}))
+        result = await _step_completed(request, "".join(parts), usage)
+    except Exception as e:
+        result = _step_failed(request, e)
+    await emit(sse_event(EVENT_STEP_COMPLETED, result))
+    return result
 
-        return {
-            "workflow_id": request.workflow_id,
-            "step_id": request.step_id,
-            "tool": request.tool,
-            "action": request.action,
-            "status": "completed",
-            "output": result,
-            "timestamp": datetime.utcnow().isoformat(),
-        }
 
-    except Exception as e:
-        return {
-            "workflow_id": request.workflow_id,
-            "step_id": request.step_id,
-            "status": "error",
-            "error": str(e),
-            "timestamp": datetime.utcnow().isoformat(),
-        }
+@app.post("/api/execute-step/stream")
+async def execute_step_stream(request: ExecuteStepRequest):
+    """Stream a single step's output as SSE events."""
+    async def produce(emit):
+        await _stream_step(request, emit)
+
+    return sse_response(stream_from_producer(produce))
 
 
-@app.post("/api/execute-workflow")
-async def execute_full_workflow(request: WorkflowRequest):
+async def _plan_and_execute(
+    request: WorkflowRequest, x_plan_cache: Optional[str], run_step, on_delta=None, on_planned=None, on_skip=None
+):
     """
-    Plan AND execute an entire workflow end-to-end.
-    Returns all results.
+    Plan and execute a workflow as a DAG: independent steps run concurrently
+    and each one sees only the results of the steps it depends on. A step
+    whose dependency failed is not run; its skipped result goes to `on_skip`.
+
+    On a plan cache miss, steps start speculatively while the planner is
+    still streaming later ones. Returns (workflow, steps, results).
     """
-    # Step 1: Plan
-    plan_response = await plan_workflow(request)
-    workflow_id = plan_response["workflow_id"]
-    steps = plan_response["steps"]
-
-    results = []
-
-    # Step 2: Execute each step
-    for step in steps:
-        step_request = ExecuteStepRequest(
-            workflow_id=workflow_id,
-            step_id=step["id"],
-            tool=step["tool"],
-            action=step["action"],
-            context=request.prompt,
+    workflow_id = None
+
+    async def skip(step: dict, result: dict):
+        result.update(workflow_id=workflow_id, timestamp=datetime.utcnow().isoformat())
+        if on_skip:
+            await on_skip(result)
+
+    system = planner_prompt(request.prompt)
+    cache_key, workflow = await _cached_workflow(request.prompt, system, x_plan_cache, request.user_id)
+    if workflow is not None:
+        workflow_id = workflow["workflow_id"]
+        if on_planned:
+            await on_planned(workflow)
+        steps = workflow["steps"]
+        results = await run_dag(
+            steps,
+            lambda step, upstream: run_step(_step_request(workflow["workflow_id"], step, request.prompt)),
+            on_skip=skip,
         )
+        return workflow, steps, results
+
+    step_requests: Dict[int, ExecuteStepRequest] = {}
+    runner = DagRunner(lambda step, upstream: run_step(step_requests[step["id"]]), on_skip=skip)
+
+    async def on_step(workflow: dict, step: dict):
+        nonlocal workflow_id
+        workflow_id = workflow["workflow_id"]
+        step_requests[step["id"]] = _step_request(workflow["workflow_id"], step, request.prompt)
+        runner.add(step)
+
+    try:
+        workflow = await _stream_plan(request, system, cache_key, on_step, on_delta)
+    except BaseException:
+        runner.cancel()
+        raise
+    if on_planned:
+        await on_planned(workflow)
+    return workflow, workflow["steps"], await runner.results()
+
+
+async def _workflow_job(job: dict, request: WorkflowRequest, x_plan_cache: Optional[str]) -> dict:
+    """Job body for /api/execute-workflow: plan and execute, reporting step progress."""
+    completed = 0
+
+    def advance():
+        nonlocal completed
+        completed += 1
+        total = job["steps_total"] or completed + 1  # Plan still streaming: more steps may follow
+        start = JOB_PHASES["running"]
+        set_progress(job, start + (1 - start) * completed / total, steps_completed=completed)
+
+    async def run_step(step_request: ExecuteStepRequest) -> dict:
+        job["workflow_id"] = step_request.workflow_id
         result = await execute_step(step_request)
-        results.append(result)
+        advance()
+        return result
 
-        # Small delay to avoid rate limiting
-        await asyncio.sleep(0.5)
+    async def on_skip(result: dict):
+        advance()
 
+    async def on_planned(workflow: dict):
+        job.update(workflow_id=workflow["workflow_id"], steps_total=len(workflow["steps"]))
+
+    try:
+        workflow, steps, results = await _plan_and_execute(
+            request, x_plan_cache, run_step, on_planned=on_planned, on_skip=on_skip
+        )
+    except asyncio.CancelledError:
+        if job.get("workflow_id"):
+            await asyncio.to_thread(workflows_store.update, job["workflow_id"], status="cancelled")
+        raise
+    return await _workflow_completed(workflow, steps, results)
+
+
+@app.post("/api/execute-workflow", status_code=202)
+async def execute_full_workflow(
+    request: WorkflowRequest,
+    x_plan_cache: Annotated[Optional[str], Header()] = None,
+):
+    """
+    Plan AND execute an entire workflow end-to-end as a background job.
+    Returns 202 with a job id at once; poll /api/jobs/{job_id} for progress
+    and the final results, or DELETE it to cancel.
+    """
+    job = await submit_job(
+        lambda job: _workflow_job(job, request, x_plan_cache),
+        user_id=request.user_id,
+        priority=request.priority,
+        prompt=request.prompt,
+        workflow_id=None,
+        steps_total=None,
+        steps_completed=0,
+    )
     return {
-        "workflow_id": workflow_id,
-        "prompt": request.prompt,
-        "workflow_name": plan_response.get("workflow_name"),
-        "status": "completed",
-        "plan": steps,
-        "results": results,
-        "completed_at": datetime.utcnow().isoformat(),
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "priority": job["priority"],
+        "status_url": f"/api/jobs/{job['job_id']}",
+        "queue_position": queue_position(job["job_id"]),
     }
 
 
+@app.get("/api/jobs")
+async def workflow_job_stats():
+    """Workflow job queue depth, running jobs and oldest wait."""
+    return queue_stats()
+
+
+@app.get("/api/jobs/{job_id}")
+async def workflow_job_status(job_id: str):
+    """Progress of a workflow job (run by any worker); `result` holds the completed workflow."""
+    job = await get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Workflow job not found")
+    return {**job, "queue_position": queue_position(job_id)}
+
+
+@app.delete("/api/jobs/{job_id}")
+async def cancel_workflow_job(job_id: str):
+    """Cancel a queued or running workflow job."""
+    job = await cancel_job(job_id)
+    return {**job, "queue_position": None}
+
+
+@app.post("/api/execute-workflow/stream")
+async def execute_full_workflow_stream(
+    request: WorkflowRequest,
+    x_plan_cache: Annotated[Optional[str], Header()] = None,
+):
+    """
+    Plan and execute a workflow, streaming progress as SSE:
+    plan.delta → step.started / step.delta / step.completed (steps start
+    while the plan is still streaming, interleaved across parallel steps)
+    → plan.completed → workflow.completed.
+    """
+    async def produce(emit):
+        async def run_step(step_request: ExecuteStepRequest) -> dict:
+            return await _stream_step(step_request, emit)
+
+        async def on_delta(delta: str):
+            await emit(sse_event(EVENT_PLAN_DELTA, {"delta": delta}))
+
+        async def on_planned(workflow: dict):
+            await emit(sse_event(EVENT_PLAN_COMPLETED, workflow))
+
+        async def on_skip(result: dict):
+            await emit(sse_event(EVENT_STEP_COMPLETED, result))
+
+        workflow, steps, results = await _plan_and_execute(
+            request, x_plan_cache, run_step, on_delta, on_planned, on_skip
+        )
+        await emit(sse_event(EVENT_WORKFLOW_COMPLETED, await _workflow_completed(workflow, steps, results)))
+
+    return sse_response(stream_from_producer(produce))
+
+
 @app.get("/api/workflows/{workflow_id}")
 async def get_workflow(workflow_id: str):
     """Get a workflow and its results."""
-    if workflow_id not in workflows_store:
+    workflow = await asyncio.to_thread(workflows_store.get, workflow_id)
+    if workflow is None:
         raise HTTPException(status_code=404, detail="Workflow not found")
-    return workflows_store[workflow_id]
+    return workflow
+
+
+@app.get("/api/users/{user_id}/workflows")
+async def list_user_workflows(user_id: str, limit: int = 50):
+    """Most recent workflows for a user (summaries, newest first)."""
+    workflows = await asyncio.to_thread(workflows_store.list_by_user, user_id, min(limit, 200))
+    return {"user_id": user_id, "workflows": workflows}
+
+
+@app.get("/api/plan-cache")
+async def plan_cache_stats():
+    """Plan cache size and hit/miss counters."""
+    return plan_cache.stats()
+
+
+@app.delete("/api/plan-cache")
+async def clear_plan_cache():
+    """Drop every cached plan."""
+    plan_cache.clear()
+    return {"status": "cleared"}
+
+
+@app.get("/api/upstream")
+async def upstream_stats():
+    """Single-flight coalescing counters and per-key Groq scheduler state."""
+    return {"single_flight": llm_flights.stats(), "groq_keys": groq_keys.stats()}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus scrape endpoint (text exposition format)."""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    _store_sizes.update(await asyncio.to_thread(_read_store_sizes))
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
 
 
 @app.get("/api/tools")
-async def list_tools():
-    """List all available tools."""
-    return {
-        "count": get_tool_count(),
-        "categories": TOOL_CATEGORIES,
-    }
+async def list_tools(if_none_match: Annotated[Optional[str], Header()] = None):
+    """List all available tools (precomputed payload; 304 when the client's ETag matches)."""
+    registry = get_registry()
+    headers = {"ETag": registry.etag, "Cache-Control": "public, max-age=300"}
+    if if_none_match and registry.etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=registry.payload_json, media_type="application/json", headers=headers)
 
 
 if __name__ == "__main__":
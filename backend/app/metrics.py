@@ -0,0 +1,270 @@
+"""
+Neural Workflow Engine — Metrics
+Prometheus text-format counters, gauges and histograms without a client
+library. Recording is a dict lookup (plus a bisect for histograms) on the
+event loop thread, so hot paths pay about a microsecond per sample.
+Values the app already tracks elsewhere (cache stats, store sizes, key
+state) are read through collectors only when /metrics is scraped.
+
+Metrics are per process: with several uvicorn workers, each reports its own.
+"""
+
+import os
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.context_budget import count_tokens
+
+# ─── Config ───────────────────────────────────────────────────────────────────
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+UPSTREAM_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0, 120.0)
+EXTRACTION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+# ─── Metric Types ─────────────────────────────────────────────────────────────
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        REGISTRY.append(self)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labels, value in self._values.items():
+            lines.append(f"{self.name}{_label_text(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, value: float, *labels: str):
+        self._values[labels] = value
+
+    def dec(self, *labels: str, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Labels, list] = {}  # labels → [bucket counts..., +Inf count, sum]
+
+    def observe(self, value: float, *labels: str):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return sum(series[:-1]) if series else 0
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labels, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_label_text(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labelnames, labels)} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{_label_text(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Collector(_Metric):
+    """Counter or gauge whose samples come from `collect()` at scrape time."""
+
+    def __init__(self, name: str, help: str, type: str, labelnames: Sequence[str], collect: Callable[[], Iterable[Tuple[Labels, float]]]):
+        super().__init__(name, help, labelnames)
+        self.type = type
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labels, value in self.collect():
+            lines.append(f"{self.name}{_label_text(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+REGISTRY: List[_Metric] = []
+
+
+def render() -> str:
+    """Every registered metric in Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# ─── Application Metrics ──────────────────────────────────────────────────────
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency until the last response byte, by route template.",
+    ("method", "route", "status"),
+)
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being served.")
+
+UPSTREAM_LATENCY = Histogram(
+    "upstream_request_duration_seconds",
+    "LLM provider call latency per attempt (streams: until the last delta).",
+    ("provider", "model", "key_slot", "status"),
+    buckets=UPSTREAM_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total",
+    "Prompt and completion tokens (provider-reported when available, else estimated).",
+    ("provider", "model", "kind"),
+)
+UPSTREAM_RETRIES = Counter(
+    "upstream_retries_total",
+    "Provider attempts repeated after a failed attempt, by the failure that caused them.",
+    ("provider", "reason"),
+)
+FALLBACKS = Counter(
+    "fallbacks_total",
+    "Degraded answers: unparseable plans, repaired tools, exhausted providers.",
+    ("kind",),
+)
+PLAN_REPAIRS = Counter(
+    "plan_json_repairs_total",
+    "Planner outputs that needed a JSON repair to parse, by repair.",
+    ("repair",),
+)
+
+INGEST_BYTES = Counter(
+    "ingest_bytes_total",
+    "Bytes extracted by ingestion jobs; rate() gives ingestion bytes/s.",
+    ("file_type",),
+)
+INGEST_EXTRACTION = Histogram(
+    "ingest_extraction_seconds",
+    "Worker-side extraction time per document (extract, chunk, embed, store).",
+    ("file_type", "outcome"),
+    buckets=EXTRACTION_BUCKETS,
+)
+
+WORKFLOW_JOB_WAIT = Histogram(
+    "workflow_job_wait_seconds",
+    "Time workflow jobs spent queued before a worker took them.",
+    ("priority",),
+    buckets=LATENCY_BUCKETS + (120.0, 300.0),
+)
+WORKFLOW_JOB_RUN = Histogram(
+    "workflow_job_run_seconds",
+    "Worker time per workflow job, by final status.",
+    ("status",),
+    buckets=UPSTREAM_BUCKETS + (300.0, 600.0),
+)
+WORKFLOW_JOBS_REJECTED = Counter(
+    "workflow_jobs_rejected_total",
+    "Workflow jobs refused at submit time, by the limit hit.",
+    ("reason",),
+)
+
+
+def observe_upstream(provider: str, model: str, key_slot: int, status: Optional[int], started: float):
+    """Record one provider attempt; `status` None means a transport error."""
+    UPSTREAM_LATENCY.observe(time.perf_counter() - started, provider, model, str(key_slot), str(status or "error"))
+
+
+def record_usage(provider: str, model: str, usage: Optional[dict], prompt_text: str, completion_text: str):
+    """Token counters from a provider's usage block, estimating whatever it omits."""
+    usage = usage or {}
+    prompt = usage.get("prompt_tokens") or count_tokens(prompt_text)
+    completion = usage.get("completion_tokens")
+    if completion is None:
+        total = usage.get("total_tokens")
+        completion = max(total - prompt, 0) if total else count_tokens(completion_text)
+    LLM_TOKENS.inc(provider, model, "prompt", amount=prompt)
+    LLM_TOKENS.inc(provider, model, "completion", amount=completion)
+
+
+_KNOWN_FILE_TYPES = {
+    "pdf", "csv", "xlsx", "xls", "txt", "md", "json", "js", "py", "html", "css", "xml", "log", "docx", "pptx",
+}
+
+
+def file_type(filename: str) -> str:
+    """Extension label for ingestion metrics (bounded: unknown types become 'other')."""
+    ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    return ext if ext in _KNOWN_FILE_TYPES else "other"
+
+
+# ─── ASGI Middleware ──────────────────────────────────────────────────────────
+class MetricsMiddleware:
+    """Times every HTTP request by method, matched route template and status."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            # Route templates (not raw paths) keep label cardinality bounded
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_LATENCY.observe(time.perf_counter() - started, scope["method"], route, str(status))
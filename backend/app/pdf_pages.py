@@ -0,0 +1,272 @@
+"""
+Neural Workflow Engine — Parallel PDF Page Extraction
+Every page of a PDF, parsed in page batches across a process pool and handed
+back in page order. Page text is cached in SQLite under a fingerprint of
+what the text depends on (content stream, fonts, form XObjects), so
+re-ingesting an edited document only parses the pages that changed.
+
+Each ingestion worker (INGEST_WORKERS of them) opens its own page pool, so
+PDF_WORKERS is capped at cpu_count // INGEST_WORKERS: with every ingestion
+worker parsing a large PDF at once, the pools together fill the CPUs
+instead of oversubscribing them INGEST_WORKERS times over.
+
+Kept free of pandas/openpyxl imports: pool workers are spawned and import
+this module, so their start-up cost stays small.
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Generator, Iterator, List, Optional, Tuple
+
+import pypdf
+from pypdf import PdfReader
+
+from app.document_store import DOCSTORE_DIR
+
+logger = logging.getLogger(__name__)
+
+# ─── Config ───────────────────────────────────────────────────────────────────
+_CPUS = os.cpu_count() or 1
+try:
+    # Same setting as app.ingestion, read here so spawned pool workers don't import it
+    _INGEST_WORKERS = max(1, int(os.getenv("INGEST_WORKERS", min(4, _CPUS))))
+except ValueError:
+    _INGEST_WORKERS = 2
+_PDF_WORKER_BUDGET = max(1, _CPUS // _INGEST_WORKERS)  # Per ingestion worker
+
+try:
+    PDF_WORKERS = max(1, min(int(os.getenv("PDF_WORKERS", _PDF_WORKER_BUDGET)), _PDF_WORKER_BUDGET))
+    PDF_PAGES_PER_TASK = max(1, int(os.getenv("PDF_PAGES_PER_TASK", 8)))
+    PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", 64))  # Fewer pages to parse: in-process
+    PDF_PAGE_CACHE_MAX_PAGES = int(os.getenv("PDF_PAGE_CACHE_MAX_PAGES", 200_000))
+except ValueError:
+    PDF_WORKERS, PDF_PAGES_PER_TASK, PDF_PARALLEL_MIN_PAGES, PDF_PAGE_CACHE_MAX_PAGES = _PDF_WORKER_BUDGET, 8, 64, 200_000
+
+PDF_PAGE_CACHE = os.getenv("PDF_PAGE_CACHE", os.path.join(DOCSTORE_DIR, "pdf_pages.db"))  # Empty = no cache
+
+# Parsing changes between pypdf releases: a new version starts a fresh cache
+_FINGERPRINT_SALT = f"pypdf-{pypdf.__version__}".encode()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    fingerprint TEXT PRIMARY KEY,
+    text        TEXT NOT NULL,
+    used_at     REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_pages_used ON pages (used_at);
+"""
+
+# ─── Page Cache ───────────────────────────────────────────────────────────────
+class PageCache:
+    """Fingerprint → page text, shared by every ingestion process (SQLite WAL)."""
+
+    def __init__(self, path: str, max_pages: int = PDF_PAGE_CACHE_MAX_PAGES):
+        self.path = path
+        self.max_pages = max_pages
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def has_many(self, fingerprints: List[str]) -> set:
+        if not fingerprints:
+            return set()
+        marks = ",".join("?" * len(fingerprints))
+        rows = self._conn.execute(f"SELECT fingerprint FROM pages WHERE fingerprint IN ({marks})", fingerprints)
+        return {row[0] for row in rows}
+
+    def get_many(self, fingerprints: List[str]) -> dict:
+        if not fingerprints:
+            return {}
+        marks = ",".join("?" * len(fingerprints))
+        rows = self._conn.execute(f"SELECT fingerprint, text FROM pages WHERE fingerprint IN ({marks})", fingerprints)
+        return dict(rows.fetchall())
+
+    def put_many(self, pages: List[Tuple[str, str]], touched: List[str] = ()):
+        """Store newly parsed pages and refresh the LRU time of reused ones."""
+        now = time.time()
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO pages (fingerprint, text, used_at) VALUES (?, ?, ?)",
+                [(fingerprint, text, now) for fingerprint, text in pages],
+            )
+            self._conn.executemany("UPDATE pages SET used_at = ? WHERE fingerprint = ?", [(now, f) for f in touched])
+
+    def prune(self):
+        """Drop the least recently used pages beyond max_pages."""
+        excess = self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0] - self.max_pages
+        if excess > 0:
+            with self._conn:
+                self._conn.execute(
+                    "DELETE FROM pages WHERE fingerprint IN (SELECT fingerprint FROM pages ORDER BY used_at LIMIT ?)",
+                    (excess,),
+                )
+
+    def close(self):
+        self._conn.close()
+
+# ─── Workers ──────────────────────────────────────────────────────────────────
+# One open document per thread: ingestion threads (INGEST_EXECUTOR=thread) each parse their own PDF
+_local = threading.local()
+
+
+def _open(file_path: str) -> PdfReader:
+    reader = getattr(_local, "reader", None)
+    if reader is None or reader[0] != file_path:
+        reader = _local.reader = (file_path, PdfReader(file_path))
+    return reader[1]
+
+
+def _hash_resources(resources, digest, seen: set):
+    """Fonts (with their ToUnicode maps) and form XObjects: what extract_text reads besides the content stream."""
+    if not resources:
+        return
+    resources = resources.get_object()
+    fonts = resources.get("/Font")
+    if fonts:
+        fonts = fonts.get_object()
+        for name in sorted(fonts):
+            font = fonts[name].get_object()
+            digest.update(f"{name}{font.get('/BaseFont')}{font.get('/Subtype')}{font.get('/Encoding')}".encode())
+            to_unicode = font.get("/ToUnicode")
+            if to_unicode is not None:
+                digest.update(to_unicode.get_object().get_data())
+    xobjects = resources.get("/XObject")
+    if xobjects:
+        xobjects = xobjects.get_object()
+        for name in sorted(xobjects):
+            reference = xobjects[name]
+            key = getattr(reference, "idnum", None)
+            xobject = reference.get_object()
+            if xobject.get("/Subtype") != "/Form" or (key is not None and key in seen):
+                continue
+            seen.add(key)
+            digest.update(name.encode() + xobject.get_data())
+            _hash_resources(xobject.get("/Resources"), digest, seen)
+
+
+def page_fingerprint(page) -> Optional[str]:
+    """Hash of everything extract_text reads for a page (None if the page can't be hashed)."""
+    try:
+        digest = hashlib.sha256(_FINGERPRINT_SALT)
+        digest.update(str(page.get("/Rotate", 0)).encode())
+        contents = page.get_contents()
+        if contents is not None:
+            digest.update(contents.get_data())
+        _hash_resources(page.get("/Resources"), digest, set())
+        return digest.hexdigest()
+    except Exception as e:  # Broken resources: parse the page, just don't cache it
+        logger.warning(f"Page not fingerprinted: {e}")
+        return None
+
+
+def extract_pages(file_path: str, numbers: List[int]) -> List[Tuple[str, bool]]:
+    """(text, ok) for the given pages; runs in a pool worker or in-process."""
+    reader = _open(file_path)
+    results = []
+    for number in numbers:
+        try:
+            results.append((reader.pages[number].extract_text() or "", True))
+        except Exception as e:
+            # One unreadable page shouldn't cost the rest of the document
+            results.append((f"[Page {number + 1}: text extraction failed: {e}]", False))
+    return results
+
+# ─── Document ─────────────────────────────────────────────────────────────────
+def _ordered(submit: Callable, tasks: List[List[int]], window: int) -> Iterator[list]:
+    """Task results in submission order, with at most `window` tasks in flight (bounded memory)."""
+    pending = deque()
+    tasks = iter(tasks)
+    for numbers in tasks:
+        pending.append(submit(numbers))
+        if len(pending) >= window:
+            break
+    while pending:
+        result = pending.popleft().result()
+        following = next(tasks, None)
+        if following is not None:
+            pending.append(submit(following))
+        yield result
+
+
+def iter_pdf_pages(
+    file_path: str,
+    max_pages: int = 0,
+    on_progress: Optional[Callable[[int, int, int], None]] = None,
+) -> Generator[Tuple[int, str], None, int]:
+    """
+    (page number, text) for every page (or the first `max_pages`), in
+    order; returns the document's page count (so callers can tell a
+    truncated document without opening it again). Pages are fingerprinted up front (cheap next to extract_text);
+    cached pages are read back, the rest are parsed in PDF_PAGES_PER_TASK
+    batches, across a process pool when there are enough of them.
+    `on_progress(done, total, cached)` is called after each batch.
+    """
+    started = time.perf_counter()
+    cache = PageCache(PDF_PAGE_CACHE) if PDF_PAGE_CACHE else None
+    pool = None
+    done = hits = 0
+    try:
+        reader = _open(file_path)
+        page_count = len(reader.pages)
+        total = min(page_count, max_pages) if max_pages else page_count
+        fingerprints = [page_fingerprint(reader.pages[number]) for number in range(total)]
+        blocks = [range(first, min(first + PDF_PAGES_PER_TASK, total)) for first in range(0, total, PDF_PAGES_PER_TASK)]
+
+        # Which pages need parsing, per block
+        misses = []
+        for block in blocks:
+            found = cache.has_many([fingerprints[n] for n in block if fingerprints[n]]) if cache is not None else set()
+            misses.append([n for n in block if fingerprints[n] not in found])
+        tasks = [numbers for numbers in misses if numbers]
+        parse_count = sum(map(len, tasks))
+        workers = min(PDF_WORKERS, len(tasks)) if parse_count >= PDF_PARALLEL_MIN_PAGES else 1
+
+        if workers > 1:
+            # Spawned, not forked: ingestion may be running in a thread of the server process
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            parsed = _ordered(lambda numbers: pool.submit(extract_pages, file_path, numbers), tasks, 2 * workers)
+        else:
+            parsed = (extract_pages(file_path, numbers) for numbers in tasks)
+
+        for block, missing in zip(blocks, misses):
+            texts = dict(zip(missing, next(parsed))) if missing else {}
+            reused = [fingerprints[n] for n in block if n not in texts]
+            stored = cache.get_many(reused) if reused else {}
+            if cache is not None:
+                cache.put_many(
+                    [(fingerprints[n], text) for n, (text, ok) in texts.items() if ok and fingerprints[n]],
+                    reused,
+                )
+            for number in block:
+                if number in texts:
+                    yield number, texts[number][0]
+                elif fingerprints[number] in stored:
+                    yield number, stored[fingerprints[number]]
+                else:  # Pruned by another process since the lookup
+                    yield number, extract_pages(file_path, [number])[0][0]
+            done += len(block)
+            hits += len(reused)
+            if on_progress is not None:
+                on_progress(done, total, hits)
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+        if cache is not None:
+            cache.prune()
+            cache.close()
+        _local.reader = None
+
+    elapsed = time.perf_counter() - started
+    logger.info(
+        f"PDF extracted: {done} pages ({hits} cached) with {workers} workers in {elapsed:.2f}s "
+        f"({done / max(elapsed, 1e-9):.1f} pages/s)"
+    )
+    return page_count
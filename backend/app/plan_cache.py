@@ -0,0 +1,101 @@
+"""
+Neural Workflow Engine — Plan Cache
+LRU + TTL cache of planner output, keyed on the normalized directive plus a
+fingerprint of the planner prompt and tool registry. Editing TOOL_CATEGORIES
+(and reloading the registry) changes the fingerprint, so stale plans are
+never served.
+"""
+
+import os
+import re
+import copy
+import time
+import hashlib
+from collections import OrderedDict
+from typing import Optional
+
+from app.tools_registry import get_registry
+
+# ─── Config ───────────────────────────────────────────────────────────────────
+try:
+    PLAN_CACHE_MAX_ENTRIES = int(os.getenv("PLAN_CACHE_MAX_ENTRIES", 256))
+    PLAN_CACHE_TTL = float(os.getenv("PLAN_CACHE_TTL", 3600))
+except ValueError:
+    PLAN_CACHE_MAX_ENTRIES, PLAN_CACHE_TTL = 256, 3600.0
+
+# Request header that skips the cache: `X-Plan-Cache: bypass`
+PLAN_CACHE_HEADER = "X-Plan-Cache"
+BYPASS_VALUES = {"bypass", "no-cache", "off", "0", "false"}
+
+# ─── Keys ─────────────────────────────────────────────────────────────────────
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_prompt(prompt: str) -> str:
+    """Case-fold, collapse whitespace and drop trailing punctuation."""
+    return _WHITESPACE.sub(" ", prompt).strip().lower().rstrip(".!?;, ")
+
+def registry_fingerprint(planner_prompt: str) -> str:
+    """Hash of the planner prompt and the live tool registry."""
+    digest = hashlib.sha256(planner_prompt.encode("utf-8"))
+    digest.update(get_registry().fingerprint.encode("utf-8"))
+    return digest.hexdigest()
+
+def plan_cache_key(prompt: str, planner_prompt: str) -> str:
+    normalized = normalize_prompt(prompt)
+    return f"{registry_fingerprint(planner_prompt)[:16]}:{hashlib.sha256(normalized.encode('utf-8')).hexdigest()}"
+
+def cache_bypassed(header_value: Optional[str]) -> bool:
+    return bool(header_value) and header_value.strip().lower() in BYPASS_VALUES
+
+# ─── Cache ────────────────────────────────────────────────────────────────────
+class PlanCache:
+    """Size-bounded LRU with per-entry TTL and hit/miss counters."""
+
+    def __init__(self, max_entries: int = PLAN_CACHE_MAX_ENTRIES, ttl: float = PLAN_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, plan = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return copy.deepcopy(plan)
+
+    def put(self, key: str, plan: dict):
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, copy.deepcopy(plan))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+plan_cache = PlanCache()
@@ -0,0 +1,268 @@
+"""
+Neural Workflow Engine — Tolerant Plan Parsing
+Parses planner output while it streams. Each step is emitted as soon as its
+JSON object closes, so execution can start before the planner has finished
+writing later steps. The usual ways LLM JSON goes wrong are repaired instead
+of degrading the plan to a single fallback step: markdown fences and prose
+around the JSON, trailing commas, comments, raw newlines inside strings and
+output truncated mid-object.
+"""
+
+import json
+import logging
+from typing import Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def _closers(stack) -> str:
+    return "".join(_CLOSERS[opener] for opener in reversed(stack))
+
+
+def repair_json(text: str) -> Tuple[Any, List[str]]:
+    """
+    Parse the first JSON object or array in `text`, repairing common faults.
+    Returns (value, repairs) where `repairs` names each fix applied; raises
+    ValueError when nothing parseable can be recovered.
+    """
+    starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+    if not starts:
+        raise ValueError("No JSON object or array found")
+    start = min(starts)
+    repairs = []
+    if text[:start].strip():
+        repairs.append("fences" if "```" in text[:start] else "leading_text")
+
+    out: List[str] = []
+    stack: List[str] = []
+    cuts: List[Tuple[int, tuple]] = []  # (output length, open brackets) where truncated output can end
+    in_string = escape = False
+    i, n = start, len(text)
+    while i < n:
+        c = text[i]
+        if in_string:
+            out.append(c)
+            if escape:
+                escape = False
+            elif c == "\\":
+                escape = True
+            elif c == '"':
+                in_string = False
+            i += 1
+            continue
+
+        if c == '"':
+            in_string = True
+            out.append(c)
+        elif c in "{[":
+            stack.append(c)
+            out.append(c)
+            cuts.append((len(out), tuple(stack)))
+        elif c in "}]":
+            end = len(out) - 1
+            while end >= 0 and out[end].isspace():
+                end -= 1
+            if end >= 0 and out[end] == ",":
+                del out[end:]
+                repairs.append("trailing_comma")
+            expected = _CLOSERS[stack.pop()]
+            if c != expected:
+                repairs.append("mismatched_bracket")
+            out.append(expected)
+            if not stack:
+                i += 1
+                break
+        elif c == ",":
+            cuts.append((len(out), tuple(stack)))
+            out.append(c)
+        elif text.startswith("//", i):
+            newline = text.find("\n", i)
+            i = n if newline < 0 else newline
+            repairs.append("comment")
+            continue
+        elif text.startswith("/*", i):
+            close = text.find("*/", i + 2)
+            i = n if close < 0 else close + 2
+            repairs.append("comment")
+            continue
+        else:
+            out.append(c)
+        i += 1
+
+    if not stack:
+        try:
+            return json.loads("".join(out), strict=False), list(dict.fromkeys(repairs))
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Unrecoverable JSON: {e}") from e
+
+    # Truncated: close what is open, else back off to the last clean cut point
+    repairs.append("truncated")
+    body = "".join(out) + ('"' if in_string else "")
+    attempts = [body.rstrip().rstrip(",") + _closers(stack)]
+    attempts += ["".join(out[:length]).rstrip().rstrip(",") + _closers(opened) for length, opened in reversed(cuts)]
+    for attempt in attempts:
+        try:
+            return json.loads(attempt, strict=False), list(dict.fromkeys(repairs))
+        except json.JSONDecodeError:
+            continue
+    raise ValueError("Truncated JSON could not be recovered")
+
+
+def _is_step(value) -> bool:
+    return isinstance(value, dict) and bool(value.get("tool") or value.get("action"))
+
+
+class IncrementalPlanParser:
+    """
+    Feed planner deltas; get back each step the moment its object is complete.
+
+    Steps are recognised inside the top-level "steps" array (or a bare
+    top-level array). Once returned, a step is final: later text never
+    revises it, which is what makes starting it early safe.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.steps: List[dict] = []
+        self.workflow_name: Optional[str] = None
+        self.repairs: List[str] = []
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string: Optional[str] = None
+        self._key: Optional[str] = None      # Top-level key whose value is being read
+        self._steps_depth: Optional[int] = None
+        self._step_start: Optional[int] = None
+        self._done = False
+
+    def feed(self, delta: str) -> List[dict]:
+        """Consume more planner output; returns the steps completed by it."""
+        self.text += delta
+        completed = []
+        text = self.text
+        while self._pos < len(text) and not self._done:
+            i, c = self._pos, text[self._pos]
+            self._pos += 1
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    self._string_done(text[self._string_start:i + 1])
+                continue
+            if not self._stack and c not in "{[":
+                continue  # Fences or prose before the JSON
+
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c == ":" and len(self._stack) == 1:
+                self._key = self._decode(self._last_string)
+            elif c == ",":
+                if len(self._stack) == 1:
+                    self._key = None
+            elif c in "{[":
+                if c == "[" and (not self._stack or (len(self._stack) == 1 and self._key == "steps")):
+                    self._steps_depth = len(self._stack) + 1
+                elif c == "{" and self._steps_depth == len(self._stack):
+                    self._step_start = i
+                self._stack.append(c)
+            elif c in "}]":
+                self._stack.pop()
+                if c == "}" and self._step_start is not None and len(self._stack) == self._steps_depth:
+                    step = self._parse_step(text[self._step_start:i + 1])
+                    self._step_start = None
+                    if step is not None:
+                        completed.append(step)
+                if not self._stack:
+                    self._done = True
+        self.steps.extend(completed)
+        return completed
+
+    def finish(self) -> List[dict]:
+        """
+        End of output: recover a truncated final step, or — if the stream never
+        yielded steps incrementally — whatever a full repair finds. Returns the
+        steps not returned by feed().
+        """
+        recovered = []
+        if self._step_start is not None:
+            step = self._parse_step(self.text[self._step_start:])
+            if step is not None and step.get("tool") and step.get("action"):
+                # Its dependency list may be what got cut off: wait for the previous step
+                if "depends_on" not in step and self.steps:
+                    step["depends_on"] = [self.steps[-1].get("id")]
+                recovered.append(step)
+        if not self._done and self._stack:
+            self._note("truncated")
+
+        if not self.steps and not recovered:
+            try:
+                value, repairs = repair_json(self.text)
+            except ValueError as e:
+                logger.warning(f"Planner output not recoverable as JSON: {e}")
+                value, repairs = None, []
+            for fix in repairs:
+                self._note(fix)
+            if isinstance(value, dict):
+                self.workflow_name = self.workflow_name or value.get("workflow_name")
+                candidates = value.get("steps")
+                if not isinstance(candidates, list):
+                    candidates = next((v for v in value.values() if isinstance(v, list)), [])
+            else:
+                candidates = value if isinstance(value, list) else []
+            recovered = [step for step in candidates if _is_step(step)]
+
+        self.steps.extend(recovered)
+        if self.text.lstrip()[:1] not in ("{", "["):
+            self._note("fences" if "```" in self.text else "leading_text")
+        return recovered
+
+    @property
+    def truncated(self) -> bool:
+        return "truncated" in self.repairs
+
+    def plan(self) -> dict:
+        return {"workflow_name": self.workflow_name or "Untitled Workflow", "steps": list(self.steps)}
+
+    def _string_done(self, literal: str):
+        self._last_string = literal
+        if len(self._stack) == 1 and self._key == "workflow_name" and self.workflow_name is None:
+            self.workflow_name = self._decode(literal)
+
+    def _parse_step(self, text: str) -> Optional[dict]:
+        try:
+            value, repairs = repair_json(text)
+        except ValueError as e:
+            logger.warning(f"Skipping unparseable plan step: {e}")
+            return None
+        for fix in repairs:
+            self._note(fix)
+        return value if _is_step(value) else None
+
+    def _note(self, fix: str):
+        if fix not in self.repairs:
+            self.repairs.append(fix)
+
+    @staticmethod
+    def _decode(literal: Optional[str]) -> Optional[str]:
+        if literal is None:
+            return None
+        try:
+            return json.loads(literal, strict=False)
+        except json.JSONDecodeError:
+            return literal.strip('"')
+
+
+def parse_plan(text: str) -> IncrementalPlanParser:
+    """Parse a complete planner response (the non-streaming path)."""
+    parser = IncrementalPlanParser()
+    parser.feed(text)
+    parser.finish()
+    return parser
@@ -0,0 +1,308 @@
+"""
+Neural Workflow Engine — Streaming Dataset Profiling
+Profiles tabular data chunk by chunk in bounded memory: per-column types,
+null counts, min/max/mean, approximate distinct counts (KMV sketch) and
+approximate top values, plus a reservoir sample of representative rows.
+CSV files stream through pandas chunks; Excel workbooks through openpyxl
+read-only row iterators, one profile per sheet.
+"""
+
+import os
+import time
+import logging
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+logger = logging.getLogger(__name__)
+
+# ─── Config ───────────────────────────────────────────────────────────────────
+try:
+    CSV_CHUNK_ROWS = int(os.getenv("CSV_CHUNK_ROWS", 100_000))
+except ValueError:
+    CSV_CHUNK_ROWS = 100_000
+try:
+    XLSX_CHUNK_ROWS = int(os.getenv("XLSX_CHUNK_ROWS", 20_000))
+    XLSX_MAX_ROWS = int(os.getenv("XLSX_MAX_ROWS", 0))  # Per sheet; 0 = every row
+except ValueError:
+    XLSX_CHUNK_ROWS, XLSX_MAX_ROWS = 20_000, 0
+
+DISTINCT_SKETCH_SIZE = 1024   # KMV sketch: k smallest hashes kept per column
+TOP_VALUES_CAPACITY = 64      # Tracked candidates per column
+TOP_VALUES_SHOWN = 5
+HEAD_ROWS = 5
+SAMPLE_ROWS = 15
+
+_HASH_SPACE = float(2 ** 64)
+
+# ─── Column Profile ───────────────────────────────────────────────────────────
+class ColumnProfiler:
+    """Incremental statistics for one column."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.nulls = 0
+        self.kinds = set()
+        self.numeric_count = 0
+        self.numeric_sum = 0.0
+        self.minimum = None
+        self.maximum = None
+        self.sketch = np.empty(0, dtype=np.uint64)
+        self.top: Dict[object, int] = {}
+
+    def update(self, series: pd.Series):
+        self.count += len(series)
+        null_mask = series.isna()
+        self.nulls += int(null_mask.sum())
+        values = series[~null_mask]
+        if values.empty:
+            return
+
+        kind = _kind(values)
+        self.kinds.add(kind)
+        if kind in ("integer", "float"):
+            self.numeric_count += len(values)
+            self.numeric_sum += float(values.sum())
+        if kind != "text":
+            try:
+                lo, hi = values.min(), values.max()
+                self.minimum = lo if self.minimum is None else min(self.minimum, lo)
+                self.maximum = hi if self.maximum is None else max(self.maximum, hi)
+            except TypeError:
+                pass
+
+        # Approximate distinct: keep the k smallest 64-bit hashes seen so far
+        try:
+            hashes = pd.util.hash_pandas_object(values, index=False).to_numpy()
+        except TypeError:
+            hashes = pd.util.hash_pandas_object(values.astype(str), index=False).to_numpy()
+        if len(self.sketch) == DISTINCT_SKETCH_SIZE:
+            hashes = hashes[hashes < self.sketch[-1]]
+        self.sketch = np.union1d(self.sketch, hashes)[:DISTINCT_SKETCH_SIZE]
+
+        # Approximate top values: merge chunk counts, keep the heaviest candidates
+        for value, n in values.value_counts(sort=True).head(TOP_VALUES_CAPACITY).items():
+            self.top[value] = self.top.get(value, 0) + int(n)
+        if len(self.top) > TOP_VALUES_CAPACITY * 2:
+            kept = sorted(self.top.items(), key=lambda item: item[1], reverse=True)[:TOP_VALUES_CAPACITY]
+            self.top = dict(kept)
+
+    @property
+    def distinct(self) -> int:
+        if len(self.sketch) < DISTINCT_SKETCH_SIZE:
+            return len(self.sketch)
+        kth = float(self.sketch[-1]) / _HASH_SPACE
+        return int((DISTINCT_SKETCH_SIZE - 1) / kth) if kth > 0 else len(self.sketch)
+
+    @property
+    def type_name(self) -> str:
+        if not self.kinds:
+            return "empty"
+        if self.kinds <= {"integer"}:
+            return "integer"
+        if self.kinds <= {"integer", "float"}:
+            return "float"
+        if len(self.kinds) == 1:
+            return next(iter(self.kinds))
+        return "mixed"
+
+    def summary(self) -> dict:
+        mean = self.numeric_sum / self.numeric_count if self.numeric_count else None
+        # Only repeated values are informative (unique ids would just list the first rows)
+        top = sorted(((v, n) for v, n in self.top.items() if n > 1), key=lambda item: item[1], reverse=True)[:TOP_VALUES_SHOWN]
+        return {
+            "column": self.name,
+            "type": self.type_name,
+            "nulls": self.nulls,
+            "min": _fmt(self.minimum),
+            "max": _fmt(self.maximum),
+            "mean": _fmt(mean),
+            "distinct": self.distinct if len(self.sketch) < DISTINCT_SKETCH_SIZE else f"~{self.distinct}",
+            "top_values": ", ".join(f"{_fmt(v)} ({n})" for v, n in top),
+        }
+
+
+def _kind(values: pd.Series) -> str:
+    dtype = values.dtype
+    if pd.api.types.is_bool_dtype(dtype):
+        return "boolean"
+    if pd.api.types.is_integer_dtype(dtype):
+        return "integer"
+    if pd.api.types.is_float_dtype(dtype):
+        return "float"
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return "datetime"
+    return "text"
+
+
+def _fmt(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (float, np.floating)):
+        return f"{value:.4g}"
+    text = str(value)
+    return text if len(text) <= 40 else text[:37] + "..."
+
+# ─── Dataset Profile ──────────────────────────────────────────────────────────
+class DatasetProfiler:
+    """Profiles a stream of DataFrame chunks sharing one schema."""
+
+    def __init__(self, seed: int = 0):
+        self.columns: Dict[str, ColumnProfiler] = {}
+        self.rows = 0
+        self.head: List[pd.DataFrame] = []
+        self.head_rows = 0
+        self.sample: List[Optional[pd.Series]] = [None] * SAMPLE_ROWS
+        self.rng = np.random.default_rng(seed)
+
+    def update(self, chunk: pd.DataFrame):
+        for name in chunk.columns:
+            key = str(name)
+            if key not in self.columns:
+                self.columns[key] = ColumnProfiler(key)
+            self.columns[key].update(chunk[name])
+
+        # First rows verbatim, then a uniform reservoir sample over the rest
+        offset = 0
+        if self.head_rows < HEAD_ROWS:
+            take = chunk.iloc[:HEAD_ROWS - self.head_rows]
+            self.head.append(take)
+            self.head_rows += len(take)
+            offset = len(take)
+        self._reservoir(chunk.iloc[offset:], self.rows + offset - self.head_rows)
+        self.rows += len(chunk)
+
+    def _reservoir(self, rows: pd.DataFrame, seen: int):
+        """
+        Algorithm R over rows `seen`, `seen` + 1, ...: the first SAMPLE_ROWS
+        fill the reservoir, then row n replaces a random slot with
+        probability SAMPLE_ROWS / (n + 1).
+        """
+        if rows.empty:
+            return
+        positions = np.arange(seen, seen + len(rows))
+        slots = np.where(positions < SAMPLE_ROWS, positions, self.rng.integers(0, positions + 1))
+        for i in np.flatnonzero(slots < SAMPLE_ROWS):
+            self.sample[slots[i]] = rows.iloc[i]
+
+    def sample_frame(self) -> pd.DataFrame:
+        parts = list(self.head)
+        sampled = [row for row in self.sample if row is not None]
+        if sampled:
+            parts.append(pd.DataFrame(sampled))
+        return pd.concat(parts) if parts else pd.DataFrame()
+
+    def render(self, title: str, extra: str = "") -> str:
+        """Markdown summary of the whole dataset plus sample rows."""
+        profile = pd.DataFrame([c.summary() for c in self.columns.values()])
+        text = f"[{title}: {self.rows:,} rows × {len(self.columns)} columns{extra}]\n\n"
+        text += "Column profile (entire file):\n"
+        text += profile.to_markdown(index=False) if not profile.empty else "(no columns)"
+        sample = self.sample_frame()
+        if not sample.empty:
+            text += f"\n\nSample rows (first {self.head_rows} + {len(sample) - self.head_rows} sampled across file):\n"
+            text += sample.to_markdown(index=False)
+        return text
+
+# ─── Entry Points ─────────────────────────────────────────────────────────────
+def profile_csv(file_path: str, chunk_rows: int = CSV_CHUNK_ROWS) -> str:
+    """Stream an entire CSV in bounded memory and return its profile text."""
+    size = os.path.getsize(file_path)
+    started = time.perf_counter()
+    profiler = DatasetProfiler()
+
+    for chunk in pd.read_csv(file_path, chunksize=chunk_rows, low_memory=False):
+        profiler.update(chunk)
+
+    elapsed = time.perf_counter() - started
+    mb = size / (1024 * 1024)
+    logger.info(f"CSV profiled: {profiler.rows:,} rows, {mb:.1f} MB in {elapsed:.2f}s ({mb / max(elapsed, 1e-9):.1f} MB/s)")
+    return profiler.render("CSV Profile", f", {mb:.1f} MB")
+
+
+def _header(row: tuple) -> List[str]:
+    """Column names from a header row: blanks and repeats get positional names."""
+    names, seen = [], set()
+    for i, value in enumerate(row):
+        name = str(value).strip() if value is not None and str(value).strip() else f"column_{i + 1}"
+        if name in seen:
+            name = f"{name}_{i + 1}"
+        seen.add(name)
+        names.append(name)
+    return names
+
+
+def _sheet_chunks(rows, chunk_rows: int):
+    """DataFrame chunks from an iterator of row tuples (first non-empty row is the header)."""
+    header = None
+    batch = []
+    for row in rows:
+        if header is None:
+            if any(value is not None for value in row):
+                header = _header(row)
+            continue
+        if len(row) > len(header):
+            if all(value is None for value in row[len(header):]):
+                row = row[:len(header)]
+            else:
+                header += [f"column_{i + 1}" for i in range(len(header), len(row))]
+        batch.append(row)
+        if len(batch) >= chunk_rows:
+            yield pd.DataFrame(batch, columns=header[:max(map(len, batch))]).infer_objects()
+            batch = []
+    if batch:
+        yield pd.DataFrame(batch, columns=header[:max(map(len, batch))]).infer_objects()
+
+
+def profile_workbook(file_path: str, chunk_rows: int = XLSX_CHUNK_ROWS, max_rows: int = XLSX_MAX_ROWS) -> List[Tuple[str, DatasetProfiler, bool]]:
+    """
+    Stream every sheet of an .xlsx workbook in bounded memory (openpyxl
+    read-only mode parses the sheet XML incrementally). Returns one
+    (title, profiler, truncated) per sheet; with `max_rows`, a sheet stops
+    after that many rows.
+    """
+    size = os.path.getsize(file_path)
+    started = time.perf_counter()
+    workbook = load_workbook(file_path, read_only=True, data_only=True, keep_links=False)
+    sheets = []
+    try:
+        for sheet in workbook.worksheets:
+            profiler = DatasetProfiler()
+            truncated = False
+            for chunk in _sheet_chunks(sheet.iter_rows(values_only=True), chunk_rows):
+                # Truncated only once a row past max_rows shows up: a sheet of exactly max_rows is whole
+                if max_rows and profiler.rows + len(chunk) > max_rows:
+                    if profiler.rows < max_rows:
+                        profiler.update(chunk.iloc[:max_rows - profiler.rows])
+                    truncated = True
+                    break
+                profiler.update(chunk)
+            sheets.append((sheet.title, profiler, truncated))
+    finally:
+        workbook.close()
+
+    elapsed = time.perf_counter() - started
+    mb = size / (1024 * 1024)
+    rows = sum(profiler.rows for _, profiler, _ in sheets)
+    logger.info(f"XLSX profiled: {len(sheets)} sheets, {rows:,} rows, {mb:.1f} MB in {elapsed:.2f}s ({mb / max(elapsed, 1e-9):.1f} MB/s)")
+    return sheets
+
+
+def workbook_sections(sheets: List[Tuple[str, DatasetProfiler, bool]], mb: float) -> Iterator[Tuple[Optional[str], str]]:
+    """(sheet title, text) parts of the workbook summary: the overview (title None), then each sheet."""
+    rows = sum(profiler.rows for _, profiler, _ in sheets)
+    overview = pd.DataFrame([
+        {"sheet": title, "rows": f"{profiler.rows:,}+ (capped)" if truncated else profiler.rows, "columns": len(profiler.columns)}
+        for title, profiler, truncated in sheets
+    ])
+    text = f"[Excel Workbook: {len(sheets)} sheets, {rows:,} rows, {mb:.1f} MB]\n\n"
+    text += overview.to_markdown(index=False) if not overview.empty else "(no sheets)"
+    yield None, text
+    for title, profiler, truncated in sheets:
+        if not profiler.rows:
+            yield title, f"\n\n[Sheet '{title}': empty]"
+        else:
+            yield title, "\n\n" + profiler.render(f"Sheet '{title}'", f", first {XLSX_MAX_ROWS:,} rows only" if truncated else "")
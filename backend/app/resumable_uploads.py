@@ -0,0 +1,359 @@
+"""
+Neural Workflow Engine — Resumable Uploads
+tus-style chunked uploads for multi-gigabyte files: create an upload, PUT
+byte ranges at explicit offsets (in any order, optionally checksummed),
+ask for the current offset after a dropped connection, then finalize.
+
+Chunks are written in place into a file preallocated to the final size,
+so nothing is buffered or copied. Checksummed chunks are the exception:
+they are staged in a scratch file and copied in only once the digest
+matches, so a corrupt resend never overwrites bytes already accepted.
+Upload state lives in a JSON sidecar
+next to the data file and a range is only recorded after its bytes are
+fsynced, so an upload survives worker restarts and can be continued by
+any worker.
+"""
+
+import os
+import json
+import errno
+import time
+import uuid
+import base64
+import hashlib
+import asyncio
+import logging
+from contextlib import contextmanager
+from typing import AsyncIterator, List, Optional
+
+from fastapi import HTTPException
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: single worker, no cross-process locking needed
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# ─── Config ───────────────────────────────────────────────────────────────────
+try:
+    UPLOAD_CHUNK_SIZE = max(64 * 1024, int(os.getenv("UPLOAD_CHUNK_SIZE", 8 * 1024 * 1024)))  # Suggested to clients
+    UPLOAD_MAX_CHUNK = max(UPLOAD_CHUNK_SIZE, int(os.getenv("UPLOAD_MAX_CHUNK", 64 * 1024 * 1024)))
+    UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", 10 * 1024**3))
+except ValueError:
+    UPLOAD_CHUNK_SIZE, UPLOAD_MAX_CHUNK, UPLOAD_MAX_BYTES = 8 * 1024 * 1024, 64 * 1024 * 1024, 10 * 1024**3
+
+WRITE_BLOCK_SIZE = 1024 * 1024
+CHECKSUM_ALGORITHMS = ("sha256", "sha1", "md5")
+HTTP_CHECKSUM_MISMATCH = 460  # tus checksum extension
+
+
+def _merge(ranges: List[List[int]], start: int, end: int) -> List[List[int]]:
+    """Add [start, end) to sorted, non-overlapping ranges."""
+    merged = []
+    for lo, hi in sorted(ranges + [[start, end]]):
+        if merged and lo <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], hi)
+        else:
+            merged.append([lo, hi])
+    return merged
+
+
+def _missing(ranges: List[List[int]], size: int) -> List[List[int]]:
+    gaps, cursor = [], 0
+    for lo, hi in ranges:
+        if lo > cursor:
+            gaps.append([cursor, lo])
+        cursor = max(cursor, hi)
+    if cursor < size:
+        gaps.append([cursor, size])
+    return gaps
+
+
+def parse_checksum(header: Optional[str]):
+    """`Upload-Checksum: <algorithm> <base64 digest>` → (hasher, expected digest bytes)."""
+    if not header:
+        return None, None
+    try:
+        algorithm, encoded = header.strip().split(" ", 1)
+        algorithm = algorithm.lower()
+        if algorithm not in CHECKSUM_ALGORITHMS:
+            raise ValueError(algorithm)
+        expected = base64.b64decode(encoded.strip(), validate=True)
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Upload-Checksum must be '<algorithm> <base64 digest>' with algorithm in {', '.join(CHECKSUM_ALGORITHMS)}",
+        )
+    return hashlib.new(algorithm), expected
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(WRITE_BLOCK_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _copy_into(source: str, target: str, offset: int):
+    """Write a file's bytes into another at `offset`, durably."""
+    fd = os.open(target, os.O_WRONLY)
+    try:
+        with open(source, "rb") as f:
+            while block := f.read(WRITE_BLOCK_SIZE):
+                offset += os.pwrite(fd, block, offset)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _preallocate(fd: int, size: int):
+    """Reserve the disk space up front so a full disk fails at create, not at 2.9 GB."""
+    try:
+        os.posix_fallocate(fd, 0, size)
+    except (AttributeError, OSError) as e:
+        if isinstance(e, OSError) and e.errno == errno.ENOSPC:
+            raise
+        os.ftruncate(fd, size)  # No fallocate support: sparse file of the right size
+
+# ─── Store ────────────────────────────────────────────────────────────────────
+class ResumableUploadStore:
+    """
+    Upload state on disk: `<id>.json` (sidecar) and `<id>.bin` (data).
+    Sidecar updates are atomic renames under an flock on the data file, so
+    workers writing different ranges of one upload don't lose each other's
+    progress.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, upload_id: str):
+        if not upload_id.isalnum():
+            raise HTTPException(status_code=404, detail="Upload not found")
+        base = os.path.join(self.directory, upload_id)
+        return base + ".json", base + ".bin"
+
+    def _read(self, upload_id: str) -> dict:
+        meta_path, _ = self._paths(upload_id)
+        try:
+            with open(meta_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Upload not found")
+
+    def _save(self, state: dict):
+        meta_path, _ = self._paths(state["upload_id"])
+        state["updated_at"] = time.time()
+        tmp = f"{meta_path}.{uuid.uuid4().hex[:6]}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, meta_path)
+
+    @contextmanager
+    def _locked(self, upload_id: str):
+        """Exclusive lock for a read-modify-write of one upload's state."""
+        _, data_path = self._paths(upload_id)
+        try:
+            fd = os.open(data_path, os.O_RDWR)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Upload not found")
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            yield self._read(upload_id)
+        finally:
+            os.close(fd)  # Releases the flock
+
+    @staticmethod
+    def public(state: dict) -> dict:
+        """State as returned to clients: contiguous offset plus any gaps."""
+        ranges = state["ranges"]
+        offset = ranges[0][1] if ranges and ranges[0][0] == 0 else 0
+        return {
+            "upload_id": state["upload_id"],
+            "filename": state["filename"],
+            "size": state["size"],
+            "offset": offset,
+            "received": sum(hi - lo for lo, hi in ranges),
+            "missing": _missing(ranges, state["size"]),
+            "status": state["status"],
+            "chunk_size": UPLOAD_CHUNK_SIZE,
+            "max_chunk": UPLOAD_MAX_CHUNK,
+            "result": state.get("result"),
+            "updated_at": state["updated_at"],
+        }
+
+    def create(self, filename: str, size: int, sha256: Optional[str] = None) -> dict:
+        if size <= 0 or size > UPLOAD_MAX_BYTES:
+            raise HTTPException(status_code=413, detail=f"Upload size must be between 1 byte and {UPLOAD_MAX_BYTES} bytes")
+        upload_id = uuid.uuid4().hex
+        _, data_path = self._paths(upload_id)
+        fd = os.open(data_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o600)
+        try:
+            _preallocate(fd, size)
+        except OSError as e:
+            os.close(fd)
+            os.remove(data_path)
+            raise HTTPException(status_code=507, detail=f"Not enough disk space for {size} bytes: {e}")
+        os.close(fd)
+        now = time.time()
+        state = {
+            "upload_id": upload_id,
+            "filename": filename,
+            "size": size,
+            "sha256": sha256.lower() if sha256 else None,
+            "ranges": [],
+            "status": "uploading",
+            "result": None,
+            "created_at": now,
+        }
+        self._save(state)
+        logger.info(f"Resumable upload {upload_id} created: {filename} ({size} bytes)")
+        return state
+
+    def get(self, upload_id: str) -> dict:
+        return self._read(upload_id)
+
+    async def write_chunk(
+        self,
+        upload_id: str,
+        offset: int,
+        chunks: AsyncIterator[bytes],
+        checksum: Optional[str] = None,
+        length: Optional[int] = None,
+    ) -> dict:
+        """
+        Write a request body at `offset` straight into the data file.
+
+        With a checksum the body goes to a scratch file first and is copied
+        into place and recorded only if the digest matches (460 otherwise,
+        and the client resends the chunk). Without one, whatever arrived
+        before a dropped connection is kept, so the client resumes mid-chunk.
+        """
+        state = self._read(upload_id)
+        if state["status"] != "uploading":
+            raise HTTPException(status_code=409, detail=f"Upload is {state['status']}")
+        if offset < 0 or offset > state["size"]:
+            raise HTTPException(status_code=416, detail=f"Offset {offset} outside 0..{state['size']}")
+        if length is not None and (length > UPLOAD_MAX_CHUNK or offset + length > state["size"]):
+            raise HTTPException(status_code=413, detail="Chunk too large or past the declared upload size")
+        hasher, expected = parse_checksum(checksum)
+
+        _, data_path = self._paths(upload_id)
+        if hasher is not None:
+            staged = os.path.join(self.directory, f"{upload_id}.{uuid.uuid4().hex[:6]}.part")  # Collected with the upload
+            fd, shift = os.open(staged, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o600), offset
+        else:
+            staged = None
+            fd, shift = os.open(data_path, os.O_WRONLY), 0
+        position = offset  # In the upload; the file offset is position - shift
+        pending = bytearray()
+        verified = False
+        try:
+            async for piece in chunks:
+                if position + len(pending) + len(piece) > min(state["size"], offset + UPLOAD_MAX_CHUNK):
+                    raise HTTPException(status_code=413, detail="Chunk too large or past the declared upload size")
+                if hasher is not None:
+                    hasher.update(piece)
+                pending += piece
+                if len(pending) >= WRITE_BLOCK_SIZE:
+                    position += await asyncio.to_thread(os.pwrite, fd, bytes(pending), position - shift)
+                    pending.clear()
+            if pending:
+                position += await asyncio.to_thread(os.pwrite, fd, bytes(pending), position - shift)
+                pending.clear()
+            if hasher is not None and hasher.digest() != expected:
+                raise HTTPException(status_code=HTTP_CHECKSUM_MISMATCH, detail="Checksum mismatch; resend the chunk")
+            verified = True
+        finally:
+            if hasher is None and pending:
+                # Keep what arrived before the drop
+                position += await asyncio.to_thread(os.pwrite, fd, bytes(pending), position)
+            # Durable before recorded: a restart never trusts bytes that weren't written
+            keep = position > offset and (verified or hasher is None)
+            if keep and staged is None:
+                await asyncio.to_thread(os.fsync, fd)
+            os.close(fd)
+            try:
+                if keep:
+                    # The flock can be held for a while (finalize hashes under it): wait in a thread
+                    state = await asyncio.to_thread(self._record, upload_id, offset, position, staged)
+            finally:
+                if staged is not None:
+                    os.remove(staged)
+        return state
+
+    def _record(self, upload_id: str, start: int, end: int, staged: Optional[str] = None) -> dict:
+        """
+        Add a written range to the upload's state, copying a verified
+        scratch file into place first (blocking: takes the lock).
+        """
+        with self._locked(upload_id) as state:
+            if state["status"] != "uploading":  # Finalized while this chunk was in flight
+                raise HTTPException(status_code=409, detail=f"Upload is {state['status']}")
+            if staged is not None:
+                _, data_path = self._paths(upload_id)
+                _copy_into(staged, data_path, start)
+            state["ranges"] = _merge(state["ranges"], start, end)
+            self._save(state)
+        return state
+
+    def finalize(self, upload_id: str) -> dict:
+        """
+        Check the upload is complete and hash it (blocking: run it in a
+        thread). Returns the state with `data_path` and `sha256` set; the
+        caller moves the data file on and then calls `complete()` with the
+        outcome. An upload left "finalizing" by a crash can be finalized again.
+        """
+        state = self._read(upload_id)
+        if state["status"] == "completed":
+            return state  # Retried finalize: the data file has already moved on
+        with self._locked(upload_id) as state:
+            missing = _missing(state["ranges"], state["size"])
+            if missing:
+                raise HTTPException(status_code=409, detail={"message": "Upload incomplete", "missing": missing})
+            _, data_path = self._paths(upload_id)
+            digest = file_sha256(data_path)
+            if state["sha256"] and digest != state["sha256"]:
+                raise HTTPException(status_code=HTTP_CHECKSUM_MISMATCH, detail="Upload does not match the declared sha256")
+            state["status"] = "finalizing"
+            self._save(state)
+        return {**state, "sha256": digest, "data_path": data_path}
+
+    def complete(self, upload_id: str, result: dict):
+        """Record the finalize response so a retried finalize returns it again."""
+        state = self._read(upload_id)
+        state.update(status="completed", result=result)
+        self._save(state)
+
+    def reopen(self, upload_id: str):
+        """Finalize failed before the data moved on: let the client retry it."""
+        state = self._read(upload_id)
+        state["status"] = "uploading"
+        self._save(state)
+
+    def delete(self, upload_id: str):
+        for path in self._paths(upload_id):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def collect_garbage(self, cutoff: float) -> int:
+        """Remove uploads whose data and sidecar are both untouched since `cutoff`."""
+        files, touched = {}, {}
+        for entry in os.scandir(self.directory):
+            upload_id = entry.name.split(".", 1)[0]
+            files.setdefault(upload_id, []).append(entry.path)
+            touched[upload_id] = max(touched.get(upload_id, 0.0), entry.stat().st_mtime)
+        stale = [upload_id for upload_id, mtime in touched.items() if mtime < cutoff]
+        for upload_id in stale:
+            for path in files[upload_id]:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        return len(stale)
@@ -0,0 +1,270 @@
+"""
+Neural Workflow Engine — Lexical Retrieval
+Splits uploaded documents into overlapping chunks and ranks them against a
+query with Okapi BM25, so /api/chat-rag only sends the relevant passages.
+"""
+
+import os
+import re
+import math
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+# ─── Config ───────────────────────────────────────────────────────────────────
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+RAG_CHUNK_SIZE = _env_int("RAG_CHUNK_SIZE", 1200)        # characters per chunk
+RAG_CHUNK_OVERLAP = _env_int("RAG_CHUNK_OVERLAP", 200)   # characters shared by neighbours
+RAG_TOP_K = _env_int("RAG_TOP_K", 12)
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:[._-][a-z0-9]+)*")
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have in is it its of on or that the "
+    "this to was were will with what which who how why when where do does did can".split()
+)
+
+# ─── Helpers ──────────────────────────────────────────────────────────────────
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords."""
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def chunk_text(text: str, size: int = RAG_CHUNK_SIZE, overlap: int = RAG_CHUNK_OVERLAP) -> List[dict]:
+    """
+    Split text into overlapping windows of roughly `size` characters.
+    Boundaries are moved back to the nearest whitespace so words stay whole.
+    """
+    return list(iter_chunks([{"text": text}], size, overlap))
+
+
+def iter_chunks(segments: Iterable[dict], size: int = RAG_CHUNK_SIZE, overlap: int = RAG_CHUNK_OVERLAP) -> Iterator[dict]:
+    """
+    chunk_text over a stream of extraction segments, pulling only as much
+    text as the next window needs. Offsets are into the segments' texts
+    concatenated; each chunk also carries the location keys (page, sheet,
+    ...) of the segment it starts in.
+    """
+    overlap = max(0, min(overlap, size // 2))
+    segments = iter(segments)
+    buffer = ""
+    base = 0       # Offset of buffer[0] in the whole text
+    marks = []     # (offset, location) of the segments still in the buffer
+    start = 0
+    exhausted = False
+
+    while True:
+        # Buffer past start + size (or to the end) so the cut below sees what chunk_text would
+        while not exhausted and base + len(buffer) <= start + size:
+            segment = next(segments, None)
+            if segment is None:
+                exhausted = True
+            elif segment["text"]:
+                marks.append((base + len(buffer), {k: v for k, v in segment.items() if k != "text"}))
+                buffer += segment["text"]
+        length = base + len(buffer)
+        if start >= length:
+            break
+
+        end = min(start + size, length)
+        if end < length:
+            cut = buffer.rfind(" ", start + size // 2 - base, end - base)
+            newline = buffer.rfind("\n", start + size // 2 - base, end - base)
+            cut = max(cut, newline)
+            if cut > start - base:
+                end = cut + base
+        piece = buffer[start - base:end - base].strip()
+        while len(marks) > 1 and marks[1][0] <= start:
+            marks.pop(0)
+        if piece:
+            yield {**marks[0][1], "text": piece, "start": start, "end": end}
+        if end >= length:
+            break
+        start = max(end - overlap, start + 1)
+
+        # Drop consumed text once it's at least half the buffer (amortized linear)
+        if start - base > len(buffer) // 2:
+            buffer = buffer[start - base:]
+            base = start
+
+# ─── Postings ─────────────────────────────────────────────────────────────────
+class Postings:
+    """
+    One document's inverted index in flat arrays: for each term, the
+    positions of the chunks it occurs in and how often. Chunks are only
+    referenced by position; their text stays in the document store.
+    """
+
+    def __init__(self, terms: List[str], bounds: np.ndarray, chunks: np.ndarray, tfs: np.ndarray, lengths: np.ndarray):
+        self.terms: Dict[str, int] = {term: slot for slot, term in enumerate(terms)}
+        self.bounds = bounds      # int64 [n_terms + 1]: term slot → range in chunks / tfs
+        self.chunks = chunks      # int32 chunk positions, grouped by term
+        self.tfs = tfs            # int32 term frequencies, aligned with chunks
+        self.lengths = lengths    # int32 [n_chunks]: tokens per chunk
+
+    @property
+    def chunk_count(self) -> int:
+        return int(self.lengths.size)
+
+    @property
+    def total_length(self) -> int:
+        return int(self.lengths.sum())
+
+    def frequency(self, term: str) -> int:
+        """Number of chunks containing the term."""
+        slot = self.terms.get(term)
+        return 0 if slot is None else int(self.bounds[slot + 1] - self.bounds[slot])
+
+    def save(self, file):
+        """Write as an uncompressed .npz (terms as one newline-joined UTF-8 blob)."""
+        blob = "\n".join(self.terms).encode("utf-8")
+        np.savez(
+            file,
+            terms=np.frombuffer(blob, dtype=np.uint8),
+            bounds=self.bounds, chunks=self.chunks, tfs=self.tfs, lengths=self.lengths,
+        )
+
+    @classmethod
+    def load(cls, file) -> "Postings":
+        with np.load(file) as data:
+            blob = data["terms"].tobytes().decode("utf-8")
+            return cls(blob.split("\n") if blob else [], data["bounds"], data["chunks"], data["tfs"], data["lengths"])
+
+    def lookup(self, term: str):
+        """(chunk positions, term frequencies) for a term, or None."""
+        slot = self.terms.get(term)
+        if slot is None:
+            return None
+        lo, hi = self.bounds[slot], self.bounds[slot + 1]
+        return self.chunks[lo:hi], self.tfs[lo:hi]
+
+
+class PostingsBuilder:
+    """Collects Postings one chunk at a time, in compact typed arrays."""
+
+    def __init__(self):
+        self.terms: Dict[str, int] = {}
+        self._term_slots = array("i")
+        self._chunks = array("i")
+        self._tfs = array("i")
+        self._lengths = array("i")
+
+    def add(self, text: str):
+        position = len(self._lengths)
+        counts = Counter(tokenize(text))
+        for term, tf in counts.items():
+            self._term_slots.append(self.terms.setdefault(term, len(self.terms)))
+            self._chunks.append(position)
+            self._tfs.append(tf)
+        self._lengths.append(sum(counts.values()))
+
+    def build(self) -> Postings:
+        slots = np.frombuffer(self._term_slots, dtype=np.int32)
+        order = np.argsort(slots, kind="stable")  # Stable: chunks stay in document order per term
+        bounds = np.zeros(len(self.terms) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(slots, minlength=len(self.terms)), out=bounds[1:])
+        return Postings(
+            list(self.terms),
+            bounds,
+            np.frombuffer(self._chunks, dtype=np.int32)[order],
+            np.frombuffer(self._tfs, dtype=np.int32)[order],
+            np.frombuffer(self._lengths, dtype=np.int32).copy(),
+        )
+
+# ─── Index ────────────────────────────────────────────────────────────────────
+class BM25Index:
+    """In-process BM25 over documents' Postings; statistics span every indexed document."""
+
+    def __init__(self):
+        self.docs: Dict[str, Postings] = {}
+        self.chunk_total = 0
+        self.total_length = 0
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self.docs
+
+    @property
+    def avg_length(self) -> float:
+        return self.total_length / self.chunk_total if self.chunk_total else 0.0
+
+    def add_document(self, doc_id: str, text: str) -> int:
+        """(Re)index a document; returns the number of chunks."""
+        return self.add_chunks(doc_id, [chunk["text"] for chunk in chunk_text(text)])
+
+    def add_chunks(self, doc_id: str, texts: Iterable[str]) -> int:
+        """(Re)index a document from pre-split chunk texts."""
+        builder = PostingsBuilder()
+        for text in texts:
+            builder.add(text)
+        return self.add_postings(doc_id, builder.build())
+
+    def add_postings(self, doc_id: str, postings: Postings) -> int:
+        """(Re)index a document from prebuilt postings."""
+        self.remove_document(doc_id)
+        self.docs[doc_id] = postings
+        self.chunk_total += postings.chunk_count
+        self.total_length += postings.total_length
+        return postings.chunk_count
+
+    def remove_document(self, doc_id: str):
+        postings = self.docs.pop(doc_id, None)
+        if postings is not None:
+            self.chunk_total -= postings.chunk_count
+            self.total_length -= postings.total_length
+
+    def search(self, query: str, k: int = RAG_TOP_K, doc_ids: Optional[Iterable[str]] = None) -> List[dict]:
+        """Top-k chunks ({doc, position, score}) by BM25 score, optionally restricted to some documents."""
+        if doc_ids is None:
+            selected = list(self.docs.items())
+        else:
+            selected = [(d, self.docs[d]) for d in dict.fromkeys(doc_ids) if d in self.docs]
+        if not selected:
+            return []
+
+        n = self.chunk_total
+        avg = self.avg_length or 1.0
+        weights = {}
+        for term in set(tokenize(query)):
+            df = sum(postings.frequency(term) for postings in self.docs.values())
+            if df:
+                weights[term] = math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+        ranked = []
+        for doc_id, postings in selected:
+            scores = None
+            for term, idf in weights.items():
+                found = postings.lookup(term)
+                if found is None:
+                    continue
+                chunks, tfs = found
+                if scores is None:
+                    scores = np.zeros(postings.chunk_count)
+                norm = tfs + BM25_K1 * (1 - BM25_B + BM25_B * postings.lengths[chunks] / avg)
+                scores[chunks] += idf * tfs * (BM25_K1 + 1) / norm
+            if scores is None:
+                continue
+            matched = np.flatnonzero(scores)
+            if matched.size > k:
+                matched = np.sort(matched[np.argpartition(-scores[matched], k - 1)[:k]])
+            ranked += [(float(scores[i]), doc_id, int(i)) for i in matched]
+
+        ranked.sort(key=lambda hit: hit[0], reverse=True)
+        return [{"doc": doc_id, "position": position, "score": score} for score, doc_id, position in ranked[:k]]
+
+    def leading_chunks(self, doc_id: str, count: int) -> List[dict]:
+        """First chunks of a document, used when a query matches nothing."""
+        postings = self.docs.get(doc_id)
+        total = postings.chunk_count if postings is not None else 0
+        return [{"doc": doc_id, "position": position, "score": 0.0} for position in range(min(count, total))]
+
+
+rag_index = BM25Index()
@@ -0,0 +1,87 @@
+"""
+Neural Workflow Engine — Single-Flight Request Coalescing
+Identical upstream LLM calls that overlap in time share one request: the
+first caller starts it, later callers await the same task. Errors fan out
+to every waiter; the shared request is only cancelled once every waiter
+has given up on it.
+"""
+
+import json
+import asyncio
+import hashlib
+import logging
+from typing import Awaitable, Callable, Dict, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def request_key(provider: str, model: str, messages: list, temperature: float, **params) -> str:
+    """Stable hash of everything that determines an upstream completion."""
+    payload = json.dumps(
+        {"provider": provider, "model": model, "messages": messages, "temperature": temperature, **params},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """In-flight request table: key → shared task and its waiter count."""
+
+    def __init__(self):
+        self._flights: Dict[str, dict] = {}
+        self.calls = 0
+        self.upstream = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.cancelled = 0
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[T]]) -> T:
+        """Await `factory()`, sharing the call with any identical one already in flight."""
+        self.calls += 1
+        flight = self._flights.get(key)
+        if flight is None:
+            self.upstream += 1
+            task = asyncio.ensure_future(factory())
+            flight = {"task": task, "waiters": 0}
+            self._flights[key] = flight
+            task.add_done_callback(lambda t, key=key: self._finished(key, t))
+        else:
+            self.coalesced += 1
+
+        flight["waiters"] += 1
+        try:
+            # Shielded: one caller going away must not cancel the others' request
+            return await asyncio.shield(flight["task"])
+        except asyncio.CancelledError:
+            if flight["waiters"] == 1 and not flight["task"].done():
+                # Unlisted first, so a caller arriving before the task winds down starts a fresh flight
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                flight["task"].cancel()
+                self.cancelled += 1
+            raise
+        finally:
+            flight["waiters"] -= 1
+
+    def _finished(self, key: str, task: asyncio.Task):
+        if self._flights.get(key, {}).get("task") is task:
+            del self._flights[key]
+        if not task.cancelled() and task.exception() is not None:
+            self.errors += 1
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "upstream_requests": self.upstream,
+            "coalesced": self.coalesced,
+            "coalesced_ratio": round(self.coalesced / self.calls, 4) if self.calls else 0.0,
+            "errors": self.errors,
+            "cancelled": self.cancelled,
+            "in_flight": len(self._flights),
+        }
+
+
+llm_flights = SingleFlight()
@@ -0,0 +1,88 @@
+"""
+Neural Workflow Engine — Server-Sent Events
+Helpers for proxying upstream token streams to the browser as SSE.
+"""
+
+import json
+import asyncio
+import logging
+from typing import AsyncIterator, Awaitable, Callable
+import httpx
+from fastapi.responses import StreamingResponse
+
+logger = logging.getLogger(__name__)
+
+# Event names emitted by the /stream endpoints
+EVENT_PLAN_DELTA = "plan.delta"
+EVENT_PLAN_STEP = "plan.step"
+EVENT_PLAN_COMPLETED = "plan.completed"
+EVENT_STEP_STARTED = "step.started"
+EVENT_STEP_DELTA = "step.delta"
+EVENT_STEP_COMPLETED = "step.completed"
+EVENT_WORKFLOW_COMPLETED = "workflow.completed"
+EVENT_CHAT_DELTA = "chat.delta"
+EVENT_CHAT_COMPLETED = "chat.completed"
+EVENT_ERROR = "error"
+
+
+def sse_event(event: str, data) -> str:
+    """Format one SSE frame with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    """Wrap an async iterator of SSE frames in an unbuffered response."""
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",  # Disable proxy buffering (nginx/Render)
+        },
+    )
+
+
+async def iter_completion_deltas(response: httpx.Response) -> AsyncIterator[str]:
+    """Yield content deltas from an OpenAI-compatible `stream: true` response."""
+    async for line in response.aiter_lines():
+        if not line.startswith("data:"):
+            continue
+        payload = line[5:].strip()
+        if payload == "[DONE]":
+            break
+        try:
+            chunk = json.loads(payload)
+        except json.JSONDecodeError:
+            logger.warning(f"Skipping malformed stream chunk: {payload[:80]}")
+            continue
+        choices = chunk.get("choices") or []
+        if not choices:
+            continue
+        delta = (choices[0].get("delta") or {}).get("content")
+        if delta:
+            yield delta
+
+
+async def stream_from_producer(produce: Callable[[Callable[[str], Awaitable[None]]], Awaitable[object]]) -> AsyncIterator[str]:
+    """
+    Run `produce(emit)` as a background task and yield every frame it emits.
+
+    Lets concurrent producers (e.g. parallel DAG steps) interleave into one
+    stream. A failure becomes an `error` event; a client disconnect cancels
+    the producer.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    task = asyncio.create_task(produce(queue.put))
+
+    def finished(t: asyncio.Task):
+        if not t.cancelled() and t.exception() is not None:
+            queue.put_nowait(sse_event(EVENT_ERROR, {"error": str(t.exception())}))
+        queue.put_nowait(None)
+
+    task.add_done_callback(finished)
+    try:
+        while (frame := await queue.get()) is not None:
+            yield frame
+    finally:
+        task.cancel()
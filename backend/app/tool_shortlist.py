@@ -0,0 +1,76 @@
+"""
+Neural Workflow Engine — Planner Tool Shortlisting
+Ranks registry tools against a directive with BM25 so the planner prompt
+lists only the most relevant tools instead of the whole registry. Every
+category keeps an anchor tool, so the planner can still cover steps the
+directive does not spell out.
+"""
+
+import os
+from functools import lru_cache
+from typing import List, Optional
+
+from app.retrieval import BM25Index
+from app.tools_registry import ToolRegistry, FALLBACK_TOOL, get_registry, word_stems
+
+# ─── Config ───────────────────────────────────────────────────────────────────
+try:
+    # Tools retrieved per planning call (0 = list the whole registry)
+    PLANNER_TOOL_SHORTLIST = int(os.getenv("PLANNER_TOOL_SHORTLIST", 40))
+except ValueError:
+    PLANNER_TOOL_SHORTLIST = 40
+
+
+def _expand(text: str) -> str:
+    """Text plus crude stems and split identifiers, so 'analyze' meets 'analytics'."""
+    text = text.replace(".", " ").replace("_", " ")
+    return f"{text} {' '.join(word_stems(text))}"
+
+# ─── Shortlister ──────────────────────────────────────────────────────────────
+class ToolShortlister:
+    def __init__(self, registry: ToolRegistry):
+        self.registry = registry
+        # The registry is indexed as one document with a chunk per tool
+        self.tools = list(registry.by_name)
+        self.lexical = BM25Index()
+        self.lexical.add_chunks("tools", (
+            _expand(f"{name} {tool['description']} {tool['category']}") for name, tool in registry.by_name.items()
+        ))
+        # First tool of each category: always offered so no category disappears entirely
+        self.anchors = [tools[0]["name"] for tools in registry.by_category.values() if tools]
+
+    def shortlist(self, directive: str, n: int = PLANNER_TOOL_SHORTLIST) -> List[str]:
+        """Names of the `n` tools most relevant to a directive (category anchors included)."""
+        ranked = self.lexical.search(_expand(directive), k=n)
+        chosen = {FALLBACK_TOOL, *self.anchors}
+        for hit in ranked:
+            if len(chosen) >= max(n, len(self.anchors) + 1):
+                break
+            chosen.add(self.tools[hit["position"]])
+        return [name for name in self.registry.names if name in chosen]
+
+
+@lru_cache(maxsize=4)
+def _shortlister(fingerprint: str) -> ToolShortlister:
+    return ToolShortlister(get_registry())
+
+
+@lru_cache(maxsize=1024)
+def _planner_tools(directive: str, n: int, fingerprint: str):
+    registry = get_registry()
+    names = _shortlister(fingerprint).shortlist(directive, n)
+    return registry.render_summary(set(names)), len(names)
+
+
+def shortlist_cache_info():
+    """Hit/miss counters of the per-directive shortlist cache."""
+    return _planner_tools.cache_info()
+
+
+def planner_tools(directive: str, n: Optional[int] = None):
+    """(tool summary, number of tools listed) for one planning request."""
+    registry = get_registry()
+    n = PLANNER_TOOL_SHORTLIST if n is None else n
+    if n <= 0 or n >= len(registry):
+        return registry.planner_summary, len(registry)
+    return _planner_tools(directive, n, registry.fingerprint)
@@ -1,8 +1,18 @@
 """
 Neural Workflow Engine — Tools Registry
-272 AI-powered tools across 19 categories.
+262 AI-powered tools across 19 categories.
+
+TOOL_CATEGORIES is the source data. It is compiled once at import into
+name- and category-indexed lookups, the planner summary and the /api/tools
+payload (with its ETag); call reload_registry() after editing it at runtime.
 """
 
+import re
+import json
+import difflib
+import hashlib
+from typing import Dict, List, Optional, Tuple
+
 TOOL_CATEGORIES = [
     {
         "name": "Communication",
@@ -383,30 +393,132 @@ TOOL_CATEGORIES = [
 ]
 
 
+# ─── Compiled Index ───────────────────────────────────────────────────────────
+# Used when a planned tool matches nothing at all
+FALLBACK_TOOL = "doc.report"
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+class ToolRegistry:
+    """Read-only indexes built from TOOL_CATEGORIES."""
+
+    def __init__(self, categories: List[dict]):
+        self.by_name: Dict[str, dict] = {}
+        self.by_category: Dict[str, List[dict]] = {}
+        self.emojis: Dict[str, str] = {}
+        self.words: Dict[str, set] = {}
+        for cat in categories:
+            tools = [{**tool, "category": cat["name"]} for tool in cat["tools"]]
+            self.by_category[cat["name"]] = tools
+            self.emojis[cat["name"]] = cat["emoji"]
+            for tool in tools:
+                self.by_name[tool["name"]] = tool
+                self.words[tool["name"]] = word_stems(f"{tool['name']} {tool['description']}")
+        self.names = list(self.by_name)
+        self._folded = {_fold(name): name for name in self.names}
+        self.planner_summary = self.render_summary()
+
+        self.payload = {"count": len(self.by_name), "categories": categories}
+        self.payload_json = json.dumps(self.payload, ensure_ascii=False).encode("utf-8")
+        self.fingerprint = hashlib.sha256(json.dumps(categories, sort_keys=True).encode("utf-8")).hexdigest()
+        self.etag = f'"{self.fingerprint[:32]}"'
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.by_name
+
+    def render_summary(self, names: Optional[set] = None) -> str:
+        """Planner tool list grouped under category headers (optionally only `names`)."""
+        lines = []
+        for category, tools in self.by_category.items():
+            listed = [t for t in tools if names is None or t["name"] in names]
+            if not listed:
+                continue
+            lines.append(f"{self.emojis[category]} {category.upper()}:")
+            lines.extend(f"- {t['name']}: {t['description']}" for t in listed)
+            lines.append("")
+        return "\n".join(lines)
+
+    def __len__(self) -> int:
+        return len(self.by_name)
+
+    def nearest(self, name: str, hint: str = "") -> Tuple[str, str]:
+        """
+        Closest registered tool for an unknown name, without another LLM call.
+        Returns (tool_name, method).
+        """
+        name = (name or "").strip()
+        if name in self.by_name:
+            return name, "exact"
+        folded = self._folded.get(_fold(name))
+        if folded:
+            return folded, "normalized"
+
+        # Spelling slips within the same namespace first ("email.drafts"), then anywhere
+        lowered = name.lower().replace("_", ".") if "." not in name else name.lower()
+        prefix = lowered.split(".", 1)[0] + "."
+        same_namespace = [n for n in self.names if n.startswith(prefix)]
+        for candidates in (same_namespace, self.names):
+            close = difflib.get_close_matches(lowered, candidates, n=1, cutoff=0.75)
+            if close:
+                return close[0], "spelling"
+
+        # Otherwise the tool whose name + description shares the most words with the step
+        words = word_stems(f"{name} {hint}")
+        if words:
+            best = max(self.names, key=lambda n: len(words & self.words[n]) + 0.5 * n.startswith(prefix))
+            if words & self.words[best]:
+                return best, "keywords"
+        return FALLBACK_TOOL, "fallback"
+
+    def validate_steps(self, steps: List[dict]) -> Tuple[List[dict], List[dict]]:
+        """Replace unknown tools in planned steps; returns (steps, repairs)."""
+        repaired, repairs = [], []
+        for step in steps:
+            tool = step.get("tool")
+            if isinstance(tool, str) and tool in self.by_name:
+                repaired.append(step)
+                continue
+            hint = f"{step.get('action', '')} {step.get('input_description', '')}"
+            fixed, method = self.nearest(tool if isinstance(tool, str) else "", hint)
+            repairs.append({"step_id": step.get("id"), "from": tool, "to": fixed, "method": method})
+            repaired.append({**step, "tool": fixed})
+        return repaired, repairs
+
+
+def word_stems(text: str) -> set:
+    """Crude stems (first five letters) so 'analyze' meets 'analysis'."""
+    return {w[:5] for w in _WORD.findall(text.lower()) if len(w) > 1}
+
+
+def _fold(name: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", name.lower())
+
+
+registry = ToolRegistry(TOOL_CATEGORIES)
+
+
+def reload_registry() -> ToolRegistry:
+    """Recompile the indexes after TOOL_CATEGORIES changed at runtime."""
+    global registry
+    registry = ToolRegistry(TOOL_CATEGORIES)
+    return registry
+
+
+def get_registry() -> ToolRegistry:
+    return registry
+
+# ─── Helpers ──────────────────────────────────────────────────────────────────
 def get_all_tools_flat():
     """Return a flat list of all tools."""
-    tools = []
-    for cat in TOOL_CATEGORIES:
-        for tool in cat["tools"]:
-            tools.append({**tool, "category": cat["name"]})
-    return tools
+    return [dict(tool) for tool in registry.by_name.values()]
 
 
 def get_tool_count():
     """Return total number of tools."""
-    return sum(len(cat["tools"]) for cat in TOOL_CATEGORIES)
+    return len(registry)
 
 
 def get_planner_tool_summary():
     """Return a compact summary of tools for the planner prompt."""
-    lines = []
-    for cat in TOOL_CATEGORIES:
-        emoji = cat["emoji"]
-        name = cat["name"].upper()
-        tool_names = [t["name"] for t in cat["tools"]]
-        lines.append(f"{emoji} {name}:")
-        for tn in tool_names:
-            desc = next(t["description"] for t in cat["tools"] if t["name"] == tn)
-            lines.append(f"- {tn}: {desc}")
-        lines.append("")
-    return "\n".join(lines)
+    return registry.planner_summary
@@ -0,0 +1,131 @@
+"""
+Neural Workflow Engine — Upstream HTTP Clients
+One long-lived, pooled httpx.AsyncClient per AI provider (OpenRouter, Groq).
+Clients are opened on app startup and closed on shutdown (see main.lifespan).
+"""
+
+import os
+import time
+import asyncio
+import logging
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# ─── Config ───────────────────────────────────────────────────────────────────
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+UPSTREAM_MAX_CONNECTIONS = _env_int("UPSTREAM_MAX_CONNECTIONS", 100)
+UPSTREAM_MAX_KEEPALIVE = _env_int("UPSTREAM_MAX_KEEPALIVE", 20)
+UPSTREAM_KEEPALIVE_EXPIRY = _env_float("UPSTREAM_KEEPALIVE_EXPIRY", 30.0)
+UPSTREAM_HTTP2 = _env_bool("UPSTREAM_HTTP2", False)
+
+# Rate-limit backpressure: retries on 429/503 and the cap on any single wait.
+UPSTREAM_RATE_LIMIT_RETRIES = _env_int("UPSTREAM_RATE_LIMIT_RETRIES", 3)
+UPSTREAM_MAX_BACKOFF = _env_float("UPSTREAM_MAX_BACKOFF", 20.0)
+
+# Per-provider timeouts (seconds). Read timeout covers long completions.
+PROVIDER_TIMEOUTS = {
+    "openrouter": {
+        "connect": _env_float("OPENROUTER_CONNECT_TIMEOUT", 10.0),
+        "read": _env_float("OPENROUTER_TIMEOUT", 60.0),
+    },
+    "groq": {
+        "connect": _env_float("GROQ_CONNECT_TIMEOUT", 10.0),
+        "read": _env_float("GROQ_TIMEOUT", 60.0),
+    },
+}
+
+# ─── Client Pool ──────────────────────────────────────────────────────────────
+_clients = {}
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def _build_client(provider: str) -> httpx.AsyncClient:
+    timeouts = PROVIDER_TIMEOUTS.get(provider, {"connect": 10.0, "read": 60.0})
+    http2 = UPSTREAM_HTTP2 and _http2_available()
+    if UPSTREAM_HTTP2 and not http2:
+        logger.warning("UPSTREAM_HTTP2 requested but 'h2' is not installed; using HTTP/1.1.")
+
+    return httpx.AsyncClient(
+        http2=http2,
+        timeout=httpx.Timeout(timeouts["read"], connect=timeouts["connect"]),
+        limits=httpx.Limits(
+            max_connections=UPSTREAM_MAX_CONNECTIONS,
+            max_keepalive_connections=UPSTREAM_MAX_KEEPALIVE,
+            keepalive_expiry=UPSTREAM_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+def get_client(provider: str) -> httpx.AsyncClient:
+    """Return the shared client for a provider, creating it on first use."""
+    client = _clients.get(provider)
+    if client is None or client.is_closed:
+        client = _build_client(provider)
+        _clients[provider] = client
+    return client
+
+async def open_clients():
+    """Warm up one client per configured provider."""
+    for provider in PROVIDER_TIMEOUTS:
+        get_client(provider)
+    logger.info(f"Upstream clients ready: {', '.join(_clients)}")
+
+async def close_clients():
+    """Close every shared client and drop its pooled connections."""
+    for provider, client in list(_clients.items()):
+        await client.aclose()
+        _clients.pop(provider, None)
+
+
+# ─── Rate-Limit Backpressure ──────────────────────────────────────────────────
+# When a provider answers 429/503, every caller for that provider waits out the
+# same cooldown instead of hammering it with more doomed requests.
+RETRYABLE_STATUS = {429, 503}
+_cooldown_until = {}
+
+def retry_after_seconds(response: httpx.Response, attempt: int) -> float:
+    """Delay requested by the provider, else exponential backoff."""
+    header = response.headers.get("retry-after")
+    delay = None
+    if header:
+        try:
+            delay = float(header)
+        except ValueError:
+            delay = None
+    if delay is None:
+        delay = 0.5 * (2 ** attempt)
+    return min(max(delay, 0.0), UPSTREAM_MAX_BACKOFF)
+
+def note_rate_limited(provider: str, delay: float):
+    """Push the provider's shared cooldown out by `delay` seconds."""
+    until = time.monotonic() + delay
+    if until > _cooldown_until.get(provider, 0.0):
+        _cooldown_until[provider] = until
+
+async def wait_for_capacity(provider: str):
+    """Sleep until the provider's cooldown (if any) has expired."""
+    remaining = _cooldown_until.get(provider, 0.0) - time.monotonic()
+    if remaining > 0:
+        await asyncio.sleep(remaining)
@@ -0,0 +1,165 @@
+"""
+Neural Workflow Engine — Dense Vector Retrieval
+Offline embeddings (signed feature hashing, no network) stored in one
+contiguous float32 NumPy matrix. Search is a matrix-vector product over the
+selected documents' rows.
+Vectors persist with their document (see document_store), not here.
+"""
+
+import os
+import zlib
+import logging
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from app.retrieval import tokenize
+
+logger = logging.getLogger(__name__)
+
+# ─── Config ───────────────────────────────────────────────────────────────────
+try:
+    RAG_VECTOR_DIM = int(os.getenv("RAG_VECTOR_DIM", 256))
+except ValueError:
+    RAG_VECTOR_DIM = 256
+
+RRF_K = 60  # Reciprocal-rank-fusion damping constant
+
+# ─── Embeddings ───────────────────────────────────────────────────────────────
+class HashingVectorizer:
+    """
+    Deterministic bag-of-words + bigram embedding via the hashing trick.
+    Each feature lands in one of `dim` buckets with a hash-derived sign, counts
+    are log-scaled and rows are L2-normalized so dot product == cosine.
+    """
+
+    def __init__(self, dim: int = RAG_VECTOR_DIM):
+        self.dim = dim
+
+    def _features(self, text: str) -> List[str]:
+        tokens = tokenize(text)
+        return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+    def transform_one(self, text: str, out: Optional[np.ndarray] = None) -> np.ndarray:
+        vec = out if out is not None else np.zeros(self.dim, dtype=np.float32)
+        vec[:] = 0.0
+        features = self._features(text)
+        if not features:
+            return vec
+        hashes = np.fromiter((zlib.crc32(f.encode("utf-8")) for f in features), dtype=np.uint32, count=len(features))
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+        np.add.at(vec, hashes % self.dim, signs)
+        np.copyto(vec, np.sign(vec) * np.log1p(np.abs(vec)))
+        norm = np.linalg.norm(vec)
+        if norm > 0:
+            vec /= norm
+        return vec
+
+    def transform(self, texts: List[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            self.transform_one(text, matrix[row])
+        return matrix
+
+# ─── Index ────────────────────────────────────────────────────────────────────
+class VectorIndex:
+    """
+    Chunk vectors in a growable float32 matrix. Each document's rows are
+    contiguous and in chunk order, so a row is known by (doc_id, position)
+    alone.
+    """
+
+    def __init__(self, dim: int = RAG_VECTOR_DIM):
+        self.vectorizer = HashingVectorizer(dim)
+        self.dim = dim
+        self.vectors = np.zeros((0, dim), dtype=np.float32)
+        self.doc_rows: Dict[str, range] = {}
+        self.size = 0  # Rows in use, tombstones included
+
+    def __len__(self) -> int:
+        return sum(len(rows) for rows in self.doc_rows.values())
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self.doc_rows
+
+    @property
+    def nbytes(self) -> int:
+        return self.size * self.dim * 4
+
+    def _reserve(self, extra: int):
+        needed = self.size + extra
+        if needed <= self.vectors.shape[0]:
+            return
+        capacity = max(needed, 2 * self.vectors.shape[0], 1024)
+        grown = np.zeros((capacity, self.dim), dtype=np.float32)
+        grown[:self.size] = self.vectors[:self.size]
+        self.vectors = grown
+
+    def add_document(self, doc_id: str, vectors: np.ndarray) -> int:
+        """(Re)index a document from its chunk vectors, one row per chunk in order."""
+        self.remove_document(doc_id)
+        count = len(vectors)
+        if not count:
+            return 0
+        self._reserve(count)
+        self.vectors[self.size:self.size + count] = vectors
+        self.doc_rows[doc_id] = range(self.size, self.size + count)
+        self.size += count
+        return count
+
+    def add_texts(self, doc_id: str, texts: List[str]) -> int:
+        """(Re)index a document by embedding its chunk texts."""
+        return self.add_document(doc_id, self.vectorizer.transform(texts))
+
+    def remove_document(self, doc_id: str):
+        if self.doc_rows.pop(doc_id, None) is None:
+            return
+        # Compact once more than half the rows are tombstones
+        if self.size and len(self) < self.size // 2:
+            self._compact()
+
+    def _compact(self):
+        spans = sorted(self.doc_rows.items(), key=lambda item: item[1].start)
+        self.vectors = np.concatenate(
+            [self.vectors[rows.start:rows.stop] for _, rows in spans] or [np.zeros((0, self.dim), dtype=np.float32)]
+        )
+        self.size = 0
+        for doc_id, rows in spans:
+            self.doc_rows[doc_id] = range(self.size, self.size + len(rows))
+            self.size += len(rows)
+
+    def search(self, query: str, k: int = 12, doc_ids: Optional[Iterable[str]] = None) -> List[dict]:
+        """Top-k chunks ({doc, position, score}) by cosine similarity, optionally restricted to some documents."""
+        docs = list(self.doc_rows) if doc_ids is None else [d for d in dict.fromkeys(doc_ids) if d in self.doc_rows]
+        if not docs:
+            return []
+        q = self.vectorizer.transform_one(query)
+        if not q.any():
+            return []
+
+        # One matrix-vector product per document's row block, no copy of the rows
+        spans = [self.doc_rows[d] for d in docs]
+        scores = np.concatenate([self.vectors[rows.start:rows.stop] @ q for rows in spans])
+        ends = np.cumsum([len(rows) for rows in spans])
+
+        k = min(k, scores.size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        hits = []
+        for i in top:
+            if scores[i] <= 0:
+                break
+            owner = int(np.searchsorted(ends, i, side="right"))
+            hits.append({"doc": docs[owner], "position": int(i - ends[owner] + len(spans[owner])), "score": float(scores[i])})
+        return hits
+
+
+def fuse_rankings(*rankings: List[dict], k: int = 12) -> List[dict]:
+    """Reciprocal-rank fusion of several ranked hit lists, keyed on (doc, position)."""
+    fused: Dict[tuple, dict] = {}
+    for ranking in rankings:
+        for rank, hit in enumerate(ranking):
+            key = (hit["doc"], hit["position"])
+            entry = fused.setdefault(key, {**hit, "score": 0.0})
+            entry["score"] += 1.0 / (RRF_K + rank + 1)
+    return sorted(fused.values(), key=lambda h: h["score"], reverse=True)[:k]
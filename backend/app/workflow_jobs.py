@@ -0,0 +1,267 @@
+"""
+Neural Workflow Engine — Workflow Jobs
+Long plan-and-execute runs become jobs: the request returns at once with a
+job id, and a fixed pool of asyncio workers takes jobs from a priority
+queue. Each user may only have a few jobs running at a time; their other
+jobs wait in the queue without holding a worker.
+
+The queue is per process; job status is published to the shared job store
+(app.job_store), so any uvicorn worker can answer a poll or a cancel.
+"""
+
+import os
+import time
+import uuid
+import bisect
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from app.job_store import get_job_store
+from app.metrics import WORKFLOW_JOB_WAIT, WORKFLOW_JOB_RUN, WORKFLOW_JOBS_REJECTED
+
+logger = logging.getLogger(__name__)
+
+# ─── Config ───────────────────────────────────────────────────────────────────
+try:
+    WORKFLOW_JOB_WORKERS = max(1, int(os.getenv("WORKFLOW_JOB_WORKERS", 4)))
+    WORKFLOW_JOB_MAX_QUEUE = max(1, int(os.getenv("WORKFLOW_JOB_MAX_QUEUE", 64)))
+    WORKFLOW_JOBS_PER_USER = max(1, int(os.getenv("WORKFLOW_JOBS_PER_USER", 2)))  # Running at once
+    WORKFLOW_JOB_USER_QUEUE = max(1, int(os.getenv("WORKFLOW_JOB_USER_QUEUE", 10)))  # Queued + running
+    WORKFLOW_JOB_RETENTION = float(os.getenv("WORKFLOW_JOB_RETENTION", 3600))
+except ValueError:
+    WORKFLOW_JOB_WORKERS, WORKFLOW_JOB_MAX_QUEUE = 4, 64
+    WORKFLOW_JOBS_PER_USER, WORKFLOW_JOB_USER_QUEUE, WORKFLOW_JOB_RETENTION = 2, 10, 3600.0
+
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+JOB_KIND = "workflow"
+CANCEL_POLL_INTERVAL = 1.0  # Seconds between checks for cancels sent to other workers
+
+# Job phases and the progress fraction reported for each
+PHASES = {
+    "queued": 0.0,
+    "running": 0.05,
+    "completed": 1.0,
+    "failed": 1.0,
+    "cancelled": 1.0,
+}
+ACTIVE_PHASES = ("queued", "running")
+
+# ─── State ────────────────────────────────────────────────────────────────────
+workflow_jobs: Dict[str, dict] = {}
+_work: Dict[str, Callable[[dict], Awaitable[object]]] = {}
+_pending: List[Tuple[int, int, str]] = []  # Sorted (priority, sequence, job_id)
+_tasks: Dict[str, asyncio.Task] = {}       # Running jobs
+_workers: List[asyncio.Task] = []
+_changed = asyncio.Condition()
+_sequence = 0
+
+
+def start_workers():
+    """Start the worker pool (called on app startup)."""
+    if not _workers:
+        _workers.extend(asyncio.create_task(_worker()) for _ in range(WORKFLOW_JOB_WORKERS))
+        _workers.append(asyncio.create_task(_watch_cancels()))
+        logger.info(f"Workflow job pool ready: {WORKFLOW_JOB_WORKERS} workers")
+
+
+async def stop_workers():
+    """Cancel the workers and every running job, and wait for them (called on app shutdown)."""
+    tasks = [*_workers, *_tasks.values()]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    _workers.clear()
+
+# ─── Helpers ──────────────────────────────────────────────────────────────────
+def set_phase(job: dict, status: str, **fields):
+    job.update(fields)
+    job["status"] = status
+    job["progress"] = max(job.get("progress", 0.0), PHASES[status])
+    job["updated_at"] = time.time()
+    get_job_store().publish(JOB_KIND, job)
+
+
+def set_progress(job: dict, progress: float, **fields):
+    """Report progress from inside a running job (never moves backwards)."""
+    job.update(fields)
+    job["progress"] = round(max(job["progress"], min(progress, 0.99)), 3)
+    job["updated_at"] = time.time()
+    get_job_store().publish(JOB_KIND, job)
+
+
+def _active_for(user_id: Optional[str], status: Optional[str] = None) -> int:
+    return sum(
+        1 for job in workflow_jobs.values()
+        if job["user_id"] == user_id and (job["status"] == status if status else job["status"] in ACTIVE_PHASES)
+    )
+
+
+def _prune_finished():
+    cutoff = time.time() - WORKFLOW_JOB_RETENTION
+    for job_id, job in list(workflow_jobs.items()):
+        if job["status"] not in ACTIVE_PHASES and job["updated_at"] < cutoff:
+            del workflow_jobs[job_id]
+    get_job_store().prune(JOB_KIND, cutoff, ACTIVE_PHASES)
+
+
+def queue_stats() -> dict:
+    """Queue depth, running jobs and the oldest wait, for sizing the pool."""
+    now = time.time()
+    queued = [workflow_jobs[job_id] for _, _, job_id in _pending]
+    return {
+        "workers": WORKFLOW_JOB_WORKERS,
+        "queued": len(queued),
+        "running": len(_tasks),
+        "oldest_wait_seconds": round(max((now - job["created_at"] for job in queued), default=0.0), 3),
+        "per_user_limit": WORKFLOW_JOBS_PER_USER,
+    }
+
+
+def queue_position(job_id: str) -> Optional[int]:
+    """1-based place in the queue (ignoring per-user caps), None once taken."""
+    for position, (_, _, queued_id) in enumerate(_pending, 1):
+        if queued_id == job_id:
+            return position
+    return None
+
+
+async def submit_job(work: Callable[[dict], Awaitable[object]], user_id: Optional[str] = None, priority: str = "normal", **fields) -> dict:
+    """
+    Queue `work(job)` and return the new job record. The job's result is
+    whatever `work` returns. Raises 400 on an unknown priority and 429 when
+    the queue, or the user's share of it, is full.
+    """
+    global _sequence
+    if priority not in PRIORITIES:
+        raise HTTPException(status_code=400, detail=f"Unknown priority '{priority}'. Use one of: {', '.join(PRIORITIES)}")
+    _prune_finished()
+    if len(_pending) >= WORKFLOW_JOB_MAX_QUEUE:
+        WORKFLOW_JOBS_REJECTED.inc("queue_full")
+        raise HTTPException(
+            status_code=429,
+            detail=f"Workflow queue full ({WORKFLOW_JOB_MAX_QUEUE} jobs). Retry shortly.",
+            headers={"Retry-After": "10"},
+        )
+    if user_id is not None and _active_for(user_id) >= WORKFLOW_JOB_USER_QUEUE:
+        WORKFLOW_JOBS_REJECTED.inc("user_limit")
+        raise HTTPException(
+            status_code=429,
+            detail=f"Too many workflow jobs in progress for this user ({WORKFLOW_JOB_USER_QUEUE}).",
+            headers={"Retry-After": "10"},
+        )
+
+    job_id = uuid.uuid4().hex[:12]
+    now = time.time()
+    job = {
+        "job_id": job_id,
+        "user_id": user_id,
+        "priority": priority,
+        "status": "queued",
+        "progress": 0.0,
+        "result": None,
+        "error": None,
+        "created_at": now,
+        "started_at": None,
+        "updated_at": now,
+        **fields,
+    }
+    workflow_jobs[job_id] = job
+    get_job_store().publish(JOB_KIND, job)
+    _work[job_id] = work
+    _sequence += 1
+    async with _changed:
+        bisect.insort(_pending, (PRIORITIES[priority], _sequence, job_id))
+        _changed.notify()
+    return job
+
+
+async def get_job(job_id: str) -> Optional[dict]:
+    """A job from this worker, else its last published status (run by another worker)."""
+    job = workflow_jobs.get(job_id)
+    if job is not None:
+        return job
+    return await asyncio.to_thread(get_job_store().get, JOB_KIND, job_id)
+
+
+async def cancel_job(job_id: str) -> dict:
+    """
+    Cancel a queued or running job; finished jobs are returned unchanged. A
+    job owned by another worker is flagged, and that worker cancels it
+    within CANCEL_POLL_INTERVAL.
+    """
+    job = workflow_jobs.get(job_id)
+    if job is None:
+        job = await asyncio.to_thread(get_job_store().request_cancel, JOB_KIND, job_id, ACTIVE_PHASES)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Workflow job not found")
+        return job
+    if job["status"] == "queued":
+        async with _changed:
+            _pending[:] = [entry for entry in _pending if entry[2] != job_id]
+        _work.pop(job_id, None)
+        set_phase(job, "cancelled", error="Cancelled before start")
+    elif job["status"] == "running":
+        set_phase(job, "cancelled", error="Cancelled")
+        task = _tasks.get(job_id)
+        if task is not None:
+            task.cancel()
+    return job
+
+# ─── Workers ──────────────────────────────────────────────────────────────────
+async def _watch_cancels():
+    """Cancel this worker's jobs that a DELETE on another worker flagged."""
+    while True:
+        await asyncio.sleep(CANCEL_POLL_INTERVAL)
+        active = [job_id for job_id, job in workflow_jobs.items() if job["status"] in ACTIVE_PHASES]
+        if not active:
+            continue
+        try:
+            for job_id in await asyncio.to_thread(get_job_store().cancel_requested, JOB_KIND, active):
+                logger.info(f"Workflow job {job_id} cancelled from another worker")
+                await cancel_job(job_id)
+        except Exception as e:
+            logger.error(f"Cancel check failed: {e}")
+
+
+def _take_next() -> Optional[dict]:
+    """Highest-priority queued job whose user is below the running cap (anonymous jobs are uncapped)."""
+    for i, (_, _, job_id) in enumerate(_pending):
+        job = workflow_jobs[job_id]
+        if job["user_id"] is None or _active_for(job["user_id"], "running") < WORKFLOW_JOBS_PER_USER:
+            del _pending[i]
+            return job
+    return None
+
+
+async def _worker():
+    while True:
+        async with _changed:
+            while (job := _take_next()) is None:
+                await _changed.wait()
+            # Claim it under the lock so the per-user count is exact
+            set_phase(job, "running", started_at=time.time())
+
+        WORKFLOW_JOB_WAIT.observe(job["started_at"] - job["created_at"], job["priority"])
+        task = _tasks[job["job_id"]] = asyncio.create_task(_work.pop(job["job_id"])(job))
+        started = time.perf_counter()
+        try:
+            result = await task
+            set_phase(job, "completed", result=result)
+            logger.info(f"Workflow job {job['job_id']} completed in {time.perf_counter() - started:.1f}s")
+        except asyncio.CancelledError:
+            if job["status"] != "cancelled":
+                task.cancel()
+                raise  # The worker itself is shutting down
+            logger.info(f"Workflow job {job['job_id']} cancelled")
+        except Exception as e:
+            logger.error(f"Workflow job {job['job_id']} failed: {e}")
+            set_phase(job, "failed", error=str(e))
+        finally:
+            _tasks.pop(job["job_id"], None)
+            WORKFLOW_JOB_RUN.observe(time.perf_counter() - started, job["status"])
+            # A finished job may unblock one of the same user's queued jobs
+            async with _changed:
+                _changed.notify_all()
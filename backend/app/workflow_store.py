@@ -0,0 +1,350 @@
+"""
+Neural Workflow Engine — Workflow Store
+Bounded storage for planned workflows and their step results.
+
+- InMemoryWorkflowStore: single-process, LRU/TTL bounded (dev, tests)
+
+Methods block (SQLite lock waits): async callers run them via asyncio.to_thread.
+- SQLiteWorkflowStore:   WAL-mode SQLite file shared by every uvicorn worker
+
+Select with WORKFLOW_STORE=memory|sqlite (default sqlite).
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# ─── Config ───────────────────────────────────────────────────────────────────
+WORKFLOW_STORE = os.getenv("WORKFLOW_STORE", "sqlite").lower()
+WORKFLOW_DB_PATH = os.getenv("WORKFLOW_DB_PATH", "workflows.db")
+try:
+    WORKFLOW_TTL = float(os.getenv("WORKFLOW_TTL", 7 * 24 * 3600))
+    WORKFLOW_MAX_ENTRIES = int(os.getenv("WORKFLOW_MAX_ENTRIES", 10_000))
+except ValueError:
+    WORKFLOW_TTL, WORKFLOW_MAX_ENTRIES = 7 * 24 * 3600.0, 10_000
+
+EVICT_EVERY_WRITES = 100
+
+# Columns kept outside the JSON blob so they can be indexed / updated in place
+_CORE_FIELDS = ("workflow_id", "user_id", "prompt", "workflow_name", "status", "steps", "results", "created_at")
+
+
+class WorkflowStore(ABC):
+    """Interface shared by the store backends."""
+
+    @abstractmethod
+    def create(self, workflow: dict):
+        ...
+
+    @abstractmethod
+    def get(self, workflow_id: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def get_results(self, workflow_id: str, step_ids: Optional[List[int]] = None) -> Dict[str, str]:
+        ...
+
+    @abstractmethod
+    def save_result(self, workflow_id: str, step_id: int, output: str):
+        ...
+
+    @abstractmethod
+    def update(self, workflow_id: str, **fields):
+        ...
+
+    @abstractmethod
+    def list_by_user(self, user_id: str, limit: int = 50) -> List[dict]:
+        ...
+
+    @abstractmethod
+    def __contains__(self, workflow_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    def close(self):
+        pass
+
+# ─── In-Memory ────────────────────────────────────────────────────────────────
+class InMemoryWorkflowStore(WorkflowStore):
+    def __init__(self, max_entries: int = WORKFLOW_MAX_ENTRIES, ttl: float = WORKFLOW_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.RLock()  # Called from asyncio.to_thread workers
+        self._items: "OrderedDict[str, dict]" = OrderedDict()
+        self._touched: Dict[str, float] = {}
+
+    def _alive(self, workflow_id: str) -> Optional[dict]:
+        workflow = self._items.get(workflow_id)
+        if workflow is None:
+            return None
+        if self._touched[workflow_id] + self.ttl < time.time():
+            self._drop(workflow_id)
+            return None
+        return workflow
+
+    def _drop(self, workflow_id: str):
+        self._items.pop(workflow_id, None)
+        self._touched.pop(workflow_id, None)
+
+    def _touch(self, workflow_id: str):
+        self._touched[workflow_id] = time.time()
+        self._items.move_to_end(workflow_id)
+        while len(self._items) > self.max_entries:
+            oldest, _ = self._items.popitem(last=False)
+            self._touched.pop(oldest, None)
+
+    def _purge_expired(self):
+        # Items are kept in touch order: the expired ones are at the front
+        cutoff = time.time() - self.ttl
+        while self._items:
+            oldest = next(iter(self._items))
+            if self._touched[oldest] >= cutoff:
+                break
+            self._drop(oldest)
+
+    def create(self, workflow: dict):
+        with self._lock:
+            self._items[workflow["workflow_id"]] = {**workflow, "results": dict(workflow.get("results", {}))}
+            self._touch(workflow["workflow_id"])
+
+    def get(self, workflow_id: str) -> Optional[dict]:
+        with self._lock:
+            workflow = self._alive(workflow_id)
+            return {**workflow, "results": dict(workflow["results"])} if workflow else None
+
+    def get_results(self, workflow_id: str, step_ids: Optional[List[int]] = None) -> Dict[str, str]:
+        with self._lock:
+            workflow = self._alive(workflow_id)
+            if workflow is None:
+                return {}
+            results = workflow["results"]
+            if step_ids is None:
+                return dict(results)
+            wanted = {str(s) for s in step_ids}
+            return {k: v for k, v in results.items() if k in wanted}
+
+    def save_result(self, workflow_id: str, step_id: int, output: str):
+        with self._lock:
+            workflow = self._alive(workflow_id)
+            if workflow is not None:
+                workflow["results"][str(step_id)] = output
+                self._touch(workflow_id)
+
+    def update(self, workflow_id: str, **fields):
+        with self._lock:
+            workflow = self._alive(workflow_id)
+            if workflow is not None:
+                workflow.update(fields)
+                self._touch(workflow_id)
+
+    def list_by_user(self, user_id: str, limit: int = 50) -> List[dict]:
+        with self._lock:
+            self._purge_expired()
+            matches = [w for w in reversed(self._items.values()) if w.get("user_id") == user_id]
+            return [_summary(w) for w in matches[:limit]]
+
+    def __contains__(self, workflow_id: str) -> bool:
+        with self._lock:
+            return self._alive(workflow_id) is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._purge_expired()
+            return len(self._items)
+
+# ─── SQLite ───────────────────────────────────────────────────────────────────
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS workflows (
+    workflow_id   TEXT PRIMARY KEY,
+    user_id       TEXT,
+    prompt        TEXT NOT NULL,
+    workflow_name TEXT,
+    status        TEXT NOT NULL,
+    steps         TEXT NOT NULL,
+    extra         TEXT NOT NULL DEFAULT '{}',
+    created_at    TEXT NOT NULL,
+    updated_at    REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_workflows_user ON workflows (user_id, updated_at);
+CREATE INDEX IF NOT EXISTS idx_workflows_updated ON workflows (updated_at);
+CREATE TABLE IF NOT EXISTS step_results (
+    workflow_id TEXT NOT NULL REFERENCES workflows (workflow_id) ON DELETE CASCADE,
+    step_id     TEXT NOT NULL,
+    output      TEXT NOT NULL,
+    PRIMARY KEY (workflow_id, step_id)
+);
+"""
+
+
+class SQLiteWorkflowStore(WorkflowStore):
+    """
+    One row per workflow plus one row per step result, so each step is an
+    incremental INSERT rather than a rewrite of the whole workflow. WAL mode
+    lets several worker processes read while one writes.
+    """
+
+    def __init__(self, path: str = WORKFLOW_DB_PATH, max_entries: int = WORKFLOW_MAX_ENTRIES, ttl: float = WORKFLOW_TTL):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, timeout=10.0, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(_SCHEMA)
+
+    def _write(self, sql: str, params: tuple = ()):
+        with self._lock:
+            self._conn.execute(sql, params)
+            self._writes += 1
+            if self._writes % EVICT_EVERY_WRITES == 0:
+                self._evict()
+
+    def _evict(self):
+        """Drop expired workflows, then the least recently updated beyond the cap."""
+        self._conn.execute("DELETE FROM workflows WHERE updated_at < ?", (time.time() - self.ttl,))
+        self._conn.execute(
+            "DELETE FROM workflows WHERE workflow_id IN ("
+            " SELECT workflow_id FROM workflows ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def _row_to_workflow(self, row: sqlite3.Row, results: Dict[str, str]) -> dict:
+        workflow = json.loads(row["extra"])
+        workflow.update({
+            "workflow_id": row["workflow_id"],
+            "user_id": row["user_id"],
+            "prompt": row["prompt"],
+            "workflow_name": row["workflow_name"],
+            "status": row["status"],
+            "steps": json.loads(row["steps"]),
+            "results": results,
+            "created_at": row["created_at"],
+        })
+        return workflow
+
+    def create(self, workflow: dict):
+        extra = {k: v for k, v in workflow.items() if k not in _CORE_FIELDS}
+        self._write(
+            "INSERT OR REPLACE INTO workflows "
+            "(workflow_id, user_id, prompt, workflow_name, status, steps, extra, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                workflow["workflow_id"], workflow.get("user_id"), workflow["prompt"],
+                workflow.get("workflow_name"), workflow.get("status", "planned"),
+                json.dumps(workflow.get("steps", [])), json.dumps(extra),
+                workflow.get("created_at", ""), time.time(),
+            ),
+        )
+        for step_id, output in workflow.get("results", {}).items():
+            self.save_result(workflow["workflow_id"], step_id, output)
+
+    def _fresh_row(self, workflow_id: str) -> Optional[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT * FROM workflows WHERE workflow_id = ? AND updated_at >= ?",
+                (workflow_id, time.time() - self.ttl),
+            ).fetchone()
+
+    def get(self, workflow_id: str) -> Optional[dict]:
+        row = self._fresh_row(workflow_id)
+        if row is None:
+            return None
+        return self._row_to_workflow(row, self.get_results(workflow_id))
+
+    def get_results(self, workflow_id: str, step_ids: Optional[List[int]] = None) -> Dict[str, str]:
+        sql = "SELECT step_id, output FROM step_results WHERE workflow_id = ?"
+        params: tuple = (workflow_id,)
+        if step_ids is not None:
+            if not step_ids:
+                return {}
+            sql += f" AND step_id IN ({','.join('?' * len(step_ids))})"
+            params += tuple(str(s) for s in step_ids)
+        with self._lock:
+            rows = self._conn.execute(sql + " ORDER BY CAST(step_id AS INTEGER)", params).fetchall()
+        return {row["step_id"]: row["output"] for row in rows}
+
+    def save_result(self, workflow_id: str, step_id: int, output: str):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = self._conn.execute(
+                    "UPDATE workflows SET updated_at = ? WHERE workflow_id = ?", (time.time(), workflow_id)
+                )
+                if cursor.rowcount:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO step_results (workflow_id, step_id, output) VALUES (?, ?, ?)",
+                        (workflow_id, str(step_id), output),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def update(self, workflow_id: str, **fields):
+        columns = {k: v for k, v in fields.items() if k in ("status", "workflow_name")}
+        if "steps" in fields:
+            columns["steps"] = json.dumps(fields["steps"])
+        assignments = [f"{name} = ?" for name in columns]
+        params = list(columns.values())
+        extra = {k: v for k, v in fields.items() if k not in _CORE_FIELDS}
+        if extra:
+            # Non-core fields live in the JSON blob; merge rather than overwrite
+            assignments.append("extra = json_patch(extra, ?)")
+            params.append(json.dumps(extra))
+        if not assignments:
+            return
+        self._write(
+            f"UPDATE workflows SET {', '.join(assignments)}, updated_at = ? WHERE workflow_id = ?",
+            (*params, time.time(), workflow_id),
+        )
+
+    def list_by_user(self, user_id: str, limit: int = 50) -> List[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM workflows WHERE user_id = ? AND updated_at >= ? ORDER BY updated_at DESC LIMIT ?",
+                (user_id, time.time() - self.ttl, limit),
+            ).fetchall()
+        return [_summary(self._row_to_workflow(row, {})) for row in rows]
+
+    def __contains__(self, workflow_id: str) -> bool:
+        return self._fresh_row(workflow_id) is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM workflows").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+# ─── Helpers ──────────────────────────────────────────────────────────────────
+def _summary(workflow: dict) -> dict:
+    return {
+        "workflow_id": workflow["workflow_id"],
+        "workflow_name": workflow.get("workflow_name"),
+        "status": workflow.get("status"),
+        "prompt": workflow.get("prompt"),
+        "created_at": workflow.get("created_at"),
+    }
+
+
+def create_workflow_store() -> WorkflowStore:
+    if WORKFLOW_STORE == "memory":
+        return InMemoryWorkflowStore()
+    logger.info(f"Workflow store: SQLite (WAL) at {WORKFLOW_DB_PATH}")
+    return SQLiteWorkflowStore(WORKFLOW_DB_PATH)
@@ -0,0 +1,6 @@
+"""
+Neural Workflow Engine — Benchmarks
+Offline performance scripts. Run from backend/, e.g.:
+    python -m benchmarks.bench_vector_index --chunks 200000
+Each script prints a JSON report so runs can be diffed.
+"""
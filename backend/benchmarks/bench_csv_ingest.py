@@ -0,0 +1,77 @@
+"""
+CSV ingestion benchmark: streams a synthetic CSV through profile_csv and
+reports throughput (MB/s) and peak RSS, so bounded memory can be checked
+against file size.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from app.profiling import profile_csv, CSV_CHUNK_ROWS
+
+
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def write_synthetic_csv(path: str, target_mb: float, seed: int = 7):
+    """Append 100k-row blocks of mixed-type data until the file reaches target_mb."""
+    rng = np.random.default_rng(seed)
+    block = 100_000
+    written = 0
+    first = True
+    while not os.path.exists(path) or os.path.getsize(path) < target_mb * 2**20:
+        df = pd.DataFrame({
+            "order_id": np.arange(written, written + block),
+            "region": rng.choice(["NA", "EU", "APAC", "LATAM", "MEA"], block),
+            "sku": rng.integers(0, 50_000, block).astype(str),
+            "quantity": rng.integers(1, 20, block),
+            "unit_price": rng.gamma(2.0, 30.0, block).round(2),
+            "discount": np.where(rng.random(block) < 0.1, np.nan, rng.random(block).round(3)),
+            "status": rng.choice(["paid", "refunded", "pending"], block, p=[0.85, 0.05, 0.10]),
+        })
+        df.to_csv(path, mode="w" if first else "a", header=first, index=False)
+        first = False
+        written += block
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--mb", type=float, nargs="+", default=[50, 200])
+    parser.add_argument("--chunk-rows", type=int, default=CSV_CHUNK_ROWS)
+    args = parser.parse_args()
+
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for mb in args.mb:
+            path = os.path.join(tmp, f"synthetic_{mb:g}mb.csv")
+            write_synthetic_csv(path, mb)
+            size_mb = os.path.getsize(path) / 2**20
+            rss_before = peak_rss_mb()
+            start = time.perf_counter()
+            text = profile_csv(path, chunk_rows=args.chunk_rows)
+            elapsed = time.perf_counter() - start
+            runs.append({
+                "file_mb": round(size_mb, 1),
+                "seconds": round(elapsed, 2),
+                "mb_per_s": round(size_mb / elapsed, 1),
+                "peak_rss_mb": round(peak_rss_mb(), 1),
+                "peak_rss_mb_before": round(rss_before, 1),
+                "context_chars": len(text),
+            })
+            os.remove(path)
+
+    print(json.dumps({"benchmark": "csv_ingest", "chunk_rows": args.chunk_rows, "runs": runs}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
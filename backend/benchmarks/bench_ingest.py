@@ -0,0 +1,180 @@
+"""
+Ingestion microbenchmarks: synthetic PDF, CSV and XLSX files of several
+sizes pushed through prepare_document (extract, chunk, embed, write to the
+document store) — the same worker-side path /api/upload uses.
+
+Each case runs in a fresh process so its peak RSS is its own. Reports
+seconds, MB/s, chunks and peak RSS per file as JSON; compare two runs with
+`python -m benchmarks.compare`.
+
+    python -m benchmarks.bench_ingest --pdf-pages 10 100 --csv-mb 10 50 --xlsx-rows 5000 50000
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import argparse
+import resource
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from benchmarks.bench_csv_ingest import write_synthetic_csv
+
+WORDS = (
+    "revenue churn margin forecast quarter pipeline customer invoice contract "
+    "renewal discount region product launch campaign budget hiring roadmap "
+    "latency outage incident deploy release security audit compliance policy"
+).split()
+
+
+def peak_rss_mb() -> float:
+    """
+    This process's peak RSS. On Linux, VmHWM: ru_maxrss survives fork + exec,
+    so a spawned worker would report its parent's peak if that was higher.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+# ─── Synthetic files ──────────────────────────────────────────────────────────
+def write_synthetic_pdf(path: str, pages: int, seed: int = 7):
+    """Text-only PDF (Helvetica, 45 lines per page) written without a PDF library."""
+    rng = random.Random(seed)
+    kids = [4 + 2 * i for i in range(pages)]
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{' '.join(f'{k} 0 R' for k in kids)}] /Count {pages} >>".encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for page, kid in enumerate(kids):
+        lines = [f"Page {page + 1} section {n}: " + " ".join(rng.choices(WORDS, k=10)) for n in range(45)]
+        stream = "\n".join(["BT /F1 10 Tf 12 TL 50 770 Td"] + [f"({line}) '" for line in lines] + ["ET"]).encode()
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {kid + 1} 0 R >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def write_synthetic_xlsx(path: str, rows: int, sheets: int = 2, seed: int = 7):
+    """Mixed-type order rows split across `sheets` worksheets (openpyxl write-only)."""
+    from openpyxl import Workbook
+
+    rng = np.random.default_rng(seed)
+    workbook = Workbook(write_only=True)
+    per_sheet = -(-rows // sheets)
+    for sheet in range(sheets):
+        ws = workbook.create_sheet(f"Orders {sheet + 1}")
+        ws.append(["order_id", "region", "sku", "quantity", "unit_price", "discount", "status"])
+        count = min(per_sheet, rows - sheet * per_sheet)
+        regions = rng.choice(["NA", "EU", "APAC", "LATAM", "MEA"], count)
+        statuses = rng.choice(["paid", "refunded", "pending"], count, p=[0.85, 0.05, 0.10])
+        skus = rng.integers(0, 50_000, count)
+        quantities = rng.integers(1, 20, count)
+        prices = rng.gamma(2.0, 30.0, count).round(2)
+        discounts = rng.random(count).round(3)
+        for i in range(count):
+            ws.append([
+                sheet * per_sheet + i, str(regions[i]), str(skus[i]), int(quantities[i]),
+                float(prices[i]), None if discounts[i] < 0.1 else float(discounts[i]), str(statuses[i]),
+            ])
+    workbook.save(path)
+
+# ─── Cases ────────────────────────────────────────────────────────────────────
+def _ingest(path: str, filename: str, store_dir: str) -> dict:
+    """Runs in a fresh worker process: one prepare_document call, timed."""
+    from app.chat_engine import prepare_document
+    from app.vector_index import RAG_VECTOR_DIM
+
+    rss_before = peak_rss_mb()
+    start = time.perf_counter()
+    result = prepare_document(path, filename, RAG_VECTOR_DIM, uuid.uuid4().hex, store_dir)
+    seconds = time.perf_counter() - start
+    return {
+        "seconds": round(seconds, 3),
+        "chunks": result["chunks"],
+        "stored_mb": round(result["bytes"] / 2**20, 2),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "rss_growth_mb": round(peak_rss_mb() - rss_before, 1),
+    }
+
+
+def run_case(kind: str, label: str, path: str, store_dir: str) -> dict:
+    size_mb = os.path.getsize(path) / 2**20
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        result = pool.submit(_ingest, path, os.path.basename(path), store_dir).result()
+    result.update({
+        "kind": kind,
+        "size": label,
+        "file_mb": round(size_mb, 2),
+        "mb_per_s": round(size_mb / result["seconds"], 2) if result["seconds"] else None,
+    })
+    print(f"{kind:<5} {label:<12} {size_mb:8.2f} MB  {result['seconds']:7.3f} s  {result['chunks']:>6} chunks", file=sys.stderr)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf-pages", type=int, nargs="*", default=[10, 100, 500])
+    parser.add_argument("--csv-mb", type=float, nargs="*", default=[10, 100])
+    parser.add_argument("--xlsx-rows", type=int, nargs="*", default=[5_000, 50_000])
+    parser.add_argument("--out", help="also write the JSON report here")
+    args = parser.parse_args()
+
+    # The app creates runtime files (docstore, uploads, workflow db) in the cwd
+    os.environ.setdefault("WORKFLOW_STORE", "memory")
+    os.environ.setdefault("PDF_PAGE_CACHE", "")  # Cases share page text; measure cold extraction
+    sys.path.insert(0, os.getcwd())
+
+    cases = []
+    with tempfile.TemporaryDirectory(prefix="bench_ingest_") as tmp:
+        os.chdir(tmp)
+        store_dir = os.path.join(tmp, "store")
+        os.makedirs(store_dir)
+        for pages in args.pdf_pages:
+            path = os.path.join(tmp, f"synthetic_{pages}p.pdf")
+            write_synthetic_pdf(path, pages)
+            cases.append(run_case("pdf", f"{pages} pages", path, store_dir))
+        for mb in args.csv_mb:
+            path = os.path.join(tmp, f"synthetic_{mb:g}mb.csv")
+            write_synthetic_csv(path, mb)
+            cases.append(run_case("csv", f"{mb:g} MB", path, store_dir))
+        for rows in args.xlsx_rows:
+            path = os.path.join(tmp, f"synthetic_{rows}r.xlsx")
+            write_synthetic_xlsx(path, rows)
+            cases.append(run_case("xlsx", f"{rows} rows", path, store_dir))
+
+    report = {"cases": {f"{case['kind']} {case['size']}": case for case in cases}}
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output)
+    print(output)
+
+if __name__ == "__main__":
+    main()
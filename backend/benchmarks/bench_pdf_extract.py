@@ -0,0 +1,106 @@
+"""
+PDF extraction benchmark: pages/s of iter_pdf_pages on a synthetic PDF for
+several worker counts (cold page cache), then a re-ingest with a warm cache
+and one with a few pages edited.
+
+Pool start-up (spawned workers) is included in every timing, as it is in
+ingestion. Speed-up is relative to the in-process (1 worker) run and is
+bounded by the cores actually available (reported as "cpus").
+
+    python -m benchmarks.bench_pdf_extract --pages 1000 --workers 1 2 4 8
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+from pypdf import PdfReader, PdfWriter
+
+from app import pdf_pages
+from benchmarks.bench_ingest import write_synthetic_pdf
+
+
+def extract(path: str, workers: int, cache_path: str = "") -> dict:
+    pdf_pages.PDF_WORKERS = workers
+    pdf_pages.PDF_PAGE_CACHE = cache_path
+    progress = []
+    start = time.perf_counter()
+    for _ in pdf_pages.iter_pdf_pages(path, on_progress=lambda done, total, cached: progress.append(cached)):
+        pass
+    seconds = time.perf_counter() - start
+    pages = len(PdfReader(path).pages)
+    return {
+        "workers": workers,
+        "seconds": round(seconds, 3),
+        "pages_per_s": round(pages / seconds, 1),
+        "cached_pages": progress[-1] if progress else 0,
+    }
+
+
+def edited_copy(path: str, out_path: str, every: int) -> int:
+    """Copy of the PDF with every `every`-th page replaced by new text; returns pages changed."""
+    replacement = out_path + ".src.pdf"
+    write_synthetic_pdf(replacement, 1, seed=1234)
+    fresh = PdfReader(replacement).pages[0]
+    writer = PdfWriter()
+    changed = 0
+    for number, page in enumerate(PdfReader(path).pages):
+        if number % every == every - 1:
+            writer.add_page(fresh)
+            changed += 1
+        else:
+            writer.add_page(page)
+    writer.write(out_path)
+    return changed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=600)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--edit-every", type=int, default=50, help="re-ingest case: replace every Nth page")
+    parser.add_argument("--out", help="also write the JSON report here")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_pdf_") as tmp:
+        path = os.path.join(tmp, f"synthetic_{args.pages}p.pdf")
+        write_synthetic_pdf(path, args.pages)
+
+        cold = []
+        for workers in args.workers:
+            result = extract(path, workers)
+            cold.append(result)
+            print(f"cold  {workers:>2} workers {result['seconds']:8.2f} s  {result['pages_per_s']:8.1f} pages/s", file=sys.stderr)
+        baseline = cold[0]["seconds"]
+        for result in cold:
+            result["speedup"] = round(baseline / result["seconds"], 2)
+
+        cache_path = os.path.join(tmp, "pdf_pages.db")
+        workers = max(args.workers)
+        extract(path, workers, cache_path)  # Fill the cache
+        warm = extract(path, workers, cache_path)
+        edited_path = os.path.join(tmp, "edited.pdf")
+        changed = edited_copy(path, edited_path, args.edit_every)
+        edited = {**extract(edited_path, workers, cache_path), "pages_changed": changed}
+        for label, result in (("warm", warm), ("edited", edited)):
+            print(f"{label:<6}{workers:>2} workers {result['seconds']:8.2f} s  {result['cached_pages']} pages cached", file=sys.stderr)
+
+    report = {
+        "benchmark": "pdf_extract",
+        "pages": args.pages,
+        "cpus": len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count(),
+        "cold": cold,
+        "warm_reingest": warm,
+        "edited_reingest": edited,
+    }
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output)
+    print(output)
+
+if __name__ == "__main__":
+    main()
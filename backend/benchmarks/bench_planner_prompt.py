@@ -0,0 +1,159 @@
+"""
+Planner prompt benchmark: full tool registry vs per-directive shortlist.
+
+Reports, over a fixed eval set of directives with hand-picked "gold" tools:
+- planner prompt tokens (full vs shortlisted) and the reduction
+- shortlist recall: share of gold tools the planner is still offered
+  (the planner can only choose listed tools, so this bounds plan quality)
+- /api/plan latency against a mock provider whose latency grows with
+  prompt size (--prefill-ms-per-1k), end to end through the app
+
+With --live the planner runs against the real OpenRouter API instead
+(OPENROUTER_API_KEY) and plan quality is scored as gold tools planned.
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+
+import numpy as np
+
+EVAL_SET = [
+    ("Write a cold outreach email sequence for SaaS founders and schedule follow-ups",
+     {"email.cold_outreach", "email.sequence", "email.followup"}),
+    ("Analyze churn in our subscription data and build a retention dashboard",
+     {"analytics.churn", "analytics.retention", "data.dashboard_config"}),
+    ("Generate unit tests for our Python API and set up a CI pipeline",
+     {"code.test", "devops.ci_cd", "github.actions"}),
+    ("Launch a new product: landing page, press release and launch plan",
+     {"content.landing_page", "content.press_release", "plan.launch"}),
+    ("Draft an NDA and a contractor agreement for a freelance designer",
+     {"legal.nda", "legal.contractor_agreement"}),
+    ("Create a 12-month financial model and revenue forecast for investors",
+     {"finance.financial_model", "finance.forecast", "finance.pitch_deck"}),
+    ("Write a job posting for a senior backend engineer and an interview plan",
+     {"hr.job_posting", "hr.interview"}),
+    ("Plan next quarter's OKRs and break them into a sprint backlog",
+     {"business.okrs", "plan.quarterly", "plan.sprint", "task.breakdown"}),
+    ("Audit our GDPR compliance and write an updated privacy policy",
+     {"legal.gdpr_audit", "legal.privacy_policy", "compliance.checklist"}),
+    ("Build a content calendar with LinkedIn and Twitter posts for our webinar",
+     {"social.content_calendar", "social.post_linkedin", "social.post_twitter", "content.webinar"}),
+    ("Write product descriptions and an abandoned cart email for our Shopify store",
+     {"ecommerce.product_description", "ecommerce.abandoned_cart"}),
+    ("Threat model our payment service and write an incident response plan",
+     {"security.threat_model", "security.incident_plan", "compliance.incident_response"}),
+    ("Design a customer support knowledge base and canned responses",
+     {"support.knowledge_base", "support.canned_response"}),
+    ("Set up a webhook integration that syncs CRM leads into our database nightly",
+     {"automation.webhook", "automation.data_sync", "automation.cron_job"}),
+    ("Research competitors and write a pricing strategy with a battlecard for sales",
+     {"analytics.competitor", "analytics.pricing", "sales.battlecard"}),
+    ("Create an onboarding course with lessons and a final quiz for new hires",
+     {"training.course_outline", "training.lesson_plan", "training.quiz", "hr.onboarding"}),
+    ("Write a blog post about our Series A and a newsletter announcing it",
+     {"content.blog", "email.newsletter"}),
+    ("Clean up a messy CSV export and build an ETL pipeline into the warehouse",
+     {"data.cleaning_script", "data.etl_pipeline", "data.csv_transform"}),
+    ("Design wireframes and a user flow for the new mobile signup",
+     {"design.wireframe", "design.user_flow"}),
+    ("Build a sentiment analysis pipeline for customer reviews and summarize results",
+     {"ai.sentiment_analysis", "ai.summarization"}),
+]
+
+
+def percentiles(samples):
+    data = np.array(samples) * 1000
+    return {f"p{p}": round(float(np.percentile(data, p)), 1) for p in (50, 95, 99)}
+
+
+def prompt_report(main, shortlist, count_tokens, registry, size: int):
+    full_tokens, short_tokens, recalls, shortlist_ms = [], [], [], []
+    for directive, gold in EVAL_SET:
+        missing = gold - set(registry.by_name)
+        if missing:
+            raise SystemExit(f"Eval set references unknown tools: {sorted(missing)}")
+        shortlist.PLANNER_TOOL_SHORTLIST = 0
+        full_tokens.append(count_tokens(main.planner_prompt(directive)))
+
+        shortlist.PLANNER_TOOL_SHORTLIST = size
+        shortlist._planner_tools.cache_clear()
+        start = time.perf_counter()
+        summary, _ = shortlist.planner_tools(directive, size)
+        shortlist_ms.append(time.perf_counter() - start)
+        short_tokens.append(count_tokens(main.planner_prompt(directive)))
+        listed = {line[2:].split(":", 1)[0] for line in summary.splitlines() if line.startswith("- ")}
+        recalls.append(len(gold & listed) / len(gold))
+
+    return {
+        "directives": len(EVAL_SET),
+        "shortlist_size": size,
+        "full_prompt_tokens": round(float(np.mean(full_tokens))),
+        "shortlist_prompt_tokens": round(float(np.mean(short_tokens))),
+        "token_reduction": round(1 - float(np.mean(short_tokens)) / float(np.mean(full_tokens)), 3),
+        "shortlist_gold_recall": round(float(np.mean(recalls)), 3),
+        "shortlist_perfect_recall": sum(r == 1.0 for r in recalls),
+        "shortlist_ms": percentiles(shortlist_ms),
+    }
+
+
+async def latency_report(main, shortlist, args):
+    import httpx
+    from benchmarks.mock_llm import MockLLM
+
+    mock = None
+    if not args.live:
+        mock = await MockLLM(latency_ms=args.latency_ms, prefill_ms_per_1k=args.prefill_ms_per_1k).start()
+        main.OPENROUTER_URL = mock.url
+
+    report = {}
+    async with main.lifespan(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            for label, size in (("full", 0), ("shortlist", args.shortlist)):
+                shortlist.PLANNER_TOOL_SHORTLIST = size
+                samples, quality = [], []
+                for directive, gold in EVAL_SET[:args.requests]:
+                    start = time.perf_counter()
+                    response = await client.post("/api/plan", json={"prompt": directive}, headers={"X-Plan-Cache": "bypass"})
+                    samples.append(time.perf_counter() - start)
+                    planned = {step["tool"] for step in response.json().get("steps", [])}
+                    quality.append(len(gold & planned) / len(gold))
+                report[label] = {"latency_ms": percentiles(samples)}
+                if args.live:
+                    report[label]["gold_tools_planned"] = round(float(np.mean(quality)), 3)
+    if mock is not None:
+        await mock.stop()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shortlist", type=int, default=40, help="tools per planning call")
+    parser.add_argument("--requests", type=int, default=len(EVAL_SET), help="directives sent to /api/plan per variant")
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="mock base latency")
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=40.0, help="mock latency per 1k prompt tokens")
+    parser.add_argument("--live", action="store_true", help="call the real OpenRouter API")
+    args = parser.parse_args()
+
+    # The app creates runtime files (docstore, uploads, workflow db) in the cwd
+    os.environ.setdefault("WORKFLOW_STORE", "memory")
+    sys.path.insert(0, os.getcwd())
+    os.chdir(tempfile.mkdtemp(prefix="bench_planner_"))
+
+    import app.main as app_main
+    from app import tool_shortlist
+    from app.context_budget import count_tokens
+    from app.tools_registry import get_registry
+
+    report = {"prompt": prompt_report(app_main, tool_shortlist, count_tokens, get_registry(), args.shortlist)}
+    report["plan_endpoint"] = asyncio.run(latency_report(app_main, tool_shortlist, args))
+    report["provider"] = "openrouter" if args.live else f"mock ({args.latency_ms:.0f} ms + {args.prefill_ms_per_1k:.0f} ms/1k tokens)"
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Dense vector index benchmark: embedding throughput, top-k query latency and
+memory per million chunks, in RAM and memory-mapped from disk.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import resource
+import tempfile
+
+import numpy as np
+
+from app.vector_index import VectorIndex, HashingVectorizer, RAG_VECTOR_DIM
+
+WORDS = (
+    "revenue churn margin forecast quarter pipeline customer invoice contract "
+    "renewal discount region product launch campaign budget hiring roadmap "
+    "latency outage incident deploy release security audit compliance policy"
+).split()
+
+
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def synthetic_text(rng: random.Random, words: int = 180) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def percentiles(samples):
+    data = np.array(samples) * 1000
+    return {f"p{p}": round(float(np.percentile(data, p)), 3) for p in (50, 95, 99)}
+
+
+def time_queries(index: VectorIndex, queries, k: int):
+    samples = []
+    for q in queries:
+        start = time.perf_counter()
+        index.search(q, k=k)
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=RAG_VECTOR_DIM)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=12)
+    parser.add_argument("--embed-sample", type=int, default=2_000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    vectorizer = HashingVectorizer(args.dim)
+
+    # Embedding throughput on real text
+    sample = [synthetic_text(rng) for _ in range(args.embed_sample)]
+    start = time.perf_counter()
+    vectorizer.transform(sample)
+    embed_rate = args.embed_sample / (time.perf_counter() - start)
+
+    # Fill the matrix directly so search timing is not bounded by embedding time
+    index = VectorIndex(dim=args.dim)
+    index._reserve(args.chunks)
+    nprng = np.random.default_rng(7)
+    block = 50_000
+    for lo in range(0, args.chunks, block):
+        hi = min(lo + block, args.chunks)
+        vecs = nprng.standard_normal((hi - lo, args.dim), dtype=np.float32)
+        vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+        index.vectors[lo:hi] = vecs
+    index.doc_rows = {f"doc{lo // 1000}": range(lo, min(lo + 1000, args.chunks)) for lo in range(0, args.chunks, 1000)}
+    index.size = args.chunks
+
+    queries = [synthetic_text(rng, 8) for _ in range(args.queries)]
+    ram_latency = time_queries(index, queries, args.k)
+
+    # Memory-mapped the way document_store keeps each document's vectors (.vec.npy)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.vec.npy")
+        start = time.perf_counter()
+        np.save(path, index.vectors[:index.size])
+        save_s = time.perf_counter() - start
+        start = time.perf_counter()
+        mapped = VectorIndex(dim=args.dim)
+        mapped.vectors = np.load(path, mmap_mode="r")
+        mapped.doc_rows, mapped.size = index.doc_rows, index.size
+        load_s = time.perf_counter() - start
+        mmap_latency = time_queries(mapped, queries, args.k)
+        disk_bytes = os.path.getsize(path)
+
+    report = {
+        "benchmark": "vector_index",
+        "chunks": args.chunks,
+        "dim": args.dim,
+        "k": args.k,
+        "embed_chunks_per_s": round(embed_rate, 1),
+        "query_ms_ram": ram_latency,
+        "query_ms_mmap": mmap_latency,
+        "save_s": round(save_s, 3),
+        "mmap_load_s": round(load_s, 4),
+        "matrix_mb": round(index.nbytes / 2**20, 1),
+        "matrix_mb_per_million_chunks": round(args.dim * 4 * 1_000_000 / 2**20, 1),
+        "disk_mb": round(disk_bytes / 2**20, 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Excel ingestion benchmark: the old extraction path (pd.read_excel of the
+first sheet, 500 rows) against the .xlsx extraction handler (streaming
+profile of every sheet via openpyxl read-only rows) on synthetic
+workbooks of a target size.
+
+Each extractor runs in a fresh process so peak RSS is its own. Reports
+wall time, peak RSS and how much of the workbook each path actually saw
+(rows, sheets). Workbooks are cached in --cache-dir, since writing a
+200 MB workbook takes far longer than reading it.
+
+    python -m benchmarks.bench_xlsx_ingest --mb 20 200 --sheets 4
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.bench_ingest import write_synthetic_xlsx, peak_rss_mb
+
+PROBE_ROWS = 20_000
+
+
+def rows_for_mb(target_mb: float, sheets: int, directory: str) -> int:
+    """Estimate the row count that yields a workbook of about target_mb."""
+    probe = os.path.join(directory, "probe.xlsx")
+    write_synthetic_xlsx(probe, PROBE_ROWS, sheets)
+    per_row = os.path.getsize(probe) / PROBE_ROWS
+    os.remove(probe)
+    return int(target_mb * 2**20 / per_row)
+
+
+def _legacy(path: str) -> dict:
+    """The extraction chat_engine used before: first sheet, first 500 rows."""
+    import pandas as pd
+
+    df = pd.read_excel(path, nrows=500)
+    text = df.to_markdown(index=False) + "\n...[Excel Truncated at 500 rows]..."
+    return {"rows_seen": len(df), "sheets_seen": 1, "context_chars": len(text)}
+
+
+def _streaming(path: str) -> dict:
+    """The .xlsx handler /api/upload runs: profile_workbook, then workbook_sections."""
+    from app.extraction import iter_segments
+
+    segments = list(iter_segments(path, os.path.basename(path)))
+    sheets = [segment for segment in segments if "sheet" in segment]
+    rows = sum(segment["rows"][1] for segment in sheets)
+    return {"rows_seen": rows, "sheets_seen": len(sheets), "context_chars": sum(len(segment["text"]) for segment in segments)}
+
+
+def _measure(extractor: str, path: str) -> dict:
+    """Runs in a fresh worker process."""
+    rss_before = peak_rss_mb()
+    start = time.perf_counter()
+    result = {"legacy": _legacy, "streaming": _streaming}[extractor](path)
+    result.update({
+        "seconds": round(time.perf_counter() - start, 3),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "rss_growth_mb": round(peak_rss_mb() - rss_before, 1),
+    })
+    return result
+
+
+def run(extractor: str, path: str) -> dict:
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(_measure, extractor, path).result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mb", type=float, nargs="+", default=[20, 200], help="target workbook sizes")
+    parser.add_argument("--sheets", type=int, default=4)
+    parser.add_argument("--cache-dir", help="keep generated workbooks here between runs (default: temp dir)")
+    parser.add_argument("--out", help="also write the JSON report here")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.getcwd())
+    cases = {}
+    with tempfile.TemporaryDirectory(prefix="bench_xlsx_") as tmp:
+        directory = args.cache_dir or tmp
+        os.makedirs(directory, exist_ok=True)
+        for mb in args.mb:
+            path = os.path.join(directory, f"synthetic_{mb:g}mb_{args.sheets}s.xlsx")
+            if not os.path.exists(path):
+                rows = rows_for_mb(mb, args.sheets, directory)
+                print(f"writing {path} ({rows:,} rows)...", file=sys.stderr)
+                write_synthetic_xlsx(path, rows, args.sheets)
+            size_mb = os.path.getsize(path) / 2**20
+            case = {"file_mb": round(size_mb, 1), "sheets": args.sheets}
+            for extractor in ("legacy", "streaming"):
+                result = run(extractor, path)
+                result["mb_per_s"] = round(size_mb / result["seconds"], 2) if result["seconds"] else None
+                case[extractor] = result
+                print(
+                    f"{mb:g} MB {extractor:<9} {result['seconds']:8.2f} s  peak {result['peak_rss_mb']:7.1f} MB  "
+                    f"{result['rows_seen']:>10,} rows  {result['sheets_seen']} sheets",
+                    file=sys.stderr,
+                )
+            cases[f"{mb:g} MB"] = case
+
+    output = json.dumps({"benchmark": "xlsx_ingest", "cases": cases}, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output)
+    print(output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Compare two benchmark JSON reports and flag regressions.
+
+Pairs numeric values by their path in both reports and prints the relative
+change. Latency, time, memory, token and failure metrics regress when they
+grow; throughput and recall metrics regress when they shrink; anything else
+is shown for information only. Exits 1 if a metric moved past --threshold
+in the bad direction, so it can gate CI.
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 0.10
+"""
+
+import sys
+import json
+import argparse
+from typing import Dict, Optional
+
+HIGHER_IS_BETTER = ("rps", "per_s", "throughput", "recall", "reduction", "coalesced")
+LOWER_IS_BETTER = ("ms", "latency", "seconds", "rss", "_mb", "tokens", "failures", "errors")
+IGNORED = ("config", "failure_kinds", "requests_left", "tokens_left", "benched_for")
+
+
+def flatten(value, path: str = "") -> Dict[str, float]:
+    """Numeric leaves keyed by their dotted path."""
+    if isinstance(value, dict):
+        leaves = {}
+        for key, item in value.items():
+            if key not in IGNORED:
+                leaves.update(flatten(item, f"{path}.{key}" if path else str(key)))
+        return leaves
+    if isinstance(value, list):
+        leaves = {}
+        for i, item in enumerate(value):
+            leaves.update(flatten(item, f"{path}[{i}]"))
+        return leaves
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return {path: float(value)}
+    return {}
+
+
+def direction(path: str) -> Optional[int]:
+    """+1 if bigger is better, -1 if smaller is better, None if neutral."""
+    leaf = path.lower()
+    if any(word in leaf for word in HIGHER_IS_BETTER):
+        return 1
+    if any(word in leaf for word in LOWER_IS_BETTER):
+        return -1
+    return None
+
+
+def compare(baseline: dict, candidate: dict, threshold: float) -> dict:
+    base, new = flatten(baseline), flatten(candidate)
+    rows, regressions = [], []
+    for path in sorted(base.keys() & new.keys()):
+        old, current = base[path], new[path]
+        if old == current:
+            continue
+        change = (current - old) / abs(old) if old else float("inf")
+        sense = direction(path)
+        regressed = sense is not None and -sense * change > threshold
+        improved = sense is not None and sense * change > threshold
+        row = {"metric": path, "baseline": old, "candidate": current, "change": round(change, 4)}
+        row["verdict"] = "regression" if regressed else "improvement" if improved else "noise" if sense else "info"
+        rows.append(row)
+        if regressed:
+            regressions.append(path)
+    return {
+        "threshold": threshold,
+        "compared": len(base.keys() & new.keys()),
+        "only_in_baseline": sorted(base.keys() - new.keys()),
+        "only_in_candidate": sorted(new.keys() - base.keys()),
+        "regressions": regressions,
+        "changes": rows,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change that counts as a regression")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    result = compare(baseline, candidate, args.threshold)
+    for row in result["changes"]:
+        if row["verdict"] in ("regression", "improvement"):
+            print(f"{row['verdict']:<12} {row['metric']:<60} {row['baseline']:>12g} → {row['candidate']:<12g} ({row['change']:+.1%})", file=sys.stderr)
+    print(json.dumps(result, indent=2))
+    sys.exit(1 if result["regressions"] else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+"""
+End-to-end load test against local mock providers.
+
+Starts mock OpenRouter and Groq servers (benchmarks.mock_llm), runs the API
+under uvicorn pointed at them, and drives /api/plan, /api/execute-step,
+/api/execute-workflow, /api/upload and /api/chat-rag at each concurrency
+level. For every scenario and level it reports latency p50/p95/p99,
+throughput, failures and server RSS (whole process tree, so ingestion
+workers count).
+
+Uploads and workflow jobs are timed until they finish, not just until the
+'queued' response. Plans bypass the plan cache and directives are made unique per
+request, so neither the cache nor single-flight coalescing hides upstream
+cost (--plan-cache / --identical turn that back on).
+
+Output is JSON; compare two runs with `python -m benchmarks.compare`.
+
+    python -m benchmarks.load_test --concurrency 1 8 32 --requests 64 --out run.json
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from collections import Counter
+from typing import Awaitable, Callable, Dict, Optional
+
+import numpy as np
+import httpx
+
+from benchmarks.mock_llm import MockLLM, add_mock_arguments, mock_from_args
+from benchmarks.bench_planner_prompt import EVAL_SET
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIOS = ("plan", "step", "workflow", "upload", "chat")
+ACTIVE_UPLOAD_PHASES = {"queued", "extracting", "indexing"}
+ACTIVE_JOB_PHASES = {"queued", "running"}
+WORDS = (
+    "revenue churn margin forecast quarter pipeline customer invoice contract "
+    "renewal discount region product launch campaign budget hiring roadmap "
+    "latency outage incident deploy release security audit compliance policy"
+).split()
+
+# ─── Process RSS ──────────────────────────────────────────────────────────────
+_VM_RSS = re.compile(r"VmRSS:\s+(\d+) kB")
+
+
+def tree_rss_mb(pid: int) -> Optional[float]:
+    """Resident memory of a process and all its descendants (Linux /proc only)."""
+    if not os.path.isdir("/proc"):
+        return None
+    total_kb, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        try:
+            with open(f"/proc/{current}/status") as f:
+                match = _VM_RSS.search(f.read())
+            total_kb += int(match.group(1)) if match else 0
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children") as f:
+                    stack.extend(int(child) for child in f.read().split())
+        except OSError:
+            continue  # Process exited mid-walk
+    return round(total_kb / 1024, 1)
+
+
+class RSSSampler:
+    """Polls tree RSS in the background; peak is tracked between resets."""
+
+    def __init__(self, pid: int, interval: float = 0.1):
+        self.pid = pid
+        self.interval = interval
+        self.peak: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def reset(self) -> Optional[float]:
+        self.peak = tree_rss_mb(self.pid)
+        return self.peak
+
+    async def _loop(self):
+        while True:
+            rss = tree_rss_mb(self.pid)
+            if rss is not None and (self.peak is None or rss > self.peak):
+                self.peak = rss
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+# ─── Server ───────────────────────────────────────────────────────────────────
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(openrouter: MockLLM, groq: MockLLM, workdir: str, groq_keys: int, logs: bool = False):
+    """uvicorn serving app.main in `workdir`, talking only to the mocks; returns (process, base URL)."""
+    port = _free_port()
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join(filter(None, [BACKEND_DIR, os.environ.get("PYTHONPATH")])),
+        "OPENROUTER_URL": openrouter.url,
+        "OPENROUTER_API_KEY": "bench-openrouter",
+        "GROQ_URL": groq.url,
+        "WORKFLOW_STORE": "memory",
+    }
+    for i in range(1, 4):
+        env.pop(f"MANDELBROT_GROQ_KEY_{i}", None)
+    for i in range(1, groq_keys + 1):
+        env[f"MANDELBROT_GROQ_KEY_{i}"] = f"bench-groq-{i}"
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=workdir,
+        env=env,
+        stdout=None if logs else subprocess.DEVNULL,
+        stderr=None if logs else subprocess.DEVNULL,
+    )
+    return process, f"http://127.0.0.1:{port}"
+
+
+async def wait_until_healthy(client: httpx.AsyncClient, process: subprocess.Popen, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"Server exited during startup (code {process.returncode})")
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise SystemExit("Server did not become healthy in time")
+
+# ─── Scenarios ────────────────────────────────────────────────────────────────
+# Each scenario sends request `i` and returns None on success or a failure label.
+Scenario = Callable[[httpx.AsyncClient, int], Awaitable[Optional[str]]]
+
+
+def synthetic_text(kb: float, seed: int) -> bytes:
+    rng = np.random.default_rng(seed)
+    words = rng.choice(WORDS, size=max(1, int(kb * 1024 / 8)))
+    lines = [" ".join(words[i:i + 14]) for i in range(0, len(words), 14)]
+    return "\n".join(lines).encode()
+
+
+def build_scenarios(args, run_id: str) -> Dict[str, Scenario]:
+    plan_headers = {} if args.plan_cache else {"X-Plan-Cache": "bypass"}
+
+    def directive(i: int) -> str:
+        text = EVAL_SET[i % len(EVAL_SET)][0]
+        return text if args.identical else f"{text} (load test {run_id} #{i})"
+
+    async def plan(client, i):
+        response = await client.post("/api/plan", json={"prompt": directive(i)}, headers=plan_headers)
+        if response.status_code != 200:
+            return f"http {response.status_code}"
+        return None if response.json().get("steps") else "empty plan"
+
+    async def step(client, i):
+        response = await client.post("/api/execute-step", json={
+            "workflow_id": f"load-test-{run_id}",
+            "step_id": i + 1,
+            "tool": "content.blog",
+            "action": directive(i),
+        })
+        if response.status_code != 200:
+            return f"http {response.status_code}"
+        return "step error" if response.json().get("status") == "error" else None
+
+    async def workflow(client, i):
+        response = await client.post("/api/execute-workflow", json={"prompt": directive(i)}, headers=plan_headers)
+        if response.status_code != 202:
+            return f"http {response.status_code}"
+        job = response.json()
+        while job.get("status") in ACTIVE_JOB_PHASES:
+            await asyncio.sleep(0.05)
+            job = (await client.get(f"/api/jobs/{job['job_id']}")).json()
+        if job.get("status") != "completed":
+            return f"job {job.get('status')}"
+        failed = [r for r in job["result"].get("results", []) if r.get("status") == "error"]
+        return "step error" if failed else None
+
+    async def upload(client, i):
+        name = f"load_{run_id}_{i}.txt"
+        body = f"{name}\n".encode() + synthetic_text(args.upload_kb, i)
+        response = await client.post("/api/upload", files={"file": (name, body, "text/plain")})
+        if response.status_code != 200:
+            return f"http {response.status_code}"
+        job = response.json()
+        while job.get("status") in ACTIVE_UPLOAD_PHASES:
+            await asyncio.sleep(0.05)
+            job = (await client.get(f"/api/upload/{job['job_id']}")).json()
+        return None if job.get("status") in ("completed", "deduplicated") else f"ingest {job.get('status')}"
+
+    async def chat(client, i):
+        question = f"What does the report say about {WORDS[i % len(WORDS)]} and {WORDS[(i * 7) % len(WORDS)]}?"
+        if not args.identical:
+            question += f" (#{i})"
+        response = await client.post("/api/chat-rag", json={"message": question, "context_files": [args.chat_file]})
+        if response.status_code != 200:
+            return f"http {response.status_code}"
+        return "provider busy" if "Error" in response.json().get("response", "")[:20] else None
+
+    return {"plan": plan, "step": step, "workflow": workflow, "upload": upload, "chat": chat}
+
+
+async def seed_chat_document(client: httpx.AsyncClient, args):
+    """Upload and wait for the document every chat request retrieves from."""
+    args.chat_file = "load_test_corpus.txt"
+    body = synthetic_text(args.chat_doc_kb, seed=1)
+    job = (await client.post("/api/upload", files={"file": (args.chat_file, body, "text/plain")})).json()
+    while job.get("status") in ACTIVE_UPLOAD_PHASES:
+        await asyncio.sleep(0.05)
+        job = (await client.get(f"/api/upload/{job['job_id']}")).json()
+    if job.get("status") not in ("completed", "deduplicated"):
+        raise SystemExit(f"Could not ingest chat corpus: {job}")
+
+# ─── Driver ───────────────────────────────────────────────────────────────────
+def summarize(latencies, failures: Counter, wall: float) -> dict:
+    data = np.array(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "failures": sum(failures.values()),
+        "failure_kinds": dict(failures),
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "wall_seconds": round(wall, 3),
+        "latency_ms": {
+            "mean": round(float(data.mean()), 1),
+            "p50": round(float(np.percentile(data, 50)), 1),
+            "p95": round(float(np.percentile(data, 95)), 1),
+            "p99": round(float(np.percentile(data, 99)), 1),
+            "max": round(float(data.max()), 1),
+        },
+    }
+
+
+async def run_level(client: httpx.AsyncClient, scenario: Scenario, concurrency: int, total: int, sampler: RSSSampler) -> dict:
+    """Send `total` requests with `concurrency` in flight at a time."""
+    latencies, failures = [], Counter()
+    pending = iter(range(total))
+
+    async def worker():
+        for i in pending:
+            start = time.perf_counter()
+            try:
+                failure = await scenario(client, i)
+            except httpx.HTTPError as e:
+                failure = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            if failure:
+                failures[failure] += 1
+
+    rss_start = sampler.reset()
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    report = summarize(latencies, failures, time.perf_counter() - start)
+    report["rss_mb"] = {"start": rss_start, "peak": sampler.peak, "end": tree_rss_mb(sampler.pid)}
+    return report
+
+
+async def run(args) -> dict:
+    openrouter = await mock_from_args(args, seed=1).start()
+    groq = await mock_from_args(
+        args,
+        seed=2,
+        requests_per_minute=args.groq_requests_per_minute,
+        tokens_per_minute=args.groq_tokens_per_minute,
+    ).start()
+
+    workdir = tempfile.TemporaryDirectory(prefix="load_test_")
+    server, base_url = start_server(openrouter, groq, workdir.name, args.groq_keys, args.server_logs)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=max(args.concurrency))
+    report = {"config": {k: v for k, v in vars(args).items() if k != "out"}, "scenarios": {}}
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+            await wait_until_healthy(client, server)
+            sampler = RSSSampler(server.pid)
+            sampler.start()
+            report["server"] = {"rss_mb_idle": tree_rss_mb(server.pid)}
+
+            scenarios = build_scenarios(args, uuid.uuid4().hex[:8])
+            if "chat" in args.scenarios:
+                await seed_chat_document(client, args)
+            for name in args.scenarios:
+                report["scenarios"][name] = {}
+                for concurrency in args.concurrency:
+                    result = await run_level(client, scenarios[name], concurrency, args.requests, sampler)
+                    report["scenarios"][name][str(concurrency)] = result
+                    print(
+                        f"{name:<9} c={concurrency:<4} p50={result['latency_ms']['p50']:>8} ms  "
+                        f"p99={result['latency_ms']['p99']:>8} ms  {result['throughput_rps']:>7} rps  "
+                        f"failures={result['failures']}",
+                        file=sys.stderr,
+                    )
+
+            await sampler.stop()
+            report["server"]["rss_mb_final"] = tree_rss_mb(server.pid)
+            report["upstream"] = (await client.get("/api/upstream")).json()
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            server.kill()
+        await openrouter.stop()
+        await groq.stop()
+        workdir.cleanup()
+
+    report["providers"] = {"openrouter": openrouter.stats(), "groq": groq.stats()}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32], help="in-flight requests per level")
+    parser.add_argument("--requests", type=int, default=64, help="requests per scenario and level")
+    parser.add_argument("--upload-kb", type=float, default=256, help="size of each uploaded document")
+    parser.add_argument("--chat-doc-kb", type=float, default=512, help="size of the document chat retrieves from")
+    parser.add_argument("--groq-keys", type=int, default=3, choices=(1, 2, 3))
+    parser.add_argument("--groq-requests-per-minute", type=int, default=600, help="mock per-key limit (0 = unlimited)")
+    parser.add_argument("--groq-tokens-per-minute", type=int, default=600_000, help="mock per-key limit (0 = unlimited)")
+    parser.add_argument("--plan-cache", action="store_true", help="let repeated plans hit the plan cache")
+    parser.add_argument("--identical", action="store_true", help="repeat prompts so single-flight can coalesce them")
+    parser.add_argument("--timeout", type=float, default=300.0, help="client timeout per request")
+    parser.add_argument("--server-logs", action="store_true", help="show the server's log output")
+    parser.add_argument("--out", help="also write the JSON report here")
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output)
+    print(output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+Local stand-in for an OpenAI-compatible chat completions API (OpenRouter,
+Groq). Latency grows with prompt size so prompt-shrinking changes show up
+in end-to-end timings. Planner calls get a valid JSON plan built from the
+tools listed in the prompt; other calls get filler text.
+
+Knobs for load tests: exponential latency jitter, injected 5xx errors,
+paced streaming, and optional Groq-style per-key rate limits with
+x-ratelimit-* headers and 429 + Retry-After once a key is exhausted.
+
+Run standalone to point a real server at it:
+
+    python -m benchmarks.mock_llm --port 9001 --latency-ms 300 --jitter-ms 100
+"""
+
+import re
+import json
+import time
+import random
+import asyncio
+import argparse
+from typing import Dict, Optional
+
+from app.context_budget import count_tokens
+
+_LISTED_TOOL = re.compile(r"^- ([a-z0-9_]+\.[a-z0-9_]+):", re.MULTILINE)
+
+
+class _KeyLimits:
+    """Per-key request and token windows, refilled linearly like Groq's."""
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.limits = {"requests": float(requests_per_minute), "tokens": float(tokens_per_minute)}
+        self.levels = dict(self.limits)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        for name, limit in self.limits.items():
+            self.levels[name] = min(limit, self.levels[name] + (now - self.updated) * limit / 60)
+        self.updated = now
+
+    def _reset_in(self, name: str) -> float:
+        return max(0.0, (self.limits[name] - self.levels[name]) * 60 / self.limits[name])
+
+    def consume(self, tokens: int) -> Optional[float]:
+        """Debit one request; returns seconds to wait instead if the key is exhausted."""
+        self._refill()
+        if self.levels["requests"] < 1 or self.levels["tokens"] < tokens:
+            missing = max(1 - self.levels["requests"], 0) * 60 / self.limits["requests"]
+            missing = max(missing, max(tokens - self.levels["tokens"], 0) * 60 / self.limits["tokens"])
+            return missing
+        self.levels["requests"] -= 1
+        self.levels["tokens"] -= tokens
+        return None
+
+    def headers(self) -> Dict[str, str]:
+        return {
+            "x-ratelimit-limit-requests": f"{self.limits['requests']:.0f}",
+            "x-ratelimit-remaining-requests": f"{max(self.levels['requests'], 0):.0f}",
+            "x-ratelimit-reset-requests": f"{self._reset_in('requests'):.2f}s",
+            "x-ratelimit-limit-tokens": f"{self.limits['tokens']:.0f}",
+            "x-ratelimit-remaining-tokens": f"{max(self.levels['tokens'], 0):.0f}",
+            "x-ratelimit-reset-tokens": f"{self._reset_in('tokens'):.2f}s",
+        }
+
+
+class MockLLM:
+    def __init__(
+        self,
+        latency_ms: float = 300.0,
+        prefill_ms_per_1k: float = 40.0,
+        output_words: int = 120,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        stream_chunk_chars: int = 16,
+        stream_interval_ms: float = 0.0,
+        requests_per_minute: int = 0,
+        tokens_per_minute: int = 0,
+        seed: Optional[int] = None,
+    ):
+        self.latency_ms = latency_ms
+        self.prefill_ms_per_1k = prefill_ms_per_1k
+        self.output_words = output_words
+        self.jitter_ms = jitter_ms                  # Mean of an exponential extra delay (long tail)
+        self.error_rate = error_rate                # Share of requests answered 503
+        self.stream_chunk_chars = stream_chunk_chars
+        self.stream_interval_ms = stream_interval_ms  # Pause between SSE deltas
+        self.requests_per_minute = requests_per_minute  # 0 = no per-key rate limits
+        self.tokens_per_minute = tokens_per_minute
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.connections = 0  # TCP connections accepted; stays low when clients keep them alive
+        self._keys: Dict[str, _KeyLimits] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.port = 0
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/v1/chat/completions"
+
+    async def start(self, port: int = 0) -> "MockLLM":
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "prompt_tokens": self.prompt_tokens,
+            "injected_errors": self.errors,
+            "rate_limited": self.rate_limited,
+            "connections": self.connections,
+        }
+
+    def completion_text(self, body: dict) -> str:
+        system = body["messages"][0]["content"]
+        if "Planner" in system:
+            tools = _LISTED_TOOL.findall(system)[:4] or ["doc.report"]
+            return json.dumps({
+                "workflow_name": "Mock plan",
+                "steps": [
+                    {"id": i + 1, "tool": tool, "action": f"Use {tool}", "input_description": "", "depends_on": [i] if i else []}
+                    for i, tool in enumerate(tools)
+                ],
+            })
+        return " ".join(["mock"] * self.output_words)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b""):
+                        break
+                    name, value = line.decode().split(":", 1)
+                    headers[name.strip().lower()] = value.strip()
+                body = json.loads(await reader.readexactly(int(headers.get("content-length", 0))) or b"{}")
+                await self._respond(body, headers.get("authorization", ""), writer)
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass  # Client went away, or the loop is shutting down with keep-alive connections open
+        finally:
+            writer.close()
+
+    def _write(self, writer: asyncio.StreamWriter, status: str, headers: Dict[str, str], payload: bytes):
+        lines = [f"HTTP/1.1 {status}", "Content-Type: application/json", f"Content-Length: {len(payload)}"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + payload)
+
+    async def _respond(self, body: dict, api_key: str, writer: asyncio.StreamWriter):
+        self.requests += 1
+        tokens = sum(count_tokens(m.get("content", "")) for m in body.get("messages", []))
+        self.prompt_tokens += tokens
+
+        limit_headers = {}
+        if self.requests_per_minute and self.tokens_per_minute:
+            limits = self._keys.setdefault(api_key, _KeyLimits(self.requests_per_minute, self.tokens_per_minute))
+            wait = limits.consume(tokens + body.get("max_tokens", 0) // 8)
+            limit_headers = limits.headers()
+            if wait is not None:
+                self.rate_limited += 1
+                error = json.dumps({"error": {"message": "Rate limit reached", "type": "tokens"}}).encode()
+                self._write(writer, "429 Too Many Requests", {**limit_headers, "retry-after": f"{wait:.2f}"}, error)
+                await writer.drain()
+                return
+
+        delay = self.latency_ms + self.prefill_ms_per_1k * tokens / 1000
+        if self.jitter_ms:
+            delay += self.random.expovariate(1 / self.jitter_ms)
+        await asyncio.sleep(delay / 1000)
+
+        if self.error_rate and self.random.random() < self.error_rate:
+            self.errors += 1
+            error = json.dumps({"error": {"message": "Injected upstream failure"}}).encode()
+            self._write(writer, "503 Service Unavailable", limit_headers, error)
+            await writer.drain()
+            return
+
+        text = self.completion_text(body)
+        if body.get("stream"):
+            head = ["HTTP/1.1 200 OK", "Content-Type: text/event-stream", "Transfer-Encoding: chunked"]
+            head += [f"{name}: {value}" for name, value in limit_headers.items()]
+            writer.write(("\r\n".join(head) + "\r\n\r\n").encode())
+            step = self.stream_chunk_chars
+            for i in range(0, len(text), step):
+                event = f"data: {json.dumps({'choices': [{'delta': {'content': text[i:i + step]}}]})}\n\n".encode()
+                writer.write(b"%x\r\n%s\r\n" % (len(event), event))
+                await writer.drain()
+                if self.stream_interval_ms:
+                    await asyncio.sleep(self.stream_interval_ms / 1000)
+            done = b"data: [DONE]\n\n"
+            writer.write(b"%x\r\n%s\r\n0\r\n\r\n" % (len(done), done))
+        else:
+            payload = json.dumps({
+                "choices": [{"message": {"role": "assistant", "content": text}}],
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens + count_tokens(text)},
+            }).encode()
+            self._write(writer, "200 OK", limit_headers, payload)
+        await writer.drain()
+
+
+def add_mock_arguments(parser: argparse.ArgumentParser):
+    """Shared CLI knobs for benchmarks that start a MockLLM."""
+    group = parser.add_argument_group("mock provider")
+    group.add_argument("--latency-ms", type=float, default=300.0, help="base response latency")
+    group.add_argument("--prefill-ms-per-1k", type=float, default=40.0, help="extra latency per 1k prompt tokens")
+    group.add_argument("--jitter-ms", type=float, default=50.0, help="mean exponential extra latency")
+    group.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered 503")
+    group.add_argument("--output-words", type=int, default=120, help="completion length")
+    group.add_argument("--stream-interval-ms", type=float, default=5.0, help="pause between streamed deltas")
+
+
+def mock_from_args(args, **overrides) -> MockLLM:
+    options = {
+        "latency_ms": args.latency_ms,
+        "prefill_ms_per_1k": args.prefill_ms_per_1k,
+        "jitter_ms": args.jitter_ms,
+        "error_rate": args.error_rate,
+        "output_words": args.output_words,
+        "stream_interval_ms": args.stream_interval_ms,
+    }
+    options.update(overrides)
+    return MockLLM(**options)
+
+
+async def _serve(args):
+    mock = await mock_from_args(
+        args,
+        requests_per_minute=args.requests_per_minute,
+        tokens_per_minute=args.tokens_per_minute,
+    ).start(args.port)
+    print(f"Mock LLM listening on {mock.url}", flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await mock.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=9001)
+    parser.add_argument("--requests-per-minute", type=int, default=0, help="per-key request limit (0 = unlimited)")
+    parser.add_argument("--tokens-per-minute", type=int, default=0, help="per-key token limit (0 = unlimited)")
+    add_mock_arguments(parser)
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Shared test fixtures: a local OpenAI-compatible provider and a synthetic PDF
+writer (kept here so the tests don't depend on the benchmarks package).
+"""
+
+import json
+import random
+import asyncio
+from typing import Optional
+
+import pytest
+
+WORDS = "revenue churn margin forecast quarter pipeline invoice contract outage incident deploy release".split()
+
+
+class FakeProvider:
+    """Chat completions over raw HTTP/1.1 keep-alive; counts requests and TCP connections."""
+
+    def __init__(self, reply: str = "mock mock mock mock mock"):
+        self.reply = reply
+        self.requests = 0
+        self.connections = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.sockets[0].getsockname()[1]}/v1/chat/completions"
+
+    async def start(self) -> "FakeProvider":
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while await reader.readline():
+                length = 0
+                while (line := await reader.readline()) not in (b"\r\n", b""):
+                    name, value = line.decode().split(":", 1)
+                    if name.strip().lower() == "content-length":
+                        length = int(value)
+                await reader.readexactly(length)
+                self.requests += 1
+                payload = json.dumps({"choices": [{"message": {"content": self.reply}}], "usage": {"total_tokens": 5}}).encode()
+                head = f"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n"
+                writer.write(head.encode() + payload)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+
+@pytest.fixture
+def fake_provider():
+    return FakeProvider
+
+
+def _write_pdf(path: str, pages: int, seed: int = 7):
+    """Text-only PDF (Helvetica, a few lines per page) written without a PDF library."""
+    rng = random.Random(seed)
+    kids = [4 + 2 * i for i in range(pages)]
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{' '.join(f'{k} 0 R' for k in kids)}] /Count {pages} >>".encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for page, kid in enumerate(kids):
+        lines = [f"Page {page + 1} line {n}: " + " ".join(rng.choices(WORDS, k=8)) for n in range(5)]
+        stream = "\n".join(["BT /F1 10 Tf 12 TL 50 770 Td"] + [f"({line}) '" for line in lines] + ["ET"]).encode()
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {kid + 1} 0 R >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+@pytest.fixture
+def write_pdf():
+    return _write_pdf
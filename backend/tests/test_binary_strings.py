@@ -0,0 +1,97 @@
+"""
+Binary string recovery: ASCII and UTF-16 (LE and BE) runs come back in file
+order, whatever the window size; runs up to half a window are never cut at
+a window edge, and short runs are ignored.
+"""
+
+import re
+import random
+
+import pytest
+
+from app.binary_strings import iter_strings
+
+
+def _noise(rng: random.Random, n: int) -> bytes:
+    """Bytes that never read as printable ASCII or UTF-16."""
+    return bytes(rng.randrange(0x80, 0x100) for _ in range(n))
+
+
+def _lines(path, **kwargs):
+    return [line for _, text in iter_strings(str(path), **kwargs) for line in text.split("\n") if line]
+
+
+@pytest.fixture
+def binary(tmp_path):
+    """Noise with ASCII runs of varied length (some shorter than the minimum)."""
+    rng = random.Random(7)
+    parts = []
+    for i in range(400):
+        parts.append(_noise(rng, rng.randrange(1, 300)))
+        run = "".join(rng.choice("abcdefghij klmnop\tQRS") for _ in range(rng.randrange(2, 120)))
+        parts.append(run.encode("ascii"))
+    data = b"".join(parts)
+    path = tmp_path / "blob.bin"
+    path.write_bytes(data)
+    expected = [m.decode("ascii") for m in re.findall(rb"[\t\n\r\x20-\x7e]{6,}", data)]
+    return path, expected
+
+
+@pytest.mark.parametrize("window_bytes", [997, 4096, 1 << 20])
+def test_ascii_runs_match_a_reference_scan(binary, window_bytes):
+    path, expected = binary
+    assert _lines(path, min_length=6, window_bytes=window_bytes) == expected
+
+
+def test_run_straddling_windows_is_not_split(tmp_path):
+    text = "x" * 1500
+    path = tmp_path / "edge.bin"
+    path.write_bytes(_noise(random.Random(1), 3000) + text.encode("ascii") + b"\xff" * 10)
+
+    chunks = list(iter_strings(str(path), min_length=6, window_bytes=4096))
+
+    assert chunks == [(3000, text + "\n")]
+
+
+def test_run_longer_than_half_a_window_is_split_without_loss(tmp_path):
+    text = "y" * 5000
+    path = tmp_path / "long.bin"
+    path.write_bytes(_noise(random.Random(2), 4000) + text.encode("ascii") + b"\xff" * 10)
+
+    chunks = list(iter_strings(str(path), min_length=6, window_bytes=4096))
+
+    assert len(chunks) > 1
+    assert chunks[0][0] == 4000
+    assert "".join(chunk.replace("\n", "") for _, chunk in chunks) == text
+
+
+def test_utf16_runs_in_either_byte_order(tmp_path):
+    rng = random.Random(3)
+    path = tmp_path / "utf16.bin"
+    path.write_bytes(
+        _noise(rng, 101) + "Quarterly revenue".encode("utf-16-le")
+        + _noise(rng, 64) + "Board minutes".encode("utf-16-be")
+        + _noise(rng, 33) + "tiny".encode("utf-16-le") + _noise(rng, 8)
+    )
+
+    assert _lines(path, min_length=6) == ["Quarterly revenue", "Board minutes"]
+
+
+def test_offsets_and_progress(binary):
+    path, _ = binary
+    size = path.stat().st_size
+    progress = []
+
+    chunks = list(iter_strings(str(path), window_bytes=4096, on_progress=lambda done, total: progress.append((done, total))))
+
+    data = path.read_bytes()
+    for offset, text in chunks:
+        assert data[offset:].startswith(text.split("\n", 1)[0].encode("ascii"))
+    assert progress[-1] == (size, size)
+    assert [done for done, _ in progress] == sorted(done for done, _ in progress)
+
+
+def test_empty_file_yields_nothing(tmp_path):
+    path = tmp_path / "empty.bin"
+    path.write_bytes(b"")
+    assert list(iter_strings(str(path))) == []
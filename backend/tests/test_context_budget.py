@@ -0,0 +1,70 @@
+"""
+Context budgeting: the packer fills its budget by priority, truncates what
+can be cut and drops what cannot, and hands items back in insertion order.
+"""
+
+from app.context_budget import (
+    ContextPacker,
+    count_tokens,
+    prompt_budget,
+    truncate_to_tokens,
+)
+
+
+def _words(n: int, word: str = "word") -> str:
+    return " ".join([word] * n)
+
+
+def test_truncate_to_tokens_fits_and_cuts_at_a_word():
+    text = _words(200)
+    cut = truncate_to_tokens(text, 50)
+    assert count_tokens(cut) <= 50
+    assert text.startswith(cut) and cut.endswith("word")
+    assert truncate_to_tokens(text, 10_000) == text
+    assert truncate_to_tokens(text, 0) == ""
+
+
+def test_higher_priority_items_fill_the_budget_first():
+    low, high = _words(100, "low"), _words(100, "high")
+    packer = ContextPacker(budget=count_tokens(high) + 5)
+    packer.add(low, priority=1, truncatable=False, name="low")
+    packer.add(high, priority=5, name="high")
+
+    packed = packer.pack()
+
+    assert [item["name"] for item in packed] == ["high"]
+    assert packer.report()["dropped"] == 1
+    assert packer.report()["truncated"] == 0
+
+
+def test_item_that_does_not_fit_is_truncated_then_packed_in_insertion_order():
+    first, second = _words(100, "alpha"), _words(100, "beta")
+    budget = count_tokens(second) + 40
+    packer = ContextPacker(budget=budget)
+    packer.add(first, priority=1, name="first")
+    packer.add(second, priority=2, name="second")
+
+    packed = packer.pack()
+
+    assert [item["name"] for item in packed] == ["first", "second"]
+    assert packed[1]["text"] == second
+    assert 0 < packed[0]["tokens"] <= 40
+    assert first.startswith(packed[0]["text"])
+    report = packer.report()
+    assert report["truncated"] == 1 and report["dropped"] == 0
+    assert report["context_tokens"] <= budget
+
+
+def test_remainder_below_min_tokens_drops_the_item():
+    packer = ContextPacker(budget=count_tokens(_words(100)) + 10)
+    packer.add(_words(100), priority=2)
+    packer.add(_words(100, "extra"), priority=1, min_tokens=32)
+
+    assert len(packer.pack()) == 1
+    assert packer.report()["dropped"] == 1
+
+
+def test_prompt_budget_subtracts_output_and_fixed_text():
+    fixed = _words(50)
+    assert prompt_budget("llama3-8b-8192", 1000, fixed) == int(8192 * 0.95) - 1000 - count_tokens(fixed)
+    assert prompt_budget("llama3-8b-8192", 10_000) == 0
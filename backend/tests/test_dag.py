@@ -0,0 +1,91 @@
+"""
+DAG runner: steps wait for their dependencies, independent steps overlap,
+and a step whose dependency failed is skipped instead of run.
+"""
+
+import asyncio
+
+from app.dag import DagRunner, normalize_dependencies, run_dag
+
+
+def _steps(*deps):
+    """Normalized steps 1..n; deps[i] is the depends_on list of step i + 1."""
+    return normalize_dependencies([{"id": i + 1, "depends_on": d} for i, d in enumerate(deps)])
+
+
+def test_dependencies_finish_first_and_see_only_direct_upstream():
+    order, seen = [], {}
+
+    async def run_step(step, upstream):
+        seen[step["id"]] = sorted(upstream)
+        await asyncio.sleep(0.01 * (3 - step["id"]))  # Step 1 is the slowest
+        order.append(step["id"])
+        return {"step_id": step["id"], "status": "completed"}
+
+    results = asyncio.run(run_dag(_steps([], [], [1, 2], [3]), run_step))
+
+    assert [r["step_id"] for r in results] == [1, 2, 3, 4]  # Plan order, not finish order
+    assert order.index(3) > max(order.index(1), order.index(2))
+    assert order[-1] == 4
+    assert seen == {1: [], 2: [], 3: [1, 2], 4: [3]}
+
+
+def test_independent_steps_run_concurrently_up_to_the_limit():
+    running, peak = 0, 0
+
+    async def run_step(step, upstream):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return {"step_id": step["id"], "status": "completed"}
+
+    asyncio.run(run_dag(_steps([], [], [], []), run_step, max_parallel=2))
+
+    assert peak == 2
+
+
+def test_failed_dependency_skips_its_dependents():
+    ran, skipped = [], []
+
+    async def run_step(step, upstream):
+        ran.append(step["id"])
+        return {"step_id": step["id"], "status": "error" if step["id"] == 1 else "completed"}
+
+    async def on_skip(step, result):
+        skipped.append(step["id"])
+
+    results = asyncio.run(run_dag(_steps([], [1], [2], [], [3, 4]), run_step, on_skip=on_skip))
+
+    assert ran == [1, 4]
+    assert sorted(skipped) == [2, 3, 5]
+    assert [r["status"] for r in results] == ["error", "skipped", "skipped", "completed", "skipped"]
+    assert "step 1" in results[1]["error"]
+    assert "step 3" in results[4]["error"]
+
+
+def test_exception_cancels_the_remaining_steps():
+    async def run_step(step, upstream):
+        if step["id"] == 1:
+            raise RuntimeError("boom")
+        await asyncio.sleep(10)
+        return {"step_id": step["id"], "status": "completed"}
+
+    async def run():
+        runner = DagRunner(run_step)
+        for step in _steps([], [], [1]):
+            runner.add(step)
+        try:
+            await runner.results()
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError("expected the step's exception")
+        await asyncio.sleep(0)
+        return runner.tasks
+
+    tasks = asyncio.run(run())
+
+    assert tasks[2].cancelled()
+    assert tasks[3].done()
@@ -0,0 +1,45 @@
+"""
+Document store catalog and files: one document can be reached under every
+name it was uploaded as, and only files that are read are kept.
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from app.document_store import DocumentStore, DocumentWriter
+
+DIM = 8
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = DocumentStore(str(tmp_path / "docstore"))
+    yield store
+    store.close()
+
+
+def _write(store, doc_id: str, texts) -> int:
+    writer = DocumentWriter(store.directory, doc_id, DIM)
+    writer.add_chunks([{"text": text} for text in texts], np.ones((len(texts), DIM)))
+    return writer.commit()
+
+
+def test_reregistering_keeps_earlier_names(store):
+    size = _write(store, "doc", ["quarterly report"])
+    store.register("doc", "report.pdf", size, 1)
+    store.register("doc", "report (copy).pdf", size, 1)  # Same bytes uploaded under another name
+    assert store.resolve("report.pdf") == "doc"
+    assert store.resolve("report (copy).pdf") == "doc"
+    assert store.names() == {"report.pdf": "doc", "report (copy).pdf": "doc"}
+    assert len(store) == 1
+
+
+def test_only_read_files_are_written(store):
+    size = _write(store, "doc", ["first chunk", "second chunk"])
+    files = sorted(f for f in os.listdir(store.directory) if f.startswith("doc."))
+    assert files == ["doc.chunks", "doc.offsets.npy", "doc.postings.npz", "doc.vec.npy"]
+    assert size == sum(os.path.getsize(os.path.join(store.directory, f)) for f in files)
+    store.register("doc", "notes.txt", size, 2)
+    assert [store.chunk("doc", p) for p in (0, 1)] == ["first chunk", "second chunk"]
@@ -0,0 +1,39 @@
+"""
+Extraction fallbacks: a handler that fails before producing anything falls
+back to the raw strings of the file; one that fails part-way keeps its
+output without the fallback repeating it.
+"""
+
+import pytest
+
+from app import extraction
+
+TEXT = b"quarterly revenue forecast for the northern region"
+
+
+@pytest.fixture
+def broken(tmp_path, monkeypatch):
+    """A .brk file and a handler that yields `partial` segments, then raises."""
+    path = tmp_path / "report.brk"
+    path.write_bytes(b"\x00\x01" + TEXT + b"\x00\xff")
+
+    def set_partial(partial):
+        def handler(file_path, filename):
+            yield from partial
+            raise ValueError("bad record")
+
+        monkeypatch.setitem(extraction.HANDLERS, "brk", handler)
+        return list(extraction.iter_segments(str(path), "report.brk"))
+
+    return set_partial
+
+
+def test_failure_before_output_uses_raw_strings(broken):
+    segments = broken([])
+    assert TEXT.decode() in "".join(segment["text"] for segment in segments)
+
+
+def test_failure_after_output_is_not_rescanned(broken):
+    segments = broken([{"text": "first record", "rows": [1, 1]}])
+    assert segments[0] == {"text": "first record", "rows": [1, 1]}
+    assert [segment["text"] for segment in segments[1:]] == ["\n...[Extraction stopped early: bad record]...\n"]
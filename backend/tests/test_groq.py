@@ -0,0 +1,125 @@
+"""
+Groq calls against a mock transport: key rotation, failure handling and
+streaming.
+"""
+
+import json
+import asyncio
+
+import httpx
+import pytest
+
+from app import chat_engine
+from app.key_scheduler import KeyScheduler
+
+KEYS = ["key-a", "key-b"]
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+
+def _delta(text: str) -> bytes:
+    return f"data: {json.dumps({'choices': [{'delta': {'content': text}}]})}\n\n".encode()
+
+
+@pytest.fixture
+def groq(monkeypatch):
+    """Route Groq traffic through `groq.handler`; records the key of every request."""
+    class Mock:
+        handler = None
+        keys = []
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        Mock.keys.append(request.headers["authorization"].removeprefix("Bearer "))
+        return Mock.handler(request)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handle))
+    monkeypatch.setattr(chat_engine, "GROQ_API_KEYS", KEYS)
+    monkeypatch.setattr(chat_engine, "groq_keys", KeyScheduler(KEYS, requests_per_minute=1000, tokens_per_minute=10**6))
+    monkeypatch.setattr(chat_engine, "get_client", lambda provider: client)
+    return Mock
+
+
+async def _collect(stream):
+    deltas = []
+    try:
+        async for delta in stream:
+            deltas.append(delta)
+    except Exception as e:
+        return deltas, e
+    return deltas, None
+
+
+def test_stream_rotates_keys_before_first_delta(groq):
+    def handler(request):
+        if len(groq.keys) == 1:
+            return httpx.Response(503, json={"error": "overloaded"})
+        return httpx.Response(200, content=_delta("Hel") + _delta("lo") + b"data: [DONE]\n\n")
+
+    groq.handler = handler
+    deltas, error = asyncio.run(_collect(chat_engine.stream_groq_api(MESSAGES)))
+    assert error is None
+    assert deltas == ["Hel", "lo"]
+    assert len(groq.keys) == 2 and groq.keys[0] != groq.keys[1]
+
+
+def test_stream_failure_after_partial_output_is_not_retried(groq):
+    async def body():
+        yield _delta("partial ")
+        raise httpx.ReadError("connection reset")
+
+    groq.handler = lambda request: httpx.Response(200, content=body())
+    deltas, error = asyncio.run(_collect(chat_engine.stream_groq_api(MESSAGES)))
+    assert deltas == ["partial "]
+    assert isinstance(error, httpx.ReadError)
+    assert len(groq.keys) == 1
+    assert chat_engine.groq_keys.state[groq.keys[0]]["in_flight"] == 0
+
+
+def _completion(content: str = "ok") -> httpx.Response:
+    return httpx.Response(200, json={"choices": [{"message": {"content": content}}], "usage": {"total_tokens": 5}})
+
+
+def _call(text: str = "hello") -> str:
+    return asyncio.run(chat_engine.call_groq_api([{"role": "user", "content": text}]))
+
+
+def test_rate_limited_key_hands_request_to_another(groq):
+    def handler(request):
+        if groq.keys[-1] == "key-a":
+            return httpx.Response(429, headers={"retry-after": "10"}, json={"error": "rate limited"})
+        return _completion()
+
+    groq.handler = handler
+    assert _call("first") == "ok"
+    assert groq.keys == ["key-a", "key-b"]
+    stats = {s["key"]: s for s in chat_engine.groq_keys.stats()}
+    assert stats[1]["benched_for"] > 5 and stats[1]["rate_limited"] == 1
+    # The benched key is skipped until its Retry-After has passed
+    assert _call("second") == "ok"
+    assert groq.keys[2:] == ["key-b"]
+
+
+def test_bucket_limit_reached(groq, monkeypatch):
+    monkeypatch.setattr(chat_engine, "groq_keys", KeyScheduler(KEYS, requests_per_minute=2, tokens_per_minute=10**6, max_wait=0.2))
+    groq.handler = lambda request: _completion()
+    assert [_call(f"question {i}") for i in range(4)] == ["ok"] * 4
+    assert sorted(groq.keys) == ["key-a", "key-a", "key-b", "key-b"]
+    assert _call("one too many") == "Error: All AI providers are busy."
+    assert len(groq.keys) == 4
+
+
+def test_rejected_request_is_not_retried(groq):
+    groq.handler = lambda request: httpx.Response(400, json={"error": "context_length_exceeded"})
+    assert _call() == "Error: AI provider rejected the request (400)."
+    assert len(groq.keys) == 1
+
+
+def test_rejected_key_is_disabled(groq):
+    groq.handler = lambda request: httpx.Response(401, json={"error": "invalid api key"}) if groq.keys[-1] == "key-a" else _completion()
+    assert _call("first") == "ok"
+    assert [_call(f"question {i}") for i in range(3)] == ["ok"] * 3
+    assert groq.keys == ["key-a"] + ["key-b"] * 4
+    assert chat_engine.groq_keys.state["key-a"]["disabled"]
+
+    groq.handler = lambda request: httpx.Response(403, json={"error": "forbidden"})
+    assert _call("last") == "Error: All AI providers are busy."
+    assert all(state["disabled"] for state in chat_engine.groq_keys.state.values())
@@ -0,0 +1,54 @@
+"""
+Ingestion jobs: content uploaded again under another name while its first
+upload is still being ingested gets that name once the document is stored.
+"""
+
+import asyncio
+import hashlib
+
+import pytest
+
+from app import chat_engine, ingestion, job_store
+from app.document_store import DocumentStore
+from app.job_store import JobStore
+from app.retrieval import BM25Index
+from app.vector_index import VectorIndex
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = DocumentStore(str(tmp_path / "docstore"))
+    jobs = JobStore(str(tmp_path / "jobs.db"))
+    (tmp_path / "uploads").mkdir()
+    monkeypatch.setattr(chat_engine, "document_store", store)
+    monkeypatch.setattr(chat_engine, "rag_index", BM25Index())
+    monkeypatch.setattr(chat_engine, "vector_index", VectorIndex())
+    monkeypatch.setattr(chat_engine, "TEMP_DIR", str(tmp_path / "uploads"))
+    monkeypatch.setattr(ingestion, "INGEST_EXECUTOR", "thread")
+    monkeypatch.setattr(ingestion, "_executor", None)
+    monkeypatch.setattr(job_store, "_store", jobs)
+    yield store
+    ingestion.shutdown_executor()
+    jobs.close()
+    store.close()
+
+
+def test_duplicate_during_ingestion_is_named(store, tmp_path):
+    data = b"incident report on the outage " * 50
+    sha256 = hashlib.sha256(data).hexdigest()
+
+    def upload(name: str) -> dict:
+        path = tmp_path / "uploads" / f"{name}.part"
+        path.write_bytes(data)
+        return chat_engine.queue_ingestion(str(path), name, sha256, len(data))
+
+    async def scenario():
+        first = upload("report.txt")
+        second = upload("report (1).txt")
+        await ingestion._tasks[first["job_id"]]
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert second["status"] == "deduplicated" and second["job_id"] == first["job_id"]
+    assert ingestion.ingest_jobs[first["job_id"]]["status"] == "completed"
+    assert store.resolve("report.txt") == store.resolve("report (1).txt") == sha256
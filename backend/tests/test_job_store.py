@@ -0,0 +1,93 @@
+"""
+Job status shared through SQLite: a job run by one uvicorn worker can be
+polled and cancelled through any other.
+"""
+
+import time
+import asyncio
+
+import pytest
+
+from app import job_store, workflow_jobs
+from app.job_store import JobStore
+
+
+@pytest.fixture
+def stores(tmp_path, monkeypatch):
+    """The owning worker's store (used by workflow_jobs) and another worker's view of the same file."""
+    path = str(tmp_path / "jobs.db")
+    owner, other = JobStore(path), JobStore(path)
+    monkeypatch.setattr(job_store, "_store", owner)
+    monkeypatch.setattr(workflow_jobs, "CANCEL_POLL_INTERVAL", 0.05)
+    monkeypatch.setattr(workflow_jobs, "workflow_jobs", {})
+    yield owner, other
+    owner.close()
+    other.close()
+
+
+def _run(scenario):
+    async def wrapped():
+        workflow_jobs.start_workers()
+        try:
+            return await scenario()
+        finally:
+            await workflow_jobs.stop_workers()
+
+    return asyncio.run(wrapped())
+
+
+def test_other_worker_sees_progress_and_result(stores):
+    owner, other = stores
+
+    async def scenario():
+        gate = asyncio.Event()
+
+        async def work(job):
+            workflow_jobs.set_progress(job, 0.5, steps_completed=1)
+            await gate.wait()
+            return {"answer": 42}
+
+        job = await workflow_jobs.submit_job(work, user_id="u1")
+        await asyncio.sleep(0.05)
+        owner.flush()
+        running = other.get("workflow", job["job_id"])
+        gate.set()
+        while job["status"] != "completed":
+            await asyncio.sleep(0.01)
+        owner.flush()
+        return running, other.get("workflow", job["job_id"])
+
+    running, finished = _run(scenario)
+    assert running["status"] == "running" and running["progress"] == 0.5 and running["steps_completed"] == 1
+    assert finished["status"] == "completed" and finished["result"] == {"answer": 42}
+    assert other.get("ingest", finished["job_id"]) is None
+
+
+def test_cancel_from_other_worker(stores):
+    owner, other = stores
+
+    async def scenario():
+        job = await workflow_jobs.submit_job(lambda job: asyncio.sleep(30))
+        await asyncio.sleep(0.05)
+        owner.flush()
+        flagged = other.request_cancel("workflow", job["job_id"], workflow_jobs.ACTIVE_PHASES)
+        for _ in range(100):
+            if job["status"] == "cancelled":
+                break
+            await asyncio.sleep(0.02)
+        return flagged, job
+
+    flagged, job = _run(scenario)
+    assert flagged["cancel_requested"] is True
+    assert job["status"] == "cancelled"
+    assert other.request_cancel("workflow", "missing", workflow_jobs.ACTIVE_PHASES) is None
+
+
+def test_prune_drops_finished_jobs_only(stores):
+    owner, _ = stores
+    owner.publish("ingest", {"job_id": "done", "status": "completed", "updated_at": 1.0})
+    owner.publish("ingest", {"job_id": "busy", "status": "extracting", "updated_at": time.time()})
+    owner.prune("ingest", 2.0, ("queued", "extracting", "indexing"))
+    owner.flush()
+    assert owner.get("ingest", "done") is None
+    assert owner.get("ingest", "busy")["status"] == "extracting"
@@ -0,0 +1,62 @@
+"""
+PDF extraction: the page generator reports the page count, so truncation is
+detected without opening the document again; each thread keeps its own
+open document.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from pypdf import PdfReader
+
+from app import extraction, pdf_pages
+
+PAGES = 12
+
+
+@pytest.fixture
+def pdf(tmp_path, monkeypatch, write_pdf):
+    monkeypatch.setattr(pdf_pages, "PDF_PAGE_CACHE", "")
+    path = tmp_path / "report.pdf"
+    write_pdf(str(path), PAGES, seed=1)
+    return str(path)
+
+
+def test_page_count_is_returned(pdf):
+    pages = pdf_pages.iter_pdf_pages(pdf, max_pages=5)
+    numbers = []
+    with pytest.raises(StopIteration) as end:
+        while True:
+            numbers.append(next(pages)[0])
+    assert numbers == list(range(5))
+    assert end.value.value == PAGES
+
+
+def test_truncated_pdf_is_flagged(pdf, monkeypatch):
+    monkeypatch.setattr(extraction, "PDF_MAX_PAGES", 5)
+    segments = list(extraction.iter_segments(pdf, "report.pdf"))
+    assert [s["page"] for s in segments] == [1, 2, 3, 4, 5, 6]
+    assert "Truncated at 5 pages" in segments[-1]["text"]
+
+    monkeypatch.setattr(extraction, "PDF_MAX_PAGES", 0)
+    assert [s["page"] for s in extraction.iter_segments(pdf, "report.pdf")] == list(range(1, PAGES + 1))
+
+
+def test_threads_keep_their_own_reader(pdf, tmp_path, monkeypatch, write_pdf):
+    other = str(tmp_path / "other.pdf")
+    write_pdf(other, 3, seed=2)
+    expected = list(pdf_pages.iter_pdf_pages(pdf))
+    opened = []
+    monkeypatch.setattr(pdf_pages, "PdfReader", lambda path: opened.append(path) or PdfReader(path))
+
+    # Thread A is part-way through `pdf` when thread B extracts another document start to finish
+    pages = pdf_pages.iter_pdf_pages(pdf)
+    with ThreadPoolExecutor(max_workers=1) as thread_a:
+        first = thread_a.submit(next, pages).result()
+        thread_b = threading.Thread(target=lambda: list(pdf_pages.iter_pdf_pages(other)))
+        thread_b.start()
+        thread_b.join()
+        rest = thread_a.submit(list, pages).result()
+    assert [first, *rest] == expected
+    assert opened.count(pdf) == 1
@@ -0,0 +1,102 @@
+"""
+Plan cache: entries expire after the TTL, the least recently used entry is
+evicted first, repeat directives are served from the cache, and the planner
+prompt (tool shortlist included) is built once per request.
+"""
+
+import json
+import asyncio
+
+import pytest
+
+from app import main
+from app import plan_cache
+from app.plan_cache import PlanCache, plan_cache_key
+from app.workflow_store import InMemoryWorkflowStore
+
+PLAN = {"workflow_name": "Report", "steps": [{"id": 1, "tool": "doc.report", "action": "Write it", "depends_on": []}]}
+
+
+@pytest.fixture
+def planner(monkeypatch):
+    """Counts planner_prompt builds and planner calls."""
+    counts = {"prompts": 0, "calls": 0}
+    build = main.planner_prompt
+
+    def planner_prompt(directive):
+        counts["prompts"] += 1
+        return build(directive)
+
+    async def call_ai(system, prompt, **kwargs):
+        counts["calls"] += 1
+        return json.dumps(PLAN)
+
+    monkeypatch.setattr(main, "planner_prompt", planner_prompt)
+    monkeypatch.setattr(main, "call_ai", call_ai)
+    monkeypatch.setattr(main, "plan_cache", PlanCache())
+    monkeypatch.setattr(main, "workflows_store", InMemoryWorkflowStore())
+    return counts
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(plan_cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = PlanCache(max_entries=4, ttl=60)
+    cache.put("a", PLAN)
+    clock[0] += 59
+    assert cache.get("a") == PLAN
+    clock[0] += 2
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = PlanCache(max_entries=2, ttl=60)
+    cache.put("a", PLAN)
+    cache.put("b", PLAN)
+    cache.get("a")  # "b" is now the oldest
+    cache.put("c", PLAN)
+    assert cache.get("b") is None
+    assert cache.get("a") == PLAN and cache.get("c") == PLAN
+    assert cache.evictions == 1
+
+
+def test_cached_plans_are_copies(clock):
+    cache = PlanCache()
+    plan = json.loads(json.dumps(PLAN))
+    cache.put("a", plan)
+    plan["steps"].clear()
+    cache.get("a")["steps"].clear()
+    assert cache.get("a") == PLAN
+
+
+def test_zero_capacity_disables_the_cache(clock):
+    cache = PlanCache(max_entries=0)
+    cache.put("a", PLAN)
+    assert cache.get("a") is None
+
+
+def test_key_ignores_case_and_spacing_but_not_the_planner_prompt():
+    key = plan_cache_key("Write the report.", "system")
+    assert plan_cache_key("  write THE   report ", "system") == key
+    assert plan_cache_key("Write the report", "other system") != key
+    assert plan_cache_key("Write the memo", "system") != key
+
+
+def _plan(prompt: str, header=None) -> dict:
+    return asyncio.run(main.plan_workflow(main.WorkflowRequest(prompt=prompt), header))
+
+
+def test_planner_prompt_is_built_once_per_request(planner):
+    assert _plan("Write the quarterly report")["plan_cache"] == "miss"
+    assert planner == {"prompts": 1, "calls": 1}
+    assert _plan("  write the QUARTERLY report. ")["plan_cache"] == "hit"
+    assert planner == {"prompts": 2, "calls": 1}
+    assert _plan("Write the quarterly report", "bypass")["plan_cache"] == "bypass"
+    assert planner == {"prompts": 3, "calls": 2}
@@ -0,0 +1,89 @@
+"""
+Plan parsing: repair_json fixes the usual LLM JSON faults, and the
+incremental parser emits each step as soon as it closes, recovering a
+truncated final step at finish().
+"""
+
+import json
+
+import pytest
+
+from app.plan_parser import IncrementalPlanParser, parse_plan, repair_json
+
+STEPS = [
+    {"id": 1, "tool": "research.topic", "action": "Research", "depends_on": []},
+    {"id": 2, "tool": "doc.report", "action": "Write up", "depends_on": [1]},
+]
+PLAN_JSON = json.dumps({"workflow_name": "Report", "steps": STEPS})
+
+
+def test_repair_json_accepts_clean_json():
+    assert repair_json(PLAN_JSON) == ({"workflow_name": "Report", "steps": STEPS}, [])
+
+
+def test_repair_json_strips_fences_and_trailing_commas():
+    text = 'Here it is:\n```json\n{"steps": [{"id": 1, "tool": "doc.memo",},],}\n```\nDone.'
+    value, repairs = repair_json(text)
+    assert value == {"steps": [{"id": 1, "tool": "doc.memo"}]}
+    assert repairs == ["fences", "trailing_comma"]
+
+
+def test_repair_json_drops_comments():
+    value, repairs = repair_json('{"a": 1, // first\n "b": /* second */ 2}')
+    assert value == {"a": 1, "b": 2}
+    assert repairs == ["comment"]
+
+
+def test_repair_json_closes_truncated_output():
+    value, repairs = repair_json('{"steps": [{"id": 1, "tool": "doc.memo"}, {"id": 2, "tool": "doc.rep')
+    assert value == {"steps": [{"id": 1, "tool": "doc.memo"}, {"id": 2, "tool": "doc.rep"}]}
+    assert "truncated" in repairs
+
+    value, _ = repair_json('{"steps": [{"id": 1, "tool": "doc.memo"}, {"id": 2, "tool":')
+    assert value == {"steps": [{"id": 1, "tool": "doc.memo"}, {"id": 2}]}
+
+
+def test_repair_json_rejects_text_without_json():
+    with pytest.raises(ValueError):
+        repair_json("no plan here")
+
+
+def test_steps_are_emitted_as_each_object_closes():
+    parser = IncrementalPlanParser()
+    cut = PLAN_JSON.index("}") + 1  # Just past the first step
+    assert parser.feed(PLAN_JSON[:cut - 1]) == []
+    assert parser.feed(PLAN_JSON[cut - 1:cut]) == [STEPS[0]]
+    assert parser.feed(PLAN_JSON[cut:]) == [STEPS[1]]
+    assert parser.finish() == []
+    assert parser.plan() == {"workflow_name": "Report", "steps": STEPS}
+    assert parser.repairs == []
+
+
+def test_streaming_byte_by_byte_matches_the_whole_parse():
+    parser = IncrementalPlanParser()
+    for c in "```json\n" + PLAN_JSON + "\n```":
+        parser.feed(c)
+    parser.finish()
+    assert parser.steps == STEPS
+    assert parser.repairs == ["fences"]
+
+
+def test_truncated_final_step_is_recovered_and_waits_for_the_previous_one():
+    first = json.dumps(STEPS[0])
+    parser = parse_plan('{"workflow_name": "Report", "steps": [' + first + ', {"id": 2, "tool": "doc.report", "action": "Write')
+    assert parser.truncated
+    assert parser.steps[0] == STEPS[0]
+    assert parser.steps[1] == {"id": 2, "tool": "doc.report", "action": "Write", "depends_on": [1]}
+
+
+def test_truncated_step_without_a_tool_is_dropped():
+    first = json.dumps(STEPS[0])
+    parser = parse_plan('{"steps": [' + first + ', {"id": 2, "act')
+    assert parser.steps == [STEPS[0]]
+    assert parser.truncated
+
+
+def test_unstreamable_output_falls_back_to_a_full_repair():
+    parser = parse_plan("Plan:\n" + json.dumps({"name": "x", "tasks": STEPS}))
+    assert parser.steps == STEPS
+    assert parser.plan()["workflow_name"] == "Untitled Workflow"
@@ -0,0 +1,59 @@
+"""
+Streaming dataset profiles: head rows plus a uniform reservoir sample, and
+the per-sheet row cap for workbooks.
+"""
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+from app.profiling import DatasetProfiler, HEAD_ROWS, SAMPLE_ROWS, profile_workbook
+
+
+def _profile(rows: int, chunk_rows: int, seed: int = 0) -> DatasetProfiler:
+    profiler = DatasetProfiler(seed=seed)
+    for lo in range(0, rows, chunk_rows):
+        profiler.update(pd.DataFrame({"n": np.arange(lo, min(lo + chunk_rows, rows))}))
+    return profiler
+
+
+def test_sample_is_full_once_enough_rows_are_seen():
+    for rows in (HEAD_ROWS + SAMPLE_ROWS, HEAD_ROWS + SAMPLE_ROWS + 1, 1000):
+        sample = _profile(rows, chunk_rows=7).sample_frame()
+        assert len(sample) == HEAD_ROWS + SAMPLE_ROWS
+        assert sample["n"].is_unique
+
+
+def test_short_dataset_keeps_every_row():
+    sample = _profile(HEAD_ROWS + 3, chunk_rows=2).sample_frame()
+    assert sample["n"].tolist() == list(range(HEAD_ROWS + 3))
+
+
+def test_sample_is_uniform():
+    body = 60
+    counts = np.zeros(body)
+    trials = 400
+    for seed in range(trials):
+        sample = _profile(HEAD_ROWS + body, chunk_rows=16, seed=seed).sample_frame()
+        counts[sample["n"].to_numpy()[HEAD_ROWS:] - HEAD_ROWS] += 1
+    expected = trials * SAMPLE_ROWS / body
+    # Each row is kept with probability SAMPLE_ROWS / body; allow ~5 standard deviations
+    assert np.abs(counts - expected).max() < 5 * np.sqrt(expected)
+
+
+def _workbook(path, rows: int):
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Orders")
+    sheet.append(["n", "amount"])
+    for n in range(rows):
+        sheet.append([n, n * 1.5])
+    workbook.save(path)
+
+
+def test_sheet_of_exactly_max_rows_is_not_truncated(tmp_path):
+    for rows, truncated in ((10, False), (11, True)):
+        path = tmp_path / f"orders_{rows}.xlsx"
+        _workbook(path, rows)
+        for chunk_rows in (3, 5, 10, 20):
+            (title, profiler, was_truncated), = profile_workbook(str(path), chunk_rows=chunk_rows, max_rows=10)
+            assert (profiler.rows, was_truncated) == (10, truncated)
@@ -0,0 +1,101 @@
+"""
+Resumable uploads: ranges are recorded under the upload's file lock without
+blocking the event loop, and never after the upload has been finalized;
+checksummed chunks only reach the data file once verified.
+"""
+
+import os
+import time
+import base64
+import hashlib
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app.resumable_uploads import HTTP_CHECKSUM_MISMATCH, ResumableUploadStore
+
+
+async def _body(*pieces: bytes):
+    for piece in pieces:
+        yield piece
+
+
+@pytest.fixture
+def uploads(tmp_path):
+    return ResumableUploadStore(str(tmp_path / "resumable"))
+
+
+def test_chunks_complete_an_upload(uploads):
+    upload_id = uploads.create("data.bin", 8)["upload_id"]
+    asyncio.run(uploads.write_chunk(upload_id, 4, _body(b"5678")))
+    state = asyncio.run(uploads.write_chunk(upload_id, 0, _body(b"12", b"34")))
+    assert state["ranges"] == [[0, 8]]
+    finalized = uploads.finalize(upload_id)
+    with open(finalized["data_path"], "rb") as f:
+        assert f.read() == b"12345678"
+
+
+def test_waiting_for_the_lock_does_not_block_the_loop(uploads):
+    upload_id = uploads.create("data.bin", 8)["upload_id"]
+    held, release = threading.Event(), threading.Event()
+
+    def hold_lock():  # Stands in for finalize hashing a large file under the lock
+        with uploads._locked(upload_id):
+            held.set()
+            release.wait(5)
+
+    async def scenario():
+        holder = threading.Thread(target=hold_lock)
+        holder.start()
+        held.wait(5)
+        write = asyncio.create_task(uploads.write_chunk(upload_id, 0, _body(b"1234")))
+        ticks = 0
+        started = time.monotonic()
+        while time.monotonic() - started < 0.2:
+            await asyncio.sleep(0.01)
+            ticks += 1
+        assert not write.done()
+        release.set()
+        state = await write
+        holder.join()
+        return ticks, state
+
+    ticks, state = asyncio.run(scenario())
+    assert ticks >= 10
+    assert state["ranges"] == [[0, 4]]
+
+
+def test_range_is_not_recorded_after_finalize(uploads):
+    upload_id = uploads.create("data.bin", 4)["upload_id"]
+    asyncio.run(uploads.write_chunk(upload_id, 0, _body(b"1234")))
+
+    async def late_body():
+        yield b"12"
+        await asyncio.to_thread(uploads.finalize, upload_id)  # Finalized while this chunk is in flight
+        yield b"34"
+
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(uploads.write_chunk(upload_id, 0, late_body()))
+    assert raised.value.status_code == 409
+    assert uploads.get(upload_id)["status"] == "finalizing"
+
+
+def _checksum(data: bytes) -> str:
+    return "sha256 " + base64.b64encode(hashlib.sha256(data).digest()).decode()
+
+
+def test_corrupt_resend_does_not_overwrite_accepted_bytes(uploads):
+    upload_id = uploads.create("data.bin", 8)["upload_id"]
+    asyncio.run(uploads.write_chunk(upload_id, 0, _body(b"1234"), checksum=_checksum(b"1234")))
+    with pytest.raises(HTTPException) as raised:  # Resend of the same range, damaged in transit
+        asyncio.run(uploads.write_chunk(upload_id, 0, _body(b"12X4"), checksum=_checksum(b"1234")))
+    assert raised.value.status_code == HTTP_CHECKSUM_MISMATCH
+    asyncio.run(uploads.write_chunk(upload_id, 4, _body(b"5678"), checksum=_checksum(b"5678")))
+
+    finalized = uploads.finalize(upload_id)
+    with open(finalized["data_path"], "rb") as f:
+        assert f.read() == b"12345678"
+    assert finalized["sha256"] == hashlib.sha256(b"12345678").hexdigest()
+    assert not [name for name in os.listdir(uploads.directory) if name.endswith(".part")]
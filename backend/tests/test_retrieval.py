@@ -0,0 +1,98 @@
+"""
+Retrieval indexes (BM25 + vectors) hold chunk positions only; chunk text is
+read from the document store when the prompt is packed.
+"""
+
+import os
+import asyncio
+
+import pytest
+
+from app import chat_engine
+from app.document_store import DocumentStore
+from app.retrieval import BM25Index
+from app.vector_index import VectorIndex
+
+TOPICS = ["invoice totals for the northern region", "hiring plan for engineers", "incident report on the outage"]
+
+
+def test_bm25_hits_are_positions():
+    index = BM25Index()
+    index.add_chunks("a", TOPICS)
+    index.add_chunks("b", ["the outage lasted two hours", "nothing relevant here"])
+    hits = index.search("outage incident", k=5)
+    assert [(h["doc"], h["position"]) for h in hits] == [("a", 2), ("b", 0)]
+    assert set(hits[0]) == {"doc", "position", "score"}
+    assert index.search("outage", doc_ids=["b"])[0]["doc"] == "b"
+
+    index.remove_document("a")
+    assert "a" not in index and index.chunk_total == 2
+    assert index.leading_chunks("b", 5) == [{"doc": "b", "position": p, "score": 0.0} for p in (0, 1)]
+
+
+def test_vector_positions_survive_compaction():
+    index = VectorIndex(dim=64)
+    index.add_texts("old", ["filler text"] * 50)
+    index.add_texts("a", TOPICS)
+    index.remove_document("old")  # More than half tombstones: rows are compacted
+    assert index.size == len(TOPICS)
+    for position, text in enumerate(TOPICS):
+        assert index.search(text, k=1)[0] == {"doc": "a", "position": position, "score": pytest.approx(1.0)}
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = DocumentStore(str(tmp_path / "docstore"))
+    monkeypatch.setattr(chat_engine, "document_store", store)
+    monkeypatch.setattr(chat_engine, "rag_index", BM25Index())
+    monkeypatch.setattr(chat_engine, "vector_index", VectorIndex())
+    yield store
+    store.close()
+
+
+def _ingest(store, tmp_path, filename: str, text: str) -> str:
+    path = tmp_path / filename
+    path.write_text(text)
+    doc_id = filename.replace(".", "-")
+    prepared = chat_engine.prepare_document(str(path), filename, chat_engine.vector_index.dim, doc_id, store.directory)
+    store.register(doc_id, filename, prepared["bytes"], prepared["chunks"])
+    return doc_id
+
+
+def _prompt(message: str, files) -> str:
+    request = chat_engine.ChatRequest(message=message, context_files=files)
+    messages, _, _ = asyncio.run(chat_engine.prepare_rag_messages(request))
+    return messages[0]["content"]
+
+
+def test_prompt_packs_chunk_text_from_store(store, tmp_path):
+    _ingest(store, tmp_path, "notes.txt", "\n\n".join(TOPICS))
+    _ingest(store, tmp_path, "other.txt", "quarterly marketing budget review")
+    prompt = _prompt("what happened in the outage?", ["notes.txt"])
+    assert "=== FILE: notes.txt (chunk 1) ===" in prompt
+    assert "incident report on the outage" in prompt
+    assert "marketing" not in prompt
+
+
+def test_documents_load_from_stored_postings(store, tmp_path):
+    doc_id = _ingest(store, tmp_path, "notes.txt", "\n\n".join(TOPICS))
+    assert os.path.exists(os.path.join(store.directory, doc_id + ".postings.npz"))
+
+    # Building the prompt never indexes anything itself
+    labels, notes = chat_engine.resolve_context_files(chat_engine.ChatRequest(message="outage", context_files=["notes.txt"]))
+    _, files, _ = chat_engine.build_rag_messages(chat_engine.ChatRequest(message="outage"), labels, notes)
+    assert files == 0 and doc_id not in chat_engine.rag_index
+
+    assert "incident report on the outage" in _prompt("outage", ["notes.txt"])
+    assert chat_engine.rag_index.docs[doc_id].chunk_count == 1
+
+
+def test_missing_postings_are_rebuilt(store, tmp_path):
+    doc_id = _ingest(store, tmp_path, "notes.txt", "\n\n".join(TOPICS))
+    path = os.path.join(store.directory, doc_id + ".postings.npz")
+    expected = store.postings(doc_id)
+    os.remove(path)
+    rebuilt = store.postings(doc_id)
+    assert os.path.exists(path)
+    assert rebuilt.terms == expected.terms
+    assert (rebuilt.chunks == expected.chunks).all() and (rebuilt.lengths == expected.lengths).all()
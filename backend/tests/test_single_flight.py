@@ -0,0 +1,49 @@
+"""
+Single-flight coalescing of identical in-flight calls.
+"""
+
+import asyncio
+
+import pytest
+
+from app.single_flight import SingleFlight
+
+
+def test_identical_calls_share_one_flight():
+    async def scenario():
+        flights, started = SingleFlight(), []
+
+        async def work():
+            started.append(1)
+            await asyncio.sleep(0.01)
+            return "done"
+
+        results = await asyncio.gather(*(flights.run("k", work) for _ in range(5)))
+        return results, started, flights.stats()
+
+    results, started, stats = asyncio.run(scenario())
+    assert results == ["done"] * 5
+    assert len(started) == 1 and stats["coalesced"] == 4 and stats["in_flight"] == 0
+
+
+def test_caller_after_cancellation_starts_a_fresh_flight():
+    async def scenario():
+        flights, started = SingleFlight(), []
+
+        async def work():
+            started.append(1)
+            await asyncio.sleep(0.01)
+            return len(started)
+
+        first = asyncio.create_task(flights.run("k", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)  # The only waiter gives up; the shared task is cancelled but not finished yet
+        second = await flights.run("k", work)
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return second, flights.stats()
+
+    second, stats = asyncio.run(scenario())
+    assert second == 2
+    assert stats["cancelled"] == 1 and stats["upstream_requests"] == 2
@@ -0,0 +1,70 @@
+"""
+Tools registry: the ETag and fingerprint follow TOOL_CATEGORIES (and only
+change when it does), /api/tools answers 304 for a matching ETag, and
+unknown planned tools are mapped onto registered ones.
+"""
+
+import copy
+import json
+import asyncio
+
+import pytest
+
+from app import main, tools_registry
+from app.tools_registry import TOOL_CATEGORIES, ToolRegistry, reload_registry
+
+
+@pytest.fixture
+def categories(monkeypatch):
+    """A private copy of TOOL_CATEGORIES; the live registry is restored afterwards."""
+    edited = copy.deepcopy(TOOL_CATEGORIES)
+    monkeypatch.setattr(tools_registry, "TOOL_CATEGORIES", edited)
+    yield edited
+    monkeypatch.undo()
+    reload_registry()
+
+
+def test_fingerprint_is_stable_and_tracks_edits():
+    first, second = ToolRegistry(TOOL_CATEGORIES), ToolRegistry(copy.deepcopy(TOOL_CATEGORIES))
+    assert first.fingerprint == second.fingerprint
+    assert first.etag == second.etag == f'"{first.fingerprint[:32]}"'
+
+    edited = copy.deepcopy(TOOL_CATEGORIES)
+    edited[0]["tools"][0]["description"] += "!"
+    assert ToolRegistry(edited).fingerprint != first.fingerprint
+
+
+def test_reload_picks_up_runtime_edits(categories):
+    before = tools_registry.get_registry()
+    categories[0]["tools"].append({"name": "email.digest", "description": "Summarize an inbox"})
+
+    after = reload_registry()
+
+    assert tools_registry.get_registry() is after
+    assert after.etag != before.etag
+    assert "email.digest" in after and "email.digest" not in before
+    assert json.loads(after.payload_json)["count"] == len(before) + 1
+
+
+def test_list_tools_answers_304_for_a_matching_etag():
+    etag = tools_registry.get_registry().etag
+
+    full = asyncio.run(main.list_tools(None))
+    assert full.status_code == 200
+    assert full.headers["etag"] == etag
+    assert json.loads(full.body)["count"] == tools_registry.get_tool_count()
+
+    assert asyncio.run(main.list_tools(f'"stale", {etag}')).status_code == 304
+    assert asyncio.run(main.list_tools('"stale"')).status_code == 200
+
+
+def test_nearest_maps_unknown_tools():
+    registry = tools_registry.get_registry()
+    assert registry.nearest("email.draft") == ("email.draft", "exact")
+    assert registry.nearest("Email_Draft") == ("email.draft", "normalized")
+    assert registry.nearest("email.drafts") == ("email.draft", "spelling")
+    assert registry.nearest("", "")[1] == "fallback"
+
+    steps, repairs = registry.validate_steps([{"id": 1, "tool": "email.drafts", "action": "Write"}])
+    assert steps[0]["tool"] == "email.draft"
+    assert repairs == [{"step_id": 1, "from": "email.drafts", "to": "email.draft", "method": "spelling"}]
@@ -0,0 +1,52 @@
+"""
+Upstream clients: calls to a provider reuse the shared keep-alive pool
+instead of opening a connection per request.
+"""
+
+import asyncio
+
+from app import main, chat_engine
+from app.key_scheduler import KeyScheduler
+from app.upstream import close_clients
+
+CALLS = 20
+
+
+def _run(provider_class, coro_factory):
+    async def scenario():
+        provider = await provider_class().start()
+        try:
+            await coro_factory(provider)
+        finally:
+            await close_clients()
+            await provider.stop()
+        return provider
+
+    return asyncio.run(scenario())
+
+
+def test_call_ai_reuses_connections(monkeypatch, fake_provider):
+    async def calls(provider):
+        monkeypatch.setattr(main, "OPENROUTER_URL", provider.url)
+        for i in range(CALLS):  # Distinct prompts, so single-flight doesn't merge them
+            assert await main.call_ai("system", f"question {i}") == "mock mock mock mock mock"
+
+    provider = _run(fake_provider, calls)
+    assert provider.requests == CALLS
+    assert provider.connections == 1
+
+
+def test_call_groq_api_reuses_connections(monkeypatch, fake_provider):
+    keys = ["key-a", "key-b"]
+    monkeypatch.setattr(chat_engine, "GROQ_API_KEYS", keys)
+    monkeypatch.setattr(chat_engine, "groq_keys", KeyScheduler(keys, requests_per_minute=1000, tokens_per_minute=10**6))
+
+    async def calls(provider):
+        monkeypatch.setattr(chat_engine, "GROQ_URL", provider.url)
+        for i in range(CALLS):
+            reply = await chat_engine.call_groq_api([{"role": "user", "content": f"question {i}"}])
+            assert reply == "mock mock mock mock mock"
+
+    provider = _run(fake_provider, calls)
+    assert provider.requests == CALLS
+    assert provider.connections == 1
@@ -0,0 +1,54 @@
+"""
+Workflow stores: expired workflows don't count, and SQLite lock waits happen
+off the event loop.
+"""
+
+import time
+import asyncio
+import sqlite3
+
+from app import main
+from app.workflow_store import InMemoryWorkflowStore, SQLiteWorkflowStore
+
+
+def _workflow(workflow_id: str, user_id: str = "u1") -> dict:
+    return {"workflow_id": workflow_id, "user_id": user_id, "prompt": "p", "status": "planned", "steps": [], "results": {}}
+
+
+def test_memory_store_drops_expired_and_least_recent(monkeypatch):
+    store = InMemoryWorkflowStore(max_entries=2, ttl=60)
+    for workflow_id in ("a", "b", "c"):
+        store.create(_workflow(workflow_id))
+    assert "a" not in store and len(store) == 2
+
+    later = time.time() + 120
+    monkeypatch.setattr(time, "time", lambda: later)
+    assert len(store) == 0
+    assert store.list_by_user("u1") == []
+
+
+def test_step_write_waits_off_the_loop(tmp_path, monkeypatch):
+    path = str(tmp_path / "workflows.db")
+    store = SQLiteWorkflowStore(path)
+    store.create(_workflow("wf"))
+    monkeypatch.setattr(main, "workflows_store", store)
+    writer = sqlite3.connect(path, isolation_level=None)
+    writer.execute("BEGIN IMMEDIATE")  # Another worker mid-write
+
+    async def scenario():
+        request = main.ExecuteStepRequest(workflow_id="wf", step_id=1, tool="t", action="a")
+        save = asyncio.create_task(main._step_completed(request, "done"))
+        ticks = 0
+        started = time.monotonic()
+        while time.monotonic() - started < 0.2:
+            await asyncio.sleep(0.01)
+            ticks += 1
+        assert not save.done()
+        writer.execute("COMMIT")
+        await save
+        return ticks
+
+    assert asyncio.run(scenario()) >= 10
+    assert store.get_results("wf") == {"1": "done"}
+    writer.close()
+    store.close()